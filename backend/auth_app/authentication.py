@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .user_cache import get_user
+
+def user_from_claims(validated_token):
+    """
+    Build an unsaved User holding only the id claim of a validated token.
+    
+    Filtering by it and assigning it to foreign keys need no query; reading
+    any other field loads that field from the database.
+    """
+    try:
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+    User = get_user_model()
+    return User.from_db(None, [User._meta.pk.attname], [user_id])
+
+def get_active_user(user_id):
+    """Return the active user with this id through the user cache; raises AuthenticationFailed if there is none"""
+    user = get_user(user_id)
+    if user is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    return user
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication without a user lookup on reads.
+    
+    Safe requests get a User built from the verified token claims. Writes
+    store rows that reference the user, so for them the user is loaded through
+    the per-process user cache and a deleted or deactivated user is rejected
+    with 401. Otherwise such users keep read access until their access token
+    expires.
+    """
+    
+    def authenticate(self, request):
+        authenticated = super().authenticate(request)
+        if authenticated is None or request.method in SAFE_METHODS:
+            return authenticated
+        user, validated_token = authenticated
+        return get_active_user(user.pk), validated_token
+    
+    def get_user(self, validated_token):
+        return user_from_claims(validated_token)
@@ -2,8 +2,11 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
 from .serializers import UserRegistrationSerializer, UserLoginSerializer
+from .authentication import user_from_claims
 from .models import User
+from .user_cache import UserCache, get_user, user_cache
 
 class UserModelTests(TestCase):
     """Test User model"""
@@ -287,3 +290,108 @@ class AuthenticationAPITests(APITestCase):
         response = self.client.get('/auth/api/user/')
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class UserCacheTests(TestCase):
+    """Test the per-process user cache"""
+    
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+    
+    def test_get_user_is_cached(self):
+        """Test a resolved user is served from the cache"""
+        get_user(self.user.id)
+        
+        with self.assertNumQueries(0):
+            user = get_user(self.user.id)
+        self.assertEqual(user, self.user)
+    
+    def test_saving_user_invalidates_cache(self):
+        """Test deactivated users are no longer resolved"""
+        get_user(self.user.id)
+        self.user.is_active = False
+        self.user.save()
+        
+        self.assertIsNone(get_user(self.user.id))
+    
+    def test_lru_eviction_and_ttl(self):
+        """Test the cache is bounded and entries expire"""
+        cache = UserCache(max_size=2, ttl=60)
+        cache.set(1, 'a')
+        cache.set(2, 'b')
+        cache.get(1)
+        cache.set(3, 'c')
+        
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(1), 'a')
+        
+        expired = UserCache(max_size=2, ttl=-1)
+        expired.set(1, 'a')
+        self.assertIsNone(expired.get(1))
+
+
+class ClaimsJWTAuthenticationTests(APITestCase):
+    """Test JWT authentication from token claims"""
+    
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    
+    def test_user_is_built_from_claims(self):
+        """Test the user only has its id until another field is read"""
+        token = RefreshToken.for_user(self.user).access_token
+        
+        with self.assertNumQueries(0):
+            user = user_from_claims(token)
+        self.assertIs(type(user), User)
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.get_deferred_fields() & {'id'}, set())
+        
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'test@example.com')
+    
+    def test_get_user_info(self):
+        """Test views reading user fields load the row once, then from the cache"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/auth/api/user/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'user_id': self.user.id,
+            'username': 'testuser',
+            'email': 'test@example.com'
+        })
+        
+        with self.assertNumQueries(0):
+            self.client.get('/auth/api/user/')
+    
+    def test_deleted_user_cannot_write(self):
+        """Test a valid token of a deleted user is rejected with 401 on writes"""
+        self.user.delete()
+        
+        response = self.client.post('/api/game/play/', {'number': 842}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        response = self.client.post('/api/game/async/play/', {'number': 842}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        response = self.client.get('/auth/api/user/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_invalid_token(self):
+        """Test invalid tokens are rejected"""
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer invalid')
+        response = self.client.get('/auth/api/user/')
+        
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
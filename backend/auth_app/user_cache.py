@@ -0,0 +1,109 @@
+"""
+Per-process cache of resolved users.
+
+Authenticating a WebSocket connection only needs the ``User`` row to confirm
+the account still exists and is active, and ``ClaimsJWTAuthentication`` only
+loads it for writes and for views that read more than the id. Rows are kept
+in a bounded LRU with a TTL and dropped when the user is saved or deleted in
+this process; other processes see such changes once the TTL expires.
+"""
+
+import copy
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+class UserCache:
+    """Thread-safe LRU cache of users with a time to live"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id):
+        """Return a copy of the cached user, or None if absent or expired"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        # Callers may annotate the instance; never share it between requests
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        with self._lock:
+            self._entries[user_id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+user_cache = UserCache(
+    settings.AUTH_USER_CACHE['MAX_SIZE'],
+    settings.AUTH_USER_CACHE['TTL'],
+)
+
+_stats_lock = threading.Lock()
+_stats = Counter()
+_latencies = deque(maxlen=1000)
+
+def get_cached_user(user_id):
+    """Return the active user with this id from the cache, or None on a miss"""
+    if not settings.AUTH_USER_CACHE['ENABLED']:
+        return None
+    return user_cache.get(user_id)
+
+def get_user(user_id):
+    """Return the active user with this id, loading and caching it on a miss"""
+    user = get_cached_user(user_id)
+    if user is not None:
+        return user
+
+    user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+    if user is not None and settings.AUTH_USER_CACHE['ENABLED']:
+        user_cache.set(user_id, user)
+    return user
+
+def record_connect(source, seconds):
+    """Record how a connecting user was resolved and how long it took"""
+    with _stats_lock:
+        _stats[source] += 1
+        _latencies.append(seconds)
+
+def connect_stats():
+    """Return connect counters by source and latencies (ms) of recent connects in this process"""
+    with _stats_lock:
+        stats = dict(_stats)
+        latencies = sorted(_latencies)
+    stats['connects'] = sum(stats.values())
+    if latencies:
+        stats['latency_ms'] = {
+            'p50': round(latencies[len(latencies) // 2] * 1000, 3),
+            'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3),
+        }
+    return stats
+
+def reset_connect_stats():
+    """Reset the connect counters of this process"""
+    with _stats_lock:
+        _stats.clear()
+        _latencies.clear()
@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import login
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
+from .authentication import get_active_user
 from .serializers import UserRegistrationSerializer, UserLoginSerializer, UserSerializer
 from .tasks import send_welcome_email
 
@@ -104,8 +105,10 @@ def login_api(request):
 @api_view(['GET'])
 def get_user_info(request):
     """Get current user info"""
+    # Token users only carry their id; load the row through the user cache
+    user = get_active_user(request.user.id)
     return Response({
-        'user_id': request.user.id,
-        'username': request.user.username,
-        'email': request.user.email
+        'user_id': user.id,
+        'username': user.username,
+        'email': user.email
     })
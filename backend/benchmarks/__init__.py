@@ -0,0 +1,19 @@
+"""
+Benchmarks for the NumberPlay backend.
+
+Each module can be run on its own from the ``backend`` directory, e.g.::
+
+    python -m benchmarks.async_views --requests 2000 --concurrency 50
+
+Benchmarks run in-process against a throwaway test database, so they never
+touch real data and need no running server.
+"""
+
+import os
+
+def setup_django():
+    """Configure Django for a standalone benchmark run"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'numberplay.settings')
+
+    import django
+    django.setup()
@@ -0,0 +1,82 @@
+"""
+Compare the sync DRF game views with their native async versions.
+
+Both variants are driven through Django's ASGI handler with ``AsyncClient``,
+the same way Daphne serves them, using a fixed number of concurrent clients::
+
+    python -m benchmarks.async_views --requests 2000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import time
+from . import setup_django
+from .harness import IN_MEMORY_CHANNEL_LAYERS, report, summarize, test_database
+
+# name: (method, sync path, async path)
+ENDPOINTS = {
+    'play': ('post', '/api/game/play/', '/api/game/async/play/'),
+    'history': ('get', '/api/game/history/', '/api/game/async/history/'),
+    'statistics': ('get', '/api/game/statistics/', '/api/game/async/statistics/'),
+}
+
+async def drive(method, path, total, concurrency, headers):
+    """Send ``total`` requests to ``path`` from ``concurrency`` clients"""
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    latencies = []
+    remaining = total
+
+    async def request():
+        if method == 'post':
+            return await client.post(path, {'number': 842}, content_type='application/json', headers=headers)
+        return await client.get(path, headers=headers)
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await request()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f'{method.upper()} {path} returned {response.status_code}')
+
+    # Warm up URL resolution, serializers and connections
+    for _ in range(min(concurrency, 10)):
+        await request()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per endpoint and variant')
+    parser.add_argument('--concurrency', type=int, default=20, help='Concurrent clients')
+    parser.add_argument('--endpoints', nargs='+', choices=sorted(ENDPOINTS), default=sorted(ENDPOINTS))
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.test import override_settings
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from auth_app.models import User
+
+    with test_database(), override_settings(RATELIMIT_ENABLE=False, CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS):
+        user = User.objects.create_user(username='bench', email='bench@example.com', password='BenchPass123')
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+        results = {}
+        for name in args.endpoints:
+            method, sync_path, async_path = ENDPOINTS[name]
+            results[name] = {
+                'sync': asyncio.run(drive(method, sync_path, args.requests, args.concurrency, headers)),
+                'async': asyncio.run(drive(method, async_path, args.requests, args.concurrency, headers)),
+            }
+
+    report(results, args.output)
+
+if __name__ == '__main__':
+    main()
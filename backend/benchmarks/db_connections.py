@@ -0,0 +1,117 @@
+"""
+Measure per-request database connection overhead with and without persistent connections.
+
+Requests to the statistics endpoint go through Django's WSGI handler, so the
+request_started/request_finished signals open and close connections exactly
+as in production (the test client keeps them open). Each ``CONN_MAX_AGE`` is
+run against the same workload and reports latency and connections opened::
+
+    python -m benchmarks.db_connections --requests 2000 --max-ages 0 60
+
+Point ``DATABASE_URL`` at MySQL to get meaningful numbers (SQLite's
+in-memory test database is never really closed), and run again with
+``DB_POOL_ENABLED=True`` to compare the pooled engine, where a "connection
+opened" is a checkout from the pool.
+"""
+
+import argparse
+import time
+from . import setup_django
+from .harness import report, summarize, test_database
+
+def connect_cost(rounds):
+    """Average time to open and close a connection, in milliseconds"""
+    from django.db import connection
+
+    connection.close()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        connection.ensure_connection()
+        connection.close()
+    return round((time.perf_counter() - start) / rounds * 1000, 3)
+
+def run(environ, total):
+    """Send ``total`` requests through the WSGI handler; count new connections"""
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+    from django.db.backends.signals import connection_created
+
+    handler = WSGIHandler()
+    opened = 0
+
+    def count(sender, **kwargs):
+        nonlocal opened
+        opened += 1
+
+    def start_response(status, headers):
+        if not status.startswith('200'):
+            raise RuntimeError(f"GET {environ['PATH_INFO']} returned {status}")
+
+    def request():
+        response = handler(dict(environ), start_response)
+        # Closing the response sends request_finished
+        response.close()
+
+    connection.close()
+    request()
+    connection_created.connect(count)
+    latencies = []
+    try:
+        start = time.perf_counter()
+        for _ in range(total):
+            started = time.perf_counter()
+            request()
+            latencies.append(time.perf_counter() - started)
+        elapsed = time.perf_counter() - start
+    finally:
+        connection_created.disconnect(count)
+
+    result = summarize(latencies, elapsed)
+    result['connections_opened'] = opened
+    result['connections_per_request'] = round(opened / total, 4)
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000, help='Requests per CONN_MAX_AGE')
+    parser.add_argument('--max-ages', type=int, nargs='+', default=[0, 60],
+                        help='CONN_MAX_AGE values to compare, in seconds (0 closes after each request)')
+    parser.add_argument('--connect-rounds', type=int, default=100,
+                        help='Connections opened to measure the cost of one connect')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.conf import settings
+    from django.db import connection
+    from django.test import RequestFactory, override_settings
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from auth_app.models import User
+
+    # Every request reads the database instead of the response cache
+    response_cache = {**settings.GAME_RESPONSE_CACHE, 'ENABLED': False}
+    with test_database(), override_settings(RATELIMIT_ENABLE=False, GAME_RESPONSE_CACHE=response_cache):
+        user = User.objects.create_user(username='bench', email='bench@example.com', password='BenchPass123')
+        environ = RequestFactory()._base_environ(
+            PATH_INFO='/api/game/statistics/',
+            REQUEST_METHOD='GET',
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}',
+        )
+
+        results = {
+            'engine': connection.settings_dict['ENGINE'],
+            'connect_ms': connect_cost(args.connect_rounds),
+        }
+        original = connection.settings_dict['CONN_MAX_AGE']
+        try:
+            for max_age in args.max_ages:
+                # Read by the connection each time it opens
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                results[f'conn_max_age_{max_age}'] = run(environ, args.requests)
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = original
+
+    report(results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Shared helpers for timing and reporting benchmark runs"""
+
+import json
+import math
+import subprocess
+from contextlib import contextmanager
+
+IN_MEMORY_CHANNEL_LAYERS = {
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+}
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+def summarize(latencies, elapsed):
+    """Summarize per-request latencies (in seconds) of one run"""
+    return {
+        'requests': len(latencies),
+        'elapsed_s': round(elapsed, 4),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(max(latencies, default=0.0) * 1000, 3),
+    }
+
+@contextmanager
+def test_database(verbosity=0):
+    """Run the enclosed block against throwaway test databases"""
+    from django.test.utils import (
+        setup_databases, setup_test_environment,
+        teardown_databases, teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=verbosity, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=verbosity)
+        teardown_test_environment()
+
+def git_revision():
+    """Return the short git revision of the tree, or None outside a checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def report(results, output=None):
+    """Print results as JSON and optionally save them to a file"""
+    text = json.dumps(results, indent=2, sort_keys=True)
+    print(text)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
@@ -0,0 +1,193 @@
+"""
+Micro-benchmarks of the per-request CPU work on the hottest endpoints.
+
+Each benchmark times one operation (a prize calculation, a serializer
+validation, rendering a page of results, a WebSocket authentication) with
+``timeit``, repeated several times, and reports the fastest and median time
+per operation. Nothing touches the database or the network::
+
+    python -m benchmarks.micro --save-baseline baseline.json
+    python -m benchmarks.micro --baseline baseline.json --threshold 0.10
+
+With ``--baseline`` the run exits with status 1 if any benchmark's fastest
+time is more than ``--threshold`` (a fraction) slower than in the baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import timeit
+from . import setup_django
+from .harness import git_revision, report
+
+ROWS = 100
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    """Register a setup function returning (operation, operations per call)"""
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+@benchmark('calculate_prize')
+def bench_calculate_prize():
+    from game_app.views import calculate_prize
+
+    numbers = range(1, 10000, 97)
+
+    def run():
+        for number in numbers:
+            calculate_prize(number)
+    return run, len(numbers)
+
+@benchmark('game_play_serializer')
+def bench_game_play_serializer():
+    from game_app.serializers import GamePlaySerializer
+
+    def run():
+        GamePlaySerializer(data={'number': 842}).is_valid(raise_exception=True)
+    return run, 1
+
+@benchmark(f'game_result_serializer[{ROWS} rows]')
+def bench_game_result_serializer():
+    from django.utils import timezone
+    from auth_app.models import User
+    from game_app.models import GameResult
+    from game_app.serializers import GameResultSerializer
+
+    user = User(id=1, username='bench', email='bench@example.com')
+    now = timezone.now()
+    rows = [
+        GameResult(
+            id=i, user=user, number=i, created_at=now,
+            result='win' if i % 2 == 0 else 'lose',
+            prize=i * 0.5 if i % 2 == 0 else None,
+        )
+        for i in range(1, ROWS + 1)
+    ]
+
+    def run():
+        GameResultSerializer(rows, many=True).data
+    return run, 1
+
+@benchmark('validate_password')
+def bench_validate_password():
+    from auth_app.serializers import UserRegistrationSerializer
+
+    serializer = UserRegistrationSerializer()
+
+    def run():
+        serializer.validate_password('BenchPass123')
+    return run, 1
+
+def jwt_middleware(claims_only):
+    """Authenticate a WebSocket scope from its query string, 100 times per call"""
+    from django.test import override_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+    from auth_app.models import User
+    from auth_app.user_cache import user_cache
+    from game_app.middleware import JWTAuthMiddleware
+
+    async def app(scope, receive, send):
+        pass
+
+    user = User(id=1, username='bench', email='bench@example.com', is_active=True)
+    user_cache.set(user.pk, user)
+    middleware = JWTAuthMiddleware(app)
+    scope = {'type': 'websocket', 'query_string': f'token={AccessToken.for_user(user)}'.encode()}
+    operations = 100
+    loop = asyncio.new_event_loop()
+
+    async def authenticate():
+        for _ in range(operations):
+            await middleware(scope, None, None)
+
+    def run():
+        with override_settings(WEBSOCKET_AUTH_CLAIMS_ONLY=claims_only):
+            loop.run_until_complete(authenticate())
+    return run, operations
+
+@benchmark('jwt_middleware[cache]')
+def bench_jwt_middleware_cache():
+    return jwt_middleware(claims_only=False)
+
+@benchmark('jwt_middleware[claims]')
+def bench_jwt_middleware_claims():
+    return jwt_middleware(claims_only=True)
+
+def measure(setup, repeat, min_time):
+    """Time one benchmark; returns microseconds per operation"""
+    run, operations = setup()
+    timer = timeit.Timer(run)
+    # Calibrate the loop count so one repetition lasts at least min_time
+    loops = 1
+    while timer.timeit(loops) < min_time:
+        loops *= 2
+    times = [t / loops / operations * 1e6 for t in timer.repeat(repeat, loops)]
+    return {
+        'min_us': round(min(times), 4),
+        'median_us': round(statistics.median(times), 4),
+        'loops': loops,
+        'operations': operations,
+        'repeat': repeat,
+    }
+
+def compare(results, baseline, threshold):
+    """Return {name: change} of benchmarks slower than the baseline by more than threshold"""
+    regressions = {}
+    for name, result in results['benchmarks'].items():
+        previous = baseline['benchmarks'].get(name)
+        if previous is None:
+            continue
+        change = result['min_us'] / previous['min_us'] - 1
+        result['baseline_min_us'] = previous['min_us']
+        result['change'] = round(change, 4)
+        if change > threshold:
+            regressions[name] = change
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS),
+                        help='Benchmarks to run')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed repetitions per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='Minimum seconds per repetition, used to pick the loop count')
+    parser.add_argument('--baseline', help='Compare with the results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Allowed slowdown against the baseline, as a fraction (default: 0.10)')
+    parser.add_argument('--save-baseline', help='Write the results to this file for later comparison')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    import django
+
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'machine': platform.machine(),
+        },
+        'benchmarks': {name: measure(BENCHMARKS[name], args.repeat, args.min_time) for name in args.only},
+    }
+
+    regressions = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        results['meta']['baseline_revision'] = baseline['meta'].get('revision')
+
+    report(results, args.save_baseline)
+    for name, change in sorted(regressions.items()):
+        print(f'Regression: {name} is {change:.1%} slower than the baseline', file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
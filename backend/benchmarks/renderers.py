@@ -0,0 +1,104 @@
+"""
+Compare DRF's JSONRenderer and JSONParser with the orjson classes of the API.
+
+Renders typical response bodies (a play, a statistics payload and history
+pages of game results) and parses a play request with both implementations::
+
+    python -m benchmarks.renderers --rows 20 100 1000
+
+Reports operations/sec, MB/sec of JSON and the speedup of the orjson classes.
+"""
+
+import argparse
+import io
+from . import setup_django
+from .harness import report
+from .micro import measure
+
+def history_page(rows):
+    """Return a rendered history page of ``rows`` game results, as the view returns it"""
+    from datetime import timedelta
+    from django.utils import timezone
+    from game_app.serializers import render_game_results
+    from game_app.services import resolve_play
+
+    now = timezone.now()
+    values = []
+    for i in range(1, rows + 1):
+        result, prize = resolve_play(i % 9999 + 1)
+        values.append({
+            'id': i, 'user__username': 'bench', 'number': i % 9999 + 1, 'result': result,
+            'prize': prize, 'created_at': now - timedelta(seconds=i),
+        })
+    return {'next': 'http://testserver/api/game/history/all/?cursor=abc', 'results': render_game_results(values)}
+
+def payloads(row_counts):
+    from decimal import Decimal
+    from django.utils import timezone
+    from game_app.services import result_message
+    from game_app.views import build_statistics
+
+    bodies = {
+        'play': result_message(842, 'win', Decimal('421.00')),
+        'statistics': build_statistics(120, 61, Decimal('25317.40'), Decimal('6999.30'), timezone.now()),
+    }
+    for rows in row_counts:
+        bodies[f'history[{rows} rows]'] = history_page(rows)
+    return bodies
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[20, 100, 1000],
+                        help='Sizes of the history pages to render')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed repetitions per benchmark')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='Minimum seconds per repetition, used to pick the loop count')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from numberplay.parsers import ORJSONParser, orjson
+    from numberplay.renderers import ORJSONRenderer
+
+    if orjson is None:
+        parser.error('orjson is not installed, so both implementations are the same')
+
+    def rendering(renderer, data):
+        def setup():
+            return (lambda: renderer.render(data, 'application/json', {})), 1
+        return setup
+
+    def parsing(json_parser, body):
+        def setup():
+            return (lambda: json_parser.parse(io.BytesIO(body))), 1
+        return setup
+
+    results = {}
+    for name, data in payloads(args.rows).items():
+        size = len(JSONRenderer().render(data))
+        results[f'render {name}'] = {
+            'stdlib': measure(rendering(JSONRenderer(), data), args.repeat, args.min_time),
+            'orjson': measure(rendering(ORJSONRenderer(), data), args.repeat, args.min_time),
+            'bytes': size,
+        }
+
+    body = b'{"number": 842}'
+    results['parse play'] = {
+        'stdlib': measure(parsing(JSONParser(), body), args.repeat, args.min_time),
+        'orjson': measure(parsing(ORJSONParser(), body), args.repeat, args.min_time),
+        'bytes': len(body),
+    }
+
+    for result in results.values():
+        for variant in ('stdlib', 'orjson'):
+            seconds = result[variant]['min_us'] / 1e6
+            result[variant]['ops_per_s'] = round(1 / seconds, 1)
+            result[variant]['mb_per_s'] = round(result['bytes'] / seconds / 1e6, 2)
+        result['speedup'] = round(result['stdlib']['min_us'] / result['orjson']['min_us'], 2)
+
+    report(results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Compare GameResultSerializer with the .values() rendering path for lists of game results.
+
+For each size the same user's results are rendered both ways, including the
+query, and the outputs are checked to be identical::
+
+    python -m benchmarks.serializers --sizes 10 1000 100000
+
+Reports rows/sec of each path and the speedup of ``render_game_results``.
+"""
+
+import argparse
+import time
+from . import setup_django
+from .harness import report, test_database
+
+def best_time(render, repeat):
+    """Return the output and the fastest of ``repeat`` timings of ``render``"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = render()
+        times.append(time.perf_counter() - start)
+    return output, min(times)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000],
+                        help='Numbers of game results to render')
+    parser.add_argument('--repeat', type=int, default=5, help='Timings per path; the fastest is kept')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from auth_app.models import User
+    from game_app.models import GameResult
+    from game_app.serializers import GAME_RESULT_VALUES, GameResultSerializer, render_game_results
+    from game_app.services import resolve_play
+
+    with test_database():
+        results = {}
+        for size in args.sizes:
+            user = User.objects.create_user(
+                username=f'bench{size}', email=f'bench{size}@example.com', password='BenchPass123'
+            )
+            numbers = [i % 9999 + 1 for i in range(size)]
+            GameResult.objects.bulk_create(
+                [GameResult(user=user, number=number, result=result, prize=prize)
+                 for number, (result, prize) in zip(numbers, map(resolve_play, numbers))],
+                batch_size=5000,
+            )
+            queryset = GameResult.objects.filter(user=user)
+
+            # list() forces the ReturnList the same way a renderer does
+            model, model_time = best_time(
+                lambda: list(GameResultSerializer(queryset.select_related('user'), many=True).data),
+                args.repeat
+            )
+            lean, lean_time = best_time(
+                lambda: render_game_results(queryset.values(*GAME_RESULT_VALUES)),
+                args.repeat
+            )
+            if [dict(row) for row in model] != lean:
+                raise RuntimeError(f'Outputs differ for {size} rows')
+
+            results[f'{size}_rows'] = {
+                'model_serializer_rows_per_s': round(size / model_time, 1),
+                'values_rows_per_s': round(size / lean_time, 1),
+                'model_serializer_ms': round(model_time * 1000, 3),
+                'values_ms': round(lean_time * 1000, 3),
+                'speedup': round(model_time / lean_time, 2),
+            }
+
+    report(results, args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Measure game_result delivery to WebSocket connections with and without coalescing.
+
+One user has several sockets open (tabs) and results are published to their
+group in bursts, as ``play_game`` does. Each coalescing window is run against
+the same workload and reports frames sent, frames/sec and process CPU time::
+
+    python -m benchmarks.ws_delivery --tabs 4 --events 2000 --windows 0 10 25 50
+
+CPU time covers both ends, since the test clients run in the same process.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from . import setup_django
+from .harness import IN_MEMORY_CHANNEL_LAYERS, report, test_database
+
+async def read_results(communicator, expected):
+    """Read frames until ``expected`` results arrived; return the number of frames"""
+    frames = results = 0
+    while results < expected:
+        frame = json.loads(await communicator.receive_from(timeout=30))
+        frames += 1
+        results += len(frame['data']) if frame['type'] == 'game_results' else 1
+    return frames
+
+async def run(token, user_id, tabs, events, burst, gap):
+    """Publish ``events`` results in bursts to ``tabs`` sockets of one user"""
+    from channels.layers import get_channel_layer
+    from channels.testing import WebsocketCommunicator
+    from numberplay.asgi import application
+
+    communicators = []
+    for _ in range(tabs):
+        communicator = WebsocketCommunicator(application, f'/ws/game/?token={token}')
+        connected, _ = await communicator.connect()
+        if not connected:
+            raise RuntimeError('WebSocket connection was rejected')
+        await communicator.receive_from()
+        communicators.append(communicator)
+
+    channel_layer = get_channel_layer()
+    message = {'number': 842, 'result': 'win', 'prize': 421.0}
+    readers = [asyncio.create_task(read_results(c, events)) for c in communicators]
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for sent in range(0, events, burst):
+        for _ in range(min(burst, events - sent)):
+            await channel_layer.group_send(f'user_{user_id}', {'type': 'game.result', 'message': message})
+        await asyncio.sleep(gap)
+    frames = sum(await asyncio.gather(*readers))
+    elapsed, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    for communicator in communicators:
+        await communicator.disconnect()
+
+    delivered = events * tabs
+    return {
+        'results': delivered,
+        'frames': frames,
+        'results_per_frame': round(delivered / frames, 2),
+        'elapsed_s': round(elapsed, 4),
+        'frames_per_s': round(frames / elapsed, 1),
+        'results_per_s': round(delivered / elapsed, 1),
+        'cpu_s': round(cpu, 4),
+        'cpu_us_per_result': round(cpu / delivered * 1e6, 2),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tabs', type=int, default=4, help='Sockets open for the user')
+    parser.add_argument('--events', type=int, default=2000, help='Results published to the user')
+    parser.add_argument('--burst', type=int, default=10, help='Results published back to back')
+    parser.add_argument('--gap-ms', type=float, default=5, help='Pause between bursts')
+    parser.add_argument('--windows', type=int, nargs='+', default=[0, 10, 25, 50],
+                        help='Coalescing windows to compare, in milliseconds (0 disables)')
+    parser.add_argument('--max-batch', type=int, default=50, help='Results per coalesced frame')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from django.test import override_settings
+    from rest_framework_simplejwt.tokens import RefreshToken
+    from auth_app.models import User
+
+    with test_database(), override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS):
+        user = User.objects.create_user(username='bench', email='bench@example.com', password='BenchPass123')
+        token = str(RefreshToken.for_user(user).access_token)
+
+        results = {}
+        for window in args.windows:
+            coalesce = {'WINDOW': window / 1000, 'MAX_BATCH': args.max_batch}
+            with override_settings(GAME_WS_COALESCE=coalesce):
+                results[f'{window}ms'] = asyncio.run(
+                    run(token, user.id, args.tabs, args.events, args.burst, args.gap_ms / 1000)
+                )
+
+    report(results, args.output)
+
+if __name__ == '__main__':
+    main()
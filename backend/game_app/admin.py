@@ -1,7 +1,14 @@
+import hashlib
+from urllib.parse import urlencode
+from django.conf import settings
 from django.contrib import admin
-from django.db.models import Count, Avg, Sum
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Avg, Sum, Q
 from django.utils.html import format_html
-from .models import GameResult
+from .cache import bump_version
+from .models import DailyGameRollup, GameResult, UserGameStats
 
 @admin.register(GameResult)
 class GameResultAdmin(admin.ModelAdmin):
@@ -26,6 +33,17 @@ class GameResultAdmin(admin.ModelAdmin):
             return format_html('<span style="color: red; font-weight: bold;">LOSE</span>')
     get_result_color.short_description = 'Result'
     
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        transaction.on_commit(lambda: bump_version(obj.user_id))
+    
+    def delete_queryset(self, request, queryset):
+        # Results have no delete signal receiver, so bump each user once here
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for user_id in user_ids:
+            transaction.on_commit(lambda user_id=user_id: bump_version(user_id))
+    
     def changelist_view(self, request, extra_context=None):
         # Add statistics to the changelist view
         response = super().changelist_view(request, extra_context=extra_context)
@@ -35,21 +53,117 @@ class GameResultAdmin(admin.ModelAdmin):
         except (AttributeError, KeyError):
             return response
         
-        # Calculate statistics
-        total_games = qs.count()
-        wins = qs.filter(result='win').count()
-        losses = qs.filter(result='lose').count()
-        total_prize = qs.filter(result='win').aggregate(total=Sum('prize'))['total'] or 0
-        avg_prize = qs.filter(result='win').aggregate(avg=Avg('prize'))['avg'] or 0
+        cache_key = self.get_stats_cache_key(request)
+        stats = cache.get(cache_key)
+        if stats is None:
+            stats = self.get_stats(request, qs)
+            cache.set(cache_key, stats, timeout=settings.GAME_ADMIN_STATS['CACHE_TTL'])
         
         # Add to context
-        response.context_data['stats'] = {
+        response.context_data['stats'] = stats
+        
+        return response
+    
+    def get_stats_cache_key(self, request):
+        """Cache statistics per filter combination, ignoring paging and ordering"""
+        params = sorted(
+            (key, value) for key, value in request.GET.lists()
+            if key not in (PAGE_VAR, ORDER_VAR)
+        )
+        digest = hashlib.md5(urlencode(params, doseq=True).encode()).hexdigest()
+        return f'admin:gameresult:stats:{digest}'
+    
+    def get_stats(self, request, qs):
+        """Calculate statistics of the filtered changelist queryset"""
+        filtered = any(key not in (PAGE_VAR, ORDER_VAR) for key in request.GET)
+        if settings.GAME_ADMIN_STATS['USE_ESTIMATES'] and not filtered:
+            stats = self.get_estimated_stats()
+            if stats is not None:
+                return stats
+        
+        # One conditional aggregation instead of a query per figure
+        wins = Q(result='win')
+        totals = qs.select_related(None).order_by().aggregate(
+            total_games=Count('id'),
+            wins=Count('id', filter=wins),
+            losses=Count('id', filter=Q(result='lose')),
+            total_prize=Sum('prize', filter=wins),
+            avg_prize=Avg('prize', filter=wins)
+        )
+        return self.build_stats(
+            totals['total_games'], totals['wins'], totals['losses'],
+            totals['total_prize'] or 0, totals['avg_prize'] or 0
+        )
+    
+    def get_estimated_stats(self):
+        """
+        Statistics of the whole table without scanning it.
+        
+        The game count comes from the database's table statistics, the win and
+        prize figures from the per-user statistics table.
+        """
+        total_games = estimated_row_count(GameResult)
+        if total_games is None:
+            return None
+        
+        totals = UserGameStats.objects.aggregate(wins=Sum('wins'), total_prize=Sum('total_prize'))
+        wins = totals['wins'] or 0
+        total_prize = totals['total_prize'] or 0
+        stats = self.build_stats(
+            total_games, wins, max(total_games - wins, 0),
+            total_prize, total_prize / wins if wins else 0
+        )
+        stats['estimated'] = True
+        return stats
+    
+    def build_stats(self, total_games, wins, losses, total_prize, avg_prize):
+        return {
             'total_games': total_games,
             'wins': wins,
             'losses': losses,
             'win_rate': round((wins / total_games * 100) if total_games > 0 else 0, 1),
             'total_prize': round(total_prize, 2),
             'avg_prize': round(avg_prize, 2),
+            'estimated': False,
         }
-        
-        return response
+
+
+@admin.register(DailyGameRollup)
+class DailyGameRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'user', 'plays', 'wins', 'prize_sum', 'max_prize', 'updated_at')
+    list_filter = ('day',)
+    search_fields = ('user__username', 'user__email')
+    ordering = ('-day',)
+    readonly_fields = ('day', 'user', 'plays', 'wins', 'prize_sum', 'max_prize', 'rolled_up_to', 'updated_at')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
+
+def estimated_row_count(model):
+    """Return the row count estimate kept by the database, or None if unavailable"""
+    table = model._meta.db_table
+    if connection.vendor == 'mysql':
+        sql = 'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+    else:
+        return None
+    
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+@admin.register(UserGameStats)
+class UserGameStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'games', 'wins', 'total_prize', 'best_prize', 'last_played')
+    search_fields = ('user__username', 'user__email')
+    ordering = ('-total_prize',)
+    readonly_fields = ('user', 'games', 'wins', 'total_prize', 'best_prize', 'last_played', 'updated_at')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class GameAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'game_app'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .rules import get_payout_table
+        
+        # Fail at startup on invalid GAME_RULES
+        get_payout_table()
@@ -0,0 +1,150 @@
+"""
+Native async versions of the game endpoints.
+
+These views run directly on the Daphne event loop: the ORM is used through
+its async API and the channel layer is awaited instead of being wrapped in
+``async_to_sync``. Only storing a play, which needs a transaction, still runs
+in a worker thread. Only JWT bearer authentication is supported.
+"""
+
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from channels.layers import get_channel_layer
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from auth_app.authentication import get_active_user, user_from_claims
+from auth_app.user_cache import get_cached_user
+from numberplay.ratelimit import acheck, rate_limit_headers
+from .serializers import GAME_RESULT_VALUES, GamePlaySerializer, render_game_results
+from .models import GameResult, UserGameStats
+from .services import PLAY_RATE, PLAY_RATELIMIT_GROUP, resolve_play, result_message, save_game_results
+from .cache import aget_or_set
+from .encoding import result_event
+from .views import build_statistics
+
+def async_api_view(method, ratelimit_group, rate):
+    """Authenticate, rate limit and method-check an async JSON view"""
+    def decorator(view_func):
+        async def wrapper(request, *args, **kwargs):
+            if request.method != method:
+                return JsonResponse(
+                    {'detail': f'Method "{request.method}" not allowed.'},
+                    status=status.HTTP_405_METHOD_NOT_ALLOWED
+                )
+
+            authenticator = JWTAuthentication()
+            try:
+                user = await authenticate(authenticator, request)
+            except AuthenticationFailed as e:
+                return _unauthorized(authenticator, request, e.detail)
+            if user is None:
+                return _unauthorized(
+                    authenticator, request,
+                    {'detail': 'Authentication credentials were not provided.'}
+                )
+            request.user = user
+
+            # Share the limit with the sync view of the same endpoint
+            limit = await acheck(ratelimit_group, user, rate)
+            if limit is not None and not limit.allowed:
+                response = JsonResponse(
+                    {'detail': 'Request was throttled.'},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS
+                )
+            else:
+                response = await view_func(request, *args, **kwargs)
+
+            for header, value in rate_limit_headers(limit).items():
+                response[header] = value
+            return response
+
+        # Django 4.2's csrf_exempt does not preserve coroutine functions
+        wrapper.csrf_exempt = True
+        wrapper.__name__ = view_func.__name__
+        wrapper.__doc__ = view_func.__doc__
+        return wrapper
+    return decorator
+
+async def authenticate(authenticator, request):
+    """Resolve the user of a JWT bearer token as ClaimsJWTAuthentication does"""
+    header = authenticator.get_header(request)
+    if header is None:
+        return None
+
+    raw_token = authenticator.get_raw_token(header)
+    if raw_token is None:
+        return None
+
+    user = user_from_claims(authenticator.get_validated_token(raw_token))
+    if request.method in SAFE_METHODS:
+        return user
+    return get_cached_user(user.pk) or await sync_to_async(get_active_user)(user.pk)
+
+def _unauthorized(authenticator, request, detail):
+    if not isinstance(detail, dict):
+        detail = {'detail': detail}
+    response = JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+    response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+    return response
+
+@async_api_view('POST', PLAY_RATELIMIT_GROUP, PLAY_RATE)
+async def play_game(request):
+    """Async API endpoint for playing the game"""
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError as e:
+        return JsonResponse(
+            {'detail': f'JSON parse error - {e}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    serializer = GamePlaySerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    number = serializer.validated_data['number']
+    result, prize = resolve_play(number)
+
+    # Save game result; the async ORM has no transactions, so the insert and
+    # the statistics update run together in a worker thread
+    await sync_to_async(save_game_results)(request.user, [(number, result, prize)])
+
+    response_data = result_message(number, result, prize)
+
+    # Send result via WebSocket
+    channel_layer = get_channel_layer()
+    await channel_layer.group_send(
+        f"user_{request.user.id}",
+        result_event([response_data])
+    )
+
+    return JsonResponse(response_data, status=status.HTTP_200_OK)
+
+@async_api_view('GET', 'game_app.views.game_history', '30/m')
+async def game_history(request):
+    """Async version of the user's game history"""
+    async def build():
+        results = [
+            row async for row in
+            GameResult.objects.filter(user=request.user).values(*GAME_RESULT_VALUES)[:3]
+        ]
+        return render_game_results(results)
+
+    data = await aget_or_set('history', request.user.id, build)
+    return JsonResponse(data, safe=False)
+
+@async_api_view('GET', 'game_app.views.user_statistics', '20/m')
+async def user_statistics(request):
+    """Async version of the user's game statistics"""
+    async def build():
+        stats = await UserGameStats.objects.filter(user=request.user).afirst()
+        if stats is None:
+            return build_statistics(0, 0)
+        return build_statistics(
+            stats.games, stats.wins, stats.total_prize, stats.best_prize, stats.last_played
+        )
+
+    return JsonResponse(await aget_or_set('statistics', request.user.id, build))
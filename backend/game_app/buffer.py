@@ -0,0 +1,355 @@
+"""
+Write-behind buffer for game results.
+
+When ``GAME_WRITE_BEHIND['ENABLED']`` is set, plays are acknowledged as soon as
+they are appended to a buffer, and a periodic Celery task flushes the buffer
+into ``GameResult`` with batched ``bulk_create`` calls.
+
+Flushing is at-least-once: a claimed batch stays in an in-flight list until
+it has been committed, and a flush that finds a non-empty in-flight list
+(e.g. after a worker crash) writes that batch again before claiming new
+records. Every record carries a ``play_id`` stored in a unique column, so a
+batch written again only stores (and counts) the plays that are missing.
+
+Records that can never be stored, because they are malformed or their user
+no longer exists, are moved to a dead-letter list (``<KEY>:dead``) and logged
+so that they do not block the batches behind them. A batch that keeps failing
+for another reason is stored in halves after ``MAX_ATTEMPTS`` flushes, and
+the records that still fail on their own are dead-lettered.
+"""
+
+import json
+import logging
+import threading
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, InterfaceError, OperationalError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+from .models import GameResult
+
+logger = logging.getLogger(__name__)
+
+def write_behind_enabled():
+    """Return True if plays should be buffered instead of inserted directly"""
+    return settings.GAME_WRITE_BEHIND['ENABLED']
+
+def get_result_buffer():
+    """Return an instance of the configured buffer backend"""
+    conf = settings.GAME_WRITE_BEHIND
+    return import_string(conf['BACKEND'])(conf['KEY'])
+
+def encode_result(user_id, number, result, prize, created_at=None):
+    """Encode a play as a buffer record"""
+    return json.dumps({
+        'user_id': user_id,
+        'number': number,
+        'result': result,
+        'prize': None if prize is None else str(prize),
+        'created_at': (created_at or timezone.now()).isoformat(),
+        'play_id': uuid.uuid4().hex,
+    })
+
+def decode_result(record):
+    """Decode a buffer record into an unsaved GameResult"""
+    data = json.loads(record)
+    created_at = parse_datetime(data['created_at'])
+    if created_at is None:
+        raise ValueError(f"Invalid created_at: {data['created_at']!r}")
+    play_id = data.get('play_id')
+    return GameResult(
+        user_id=data['user_id'],
+        number=data['number'],
+        result=data['result'],
+        prize=None if data['prize'] is None else Decimal(data['prize']),
+        created_at=created_at,
+        play_id=None if play_id is None else uuid.UUID(play_id),
+    )
+
+class BaseResultBuffer:
+    """Interface of write-behind buffer backends"""
+
+    def __init__(self, key):
+        self.key = key
+        self.processing_key = f'{key}:processing'
+        self.dead_key = f'{key}:dead'
+        self.attempts_key = f'{key}:attempts'
+        self.lock_key = f'{key}:lock'
+
+    def push(self, records):
+        """Append encoded records to the buffer"""
+        raise NotImplementedError
+
+    def claim(self, batch_size):
+        """
+        Move up to batch_size records to the in-flight list and return them.
+
+        If a previous batch was never acknowledged it is returned again.
+        """
+        raise NotImplementedError
+
+    def ack(self):
+        """Drop the in-flight batch once it has been committed"""
+        raise NotImplementedError
+
+    def record_failure(self):
+        """Count a failed flush of the in-flight batch and return its failures so far"""
+        raise NotImplementedError
+
+    def pending(self):
+        """Return the number of buffered records, including in-flight ones"""
+        raise NotImplementedError
+
+    def dead_letter(self, records):
+        """Set aside records that can never be stored"""
+        raise NotImplementedError
+
+    @contextmanager
+    def flush_lock(self, timeout):
+        """Ensure only one flush runs at a time; yields False if already locked"""
+        raise NotImplementedError
+
+class LocMemResultBuffer(BaseResultBuffer):
+    """In-process buffer for tests and single-process development"""
+
+    _lock = threading.Lock()
+    _queues = {}
+
+    def _state(self):
+        return self._queues.setdefault(self.key, {
+            'queue': deque(),
+            'processing': [],
+            'dead': [],
+            'failures': 0,
+            'flushing': False,
+        })
+
+    def push(self, records):
+        with self._lock:
+            self._state()['queue'].extend(records)
+
+    def claim(self, batch_size):
+        with self._lock:
+            state = self._state()
+            if not state['processing']:
+                queue = state['queue']
+                state['processing'] = [queue.popleft() for _ in range(min(batch_size, len(queue)))]
+            return list(state['processing'])
+
+    def ack(self):
+        with self._lock:
+            state = self._state()
+            state['processing'] = []
+            state['failures'] = 0
+
+    def record_failure(self):
+        with self._lock:
+            state = self._state()
+            state['failures'] += 1
+            return state['failures']
+
+    def pending(self):
+        with self._lock:
+            state = self._state()
+            return len(state['queue']) + len(state['processing'])
+
+    def dead_letter(self, records):
+        with self._lock:
+            self._state()['dead'].extend(records)
+
+    def dead_letters(self):
+        with self._lock:
+            return list(self._state()['dead'])
+
+    def clear(self):
+        with self._lock:
+            self._queues.pop(self.key, None)
+
+    @contextmanager
+    def flush_lock(self, timeout):
+        with self._lock:
+            state = self._state()
+            acquired = not state['flushing']
+            state['flushing'] = True
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                state['flushing'] = False
+
+class RedisResultBuffer(BaseResultBuffer):
+    """Durable buffer backed by a Redis list"""
+
+    # Returns the in-flight batch if there is one, otherwise atomically moves
+    # up to ARGV[1] records from the head of the queue to the in-flight list.
+    CLAIM_SCRIPT = """
+    local items = redis.call('LRANGE', KEYS[2], 0, -1)
+    if #items > 0 then
+        return items
+    end
+    items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+    if #items > 0 then
+        redis.call('LTRIM', KEYS[1], #items, -1)
+        for i = 1, #items, 1000 do
+            redis.call('RPUSH', KEYS[2], unpack(items, i, math.min(i + 999, #items)))
+        end
+    end
+    return items
+    """
+
+    RELEASE_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, key):
+        from numberplay.redis_client import get_redis
+        super().__init__(key)
+        self.redis = get_redis()
+
+    def push(self, records):
+        if records:
+            self.redis.rpush(self.key, *records)
+
+    def claim(self, batch_size):
+        claim = self.redis.register_script(self.CLAIM_SCRIPT)
+        return claim(keys=[self.key, self.processing_key], args=[batch_size])
+
+    def ack(self):
+        self.redis.delete(self.processing_key, self.attempts_key)
+
+    def record_failure(self):
+        return self.redis.incr(self.attempts_key)
+
+    def pending(self):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.llen(self.key)
+        pipe.llen(self.processing_key)
+        return sum(pipe.execute())
+
+    def dead_letter(self, records):
+        if records:
+            self.redis.rpush(self.dead_key, *records)
+
+    @contextmanager
+    def flush_lock(self, timeout):
+        token = uuid.uuid4().hex
+        acquired = bool(self.redis.set(self.lock_key, token, nx=True, px=int(timeout * 1000)))
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                release = self.redis.register_script(self.RELEASE_SCRIPT)
+                release(keys=[self.lock_key], args=[token])
+
+def buffer_results(user_id, plays):
+    """Append (number, result, prize) plays of a user to the write-behind buffer"""
+    created_at = timezone.now()
+    get_result_buffer().push([
+        encode_result(user_id, number, result, prize, created_at)
+        for number, result, prize in plays
+    ])
+
+def flush_result_buffer(buffer=None, batch_size=None, max_batches=None):
+    """Flush buffered plays into GameResult and return the number of rows written"""
+    conf = settings.GAME_WRITE_BEHIND
+    buffer = buffer or get_result_buffer()
+    batch_size = batch_size or conf['BATCH_SIZE']
+    max_batches = max_batches or conf['MAX_BATCHES_PER_FLUSH']
+
+    flushed = 0
+    with buffer.flush_lock(timeout=conf['LOCK_TIMEOUT']) as acquired:
+        if not acquired:
+            return 0
+
+        for _ in range(max_batches):
+            records = buffer.claim(batch_size)
+            if not records:
+                break
+
+            decoded = []
+            malformed = []
+            for record in records:
+                try:
+                    decoded.append((record, decode_result(record)))
+                except (ValueError, KeyError, TypeError, InvalidOperation):
+                    malformed.append(record)
+            if malformed:
+                logger.error(f"Dead-lettering {len(malformed)} malformed buffered game results: {malformed!r}")
+                buffer.dead_letter(malformed)
+
+            stored = []
+            if decoded:
+                try:
+                    stored = store_batch(buffer, decoded)
+                except Exception:
+                    failures = buffer.record_failure()
+                    if failures < conf['MAX_ATTEMPTS']:
+                        raise
+                    logger.exception(
+                        f"Buffered batch of {len(decoded)} game results failed {failures} times; "
+                        f"storing it in halves"
+                    )
+                    stored = store_bisected(buffer, decoded)
+            buffer.ack()
+            flushed += len(stored)
+
+    return flushed
+
+def store_batch(buffer, decoded):
+    """
+    Store (record, GameResult) pairs of a claimed batch and return the stored results.
+
+    Plays already stored by an earlier attempt are skipped. If the batch
+    violates a constraint, plays of users that no longer exist are
+    dead-lettered and the rest is stored again; any other error is raised and
+    leaves the batch in flight.
+    """
+    from .services import store_game_results
+
+    try:
+        return store_game_results([game_result for _, game_result in decoded])
+    except IntegrityError:
+        user_ids = {game_result.user_id for _, game_result in decoded}
+        existing = set(get_user_model().objects.filter(id__in=user_ids).values_list('id', flat=True))
+        rejected = [record for record, game_result in decoded if game_result.user_id not in existing]
+        if not rejected:
+            raise
+
+    logger.error(f"Dead-lettering {len(rejected)} buffered game results of deleted users: {rejected!r}")
+    buffer.dead_letter(rejected)
+    kept = [record for record, game_result in decoded if game_result.user_id in existing]
+    if not kept:
+        return []
+    return store_game_results([game_result for _, game_result in redecode(kept)])
+
+def store_bisected(buffer, decoded):
+    """Store a batch that keeps failing in halves, dead-lettering records that fail on their own"""
+    try:
+        return store_batch(buffer, decoded)
+    except (OperationalError, InterfaceError):
+        # The database is unavailable, not the records; retry the batch later
+        raise
+    except Exception:
+        if len(decoded) == 1:
+            logger.exception(f"Dead-lettering buffered game result that cannot be stored: {decoded[0][0]!r}")
+            buffer.dead_letter([decoded[0][0]])
+            return []
+
+    middle = len(decoded) // 2
+    records = [record for record, _ in decoded]
+    return (
+        store_bisected(buffer, redecode(records[:middle]))
+        + store_bisected(buffer, redecode(records[middle:]))
+    )
+
+def redecode(records):
+    # Fresh instances: a failed insert may have assigned primary keys
+    return [(record, decode_result(record)) for record in records]
@@ -0,0 +1,113 @@
+"""
+Versioned per-user cache for game responses.
+
+Every user has a version counter that is bumped whenever new game results of
+theirs are committed. Cached responses are keyed by that version, so a new
+result makes older entries unreachable instead of having to find and delete
+them, and a response is never served once a newer result exists.
+"""
+
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.core.cache import caches
+
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+def _cache():
+    return caches[settings.GAME_RESPONSE_CACHE['ALIAS']]
+
+def _version_key(user_id):
+    return f'game:version:{user_id}'
+
+def _response_key(namespace, user_id, version, variant):
+    return f'game:{namespace}:{user_id}:{version}:{variant}'
+
+def _initial_version():
+    # A lost (evicted) counter restarts above every version handed out
+    # before it, so entries cached under old versions stay unreachable
+    return time.time_ns() // 1000
+
+def _record(namespace, outcome):
+    with _stats_lock:
+        _stats[(namespace, outcome)] += 1
+
+def get_version(user_id):
+    """Return the current cache version of a user's game data"""
+    cache = _cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+def bump_version(user_id):
+    """Invalidate every cached response of a user"""
+    cache = _cache()
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, _initial_version(), timeout=None):
+            cache.incr(key)
+
+def get_or_set(namespace, user_id, build, variant=''):
+    """Return the cached response of a user, building and caching it on a miss"""
+    conf = settings.GAME_RESPONSE_CACHE
+    if not conf['ENABLED']:
+        return build()
+
+    cache = _cache()
+    key = _response_key(namespace, user_id, get_version(user_id), variant)
+    data = cache.get(key)
+    if data is not None:
+        _record(namespace, 'hits')
+        return data
+
+    _record(namespace, 'misses')
+    data = build()
+    cache.set(key, data, timeout=conf['TTL'])
+    return data
+
+async def aget_or_set(namespace, user_id, build, variant=''):
+    """Async version of get_or_set; ``build`` is a coroutine function"""
+    conf = settings.GAME_RESPONSE_CACHE
+    if not conf['ENABLED']:
+        return await build()
+
+    cache = _cache()
+    version_key = _version_key(user_id)
+    version = await cache.aget(version_key)
+    if version is None:
+        await cache.aadd(version_key, _initial_version(), timeout=None)
+        version = await cache.aget(version_key)
+
+    key = _response_key(namespace, user_id, version, variant)
+    data = await cache.aget(key)
+    if data is not None:
+        _record(namespace, 'hits')
+        return data
+
+    _record(namespace, 'misses')
+    data = await build()
+    await cache.aset(key, data, timeout=conf['TTL'])
+    return data
+
+def cache_stats():
+    """Return hit/miss counters of this process per namespace"""
+    with _stats_lock:
+        stats = {}
+        for (namespace, outcome), count in _stats.items():
+            stats.setdefault(namespace, {'hits': 0, 'misses': 0})[outcome] = count
+    for counts in stats.values():
+        total = counts['hits'] + counts['misses']
+        counts['hit_rate'] = round(counts['hits'] / total, 4) if total else 0.0
+    return stats
+
+def reset_cache_stats():
+    """Reset the hit/miss counters of this process"""
+    with _stats_lock:
+        _stats.clear()
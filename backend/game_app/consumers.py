@@ -1,8 +1,25 @@
+import asyncio
 import json
+import uuid
+from django.conf import settings
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from numberplay.ratelimit import check
+from .encoding import (
+    JSON, MSGPACK, available_protocols, dumps_json, dumps_msgpack,
+    loads_msgpack, result_event, result_frame,
+)
+from .serializers import GamePlaySerializer
+from .services import PLAY_RATE, PLAY_RATELIMIT_GROUP, resolve_play, result_message, save_game_results
 
 class GameConsumer(AsyncWebsocketConsumer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Results waiting for the coalescing window to close
+        self.pending_results = []
+        self.flush_task = None
+        self.protocol = JSON
+
     async def connect(self):
         """Handle WebSocket connection"""
         try:
@@ -17,13 +34,18 @@ class GameConsumer(AsyncWebsocketConsumer):
                     self.channel_name
                 )
 
-                await self.accept()
+                # Clients asking for the msgpack subprotocol get binary frames
+                if MSGPACK in self.scope.get('subprotocols', []) and MSGPACK in available_protocols():
+                    self.protocol = MSGPACK
+                    await self.accept(subprotocol=MSGPACK)
+                else:
+                    await self.accept()
 
                 # Send connection confirmation
-                await self.send(text_data=json.dumps({
+                await self.send_frame({
                     'type': 'connection_established',
                     'message': 'Connected to game channel'
-                }))
+                })
             else:
                 # Reject connection for unauthenticated users
                 await self.close()
@@ -32,6 +54,9 @@ class GameConsumer(AsyncWebsocketConsumer):
 
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        
         if hasattr(self, 'room_group_name'):
             # Leave room group
             await self.channel_layer.group_discard(
@@ -39,31 +64,131 @@ class GameConsumer(AsyncWebsocketConsumer):
                 self.channel_name
             )
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """Handle WebSocket messages from client"""
         try:
-            text_data_json = json.loads(text_data)
-            message_type = text_data_json.get('type', 'message')
-            
-            if message_type == 'ping':
-                # Respond to ping with pong
-                await self.send(text_data=json.dumps({
-                    'type': 'pong',
-                    'message': 'pong'
-                }))
-            
-        except json.JSONDecodeError as e:
-            await self.send(text_data=json.dumps({
+            if bytes_data is not None:
+                data = loads_msgpack(bytes_data)
+            else:
+                data = json.loads(text_data)
+            if not isinstance(data, dict):
+                raise ValueError('Message is not an object')
+        except ValueError:
+            await self.send_frame({
                 'type': 'error',
-                'message': 'Invalid JSON format'
-            }))
+                'message': 'Invalid JSON format' if bytes_data is None else 'Invalid MessagePack format'
+            })
+            return
+        
+        message_type = data.get('type', 'message')
+        
+        if message_type == 'ping':
+            # Respond to ping with pong
+            await self.send_frame({
+                'type': 'pong',
+                'message': 'pong'
+            })
+        
+        elif message_type == 'play':
+            await self.play(data)
 
-    async def game_result(self, event):
-        """Handle game result messages"""
-        message = event['message']
+    async def send_frame(self, frame):
+        """Encode a frame for this socket's protocol and send it"""
+        if self.protocol == MSGPACK:
+            await self.send(bytes_data=dumps_msgpack(frame))
+        else:
+            await self.send(text_data=dumps_json(frame))
+
+    async def send_encoded(self, encoded, frame):
+        """Send the producer's encoding of a frame, or encode it if there is none for this socket's protocol"""
+        if self.protocol not in encoded:
+            await self.send_frame(frame)
+        elif self.protocol == MSGPACK:
+            await self.send(bytes_data=encoded[MSGPACK])
+        else:
+            await self.send(text_data=encoded[JSON])
+
+    async def play(self, data):
+        """Play the game and reply with the result on this socket"""
+        # Echo the client's id so pipelined plays can be matched to replies
+        request_id = data.get('request_id') or uuid.uuid4().hex
+        
+        serializer = GamePlaySerializer(data=data)
+        if not serializer.is_valid():
+            await self.send_frame({
+                'type': 'error',
+                'request_id': request_id,
+                'errors': serializer.errors
+            })
+            return
+        
+        number = serializer.validated_data['number']
+        result, prize = resolve_play(number)
+        if not await self.store_play(number, result, prize):
+            await self.send_frame({
+                'type': 'error',
+                'request_id': request_id,
+                'message': 'Request was throttled.'
+            })
+            return
         
-        # Send game result to WebSocket
-        await self.send(text_data=json.dumps({
+        message = result_message(number, result, prize)
+        await self.send_frame({
             'type': 'game_result',
+            'request_id': request_id,
             'data': message
-        })) 
\ No newline at end of file
+        })
+        
+        # Other sockets of the user get the same broadcast as for REST plays
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            result_event([message], sender=self.channel_name)
+        )
+
+    @database_sync_to_async
+    def store_play(self, number, result, prize):
+        """Save a play unless the user is over the play rate limit"""
+        limit = check(PLAY_RATELIMIT_GROUP, self.user, PLAY_RATE)
+        if limit is not None and not limit.allowed:
+            return False
+        
+        save_game_results(self.user, [(number, result, prize)])
+        return True
+
+    async def game_result(self, event):
+        """Handle game result messages"""
+        if event.get('sender') == self.channel_name:
+            # Already answered directly
+            return
+        
+        # Batch plays arrive as one aggregated message
+        results = event['messages'] if 'messages' in event else [event['message']]
+        
+        conf = settings.GAME_WS_COALESCE
+        if conf['WINDOW'] <= 0:
+            # Forward the producer's encoding verbatim when it has one
+            await self.send_encoded(event.get('encoded', {}), result_frame(results))
+            return
+        
+        self.pending_results.extend(results)
+        if len(self.pending_results) >= conf['MAX_BATCH']:
+            await self.flush_results()
+        elif self.flush_task is None:
+            self.flush_task = asyncio.create_task(self.flush_later(conf['WINDOW']))
+
+    async def flush_later(self, delay):
+        """Flush pending results once the coalescing window has passed"""
+        await asyncio.sleep(delay)
+        self.flush_task = None
+        await self.flush_results()
+
+    async def flush_results(self):
+        """Send pending results in frames of at most MAX_BATCH results"""
+        if self.flush_task is not None and self.flush_task is not asyncio.current_task():
+            self.flush_task.cancel()
+            self.flush_task = None
+        
+        results, self.pending_results = self.pending_results, []
+        max_batch = settings.GAME_WS_COALESCE['MAX_BATCH']
+        for i in range(0, len(results), max_batch):
+            await self.send_frame(result_frame(results[i:i + max_batch]))
@@ -0,0 +1,67 @@
+"""
+Encoding of WebSocket frames.
+
+Frames are JSON text by default (with orjson when installed) or MessagePack
+for sockets that negotiated the ``msgpack`` subprotocol. Game results are
+encoded as JSON once by the producer and carried in the channel layer event,
+so every JSON ``GameConsumer`` in the user's group forwards the same text
+instead of serialising the frame again. MessagePack sockets are rare, so they
+encode the frame themselves when they receive it.
+"""
+
+import json
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack comes with channels_redis
+    msgpack = None
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+
+def _default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not serializable')
+
+def dumps_json(obj):
+    """Encode an object as JSON text"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default).decode()
+    return json.dumps(obj, default=_default, separators=(',', ':'))
+
+def dumps_msgpack(obj):
+    """Encode an object as MessagePack bytes"""
+    return msgpack.packb(obj, default=_default)
+
+def loads_msgpack(data):
+    """Decode MessagePack bytes"""
+    return msgpack.unpackb(data)
+
+def available_protocols():
+    """Return the frame encodings this process can produce"""
+    return (JSON, MSGPACK) if msgpack is not None else (JSON,)
+
+def result_frame(results):
+    """Return a game_result frame, or a game_results frame for several results"""
+    if len(results) == 1:
+        return {'type': 'game_result', 'data': results[0]}
+    return {'type': 'game_results', 'data': results}
+
+def result_event(results, sender=None):
+    """Build the channel layer event that pushes results to a user's sockets"""
+    event = {'type': 'game.result'}
+    if len(results) == 1:
+        event['message'] = results[0]
+    else:
+        event['messages'] = results
+    event['encoded'] = {JSON: dumps_json(result_frame(results))}
+    if sender is not None:
+        event['sender'] = sender
+    return event
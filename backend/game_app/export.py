@@ -0,0 +1,74 @@
+"""
+Streaming export of a user's game history.
+
+Rows are read in keyset chunks of ``GAME_EXPORT_CHUNK_SIZE`` and encoded one
+at a time, so memory use stays flat however long the history is. Seeking by
+(created_at, id) is used instead of ``QuerySet.iterator()`` because the MySQL
+driver buffers a whole result set on the client before Django sees a row.
+"""
+
+import csv
+import json
+from .pagination import seek
+
+EXPORT_FIELDS = ('id', 'number', 'result', 'prize', 'created_at')
+
+class _Echo:
+    """File-like object that returns what is written, for csv.writer"""
+    def write(self, value):
+        return value
+
+def _row_values(row):
+    game_id, number, result, prize, created_at = row
+    return game_id, number, result, None if prize is None else str(prize), created_at.isoformat()
+
+def ndjson_header():
+    return ''
+
+def ndjson_line(row):
+    return json.dumps(dict(zip(EXPORT_FIELDS, _row_values(row)))) + '\n'
+
+_csv_writer = csv.writer(_Echo())
+
+def csv_header():
+    return _csv_writer.writerow(EXPORT_FIELDS)
+
+def csv_line(row):
+    values = _row_values(row)
+    return _csv_writer.writerow(['' if value is None else value for value in values])
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_header, ndjson_line),
+    'csv': ('text/csv', csv_header, csv_line),
+}
+
+def iter_rows(queryset, chunk_size):
+    """Yield value tuples of game results newest first, one chunk per query"""
+    position = None
+    while True:
+        rows = list(seek(queryset, position).values_list(*EXPORT_FIELDS)[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        position = (rows[-1][4], rows[-1][0])
+
+async def aiter_rows(queryset, chunk_size):
+    """Async version of iter_rows"""
+    position = None
+    while True:
+        rows = [row async for row in seek(queryset, position).values_list(*EXPORT_FIELDS)[:chunk_size]]
+        for row in rows:
+            yield row
+        if len(rows) < chunk_size:
+            return
+        position = (rows[-1][4], rows[-1][0])
+
+def stream(rows, header, line):
+    yield header()
+    for row in rows:
+        yield line(row)
+
+async def astream(rows, header, line):
+    yield header()
+    async for row in rows:
+        yield line(row)
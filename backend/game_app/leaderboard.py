@@ -0,0 +1,199 @@
+"""
+Leaderboards kept in sorted sets.
+
+Every committed win adds its prize and one win to the all-time and daily
+boards of its user with ``ZINCRBY``, so reading the top of a board or a
+user's rank never touches ``GameResult``. Daily boards are keyed by the local
+date of the play and expire after ``GAME_LEADERBOARD['DAILY_TTL']`` seconds.
+
+Updates happen after the database commit and are best effort: if the backend
+is unreachable the play still succeeds and the error is logged. Run the
+``rebuild_leaderboard`` command to resynchronise the boards.
+"""
+
+import logging
+import threading
+import redis
+from collections import defaultdict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('prize', 'wins')
+WINDOWS = ('all', 'daily')
+
+def leaderboard_enabled():
+    """Return True if plays should update the leaderboards"""
+    return settings.GAME_LEADERBOARD['ENABLED']
+
+def get_leaderboard():
+    """Return an instance of the configured leaderboard backend"""
+    return import_string(settings.GAME_LEADERBOARD['BACKEND'])()
+
+def board_key(metric, window, day=None):
+    """Return the key of a board; daily boards default to today"""
+    prefix = settings.GAME_LEADERBOARD['KEY_PREFIX']
+    if window == 'all':
+        return f'{prefix}:{metric}:all'
+    day = day or timezone.localdate()
+    return f'{prefix}:{metric}:{day:%Y%m%d}'
+
+class BaseLeaderboard:
+    """Interface of leaderboard backends"""
+
+    def increment(self, scores, ttls):
+        """Add {key: {user_id: amount}} to the boards and set the TTLs in {key: seconds}"""
+        raise NotImplementedError
+
+    def top(self, key, limit):
+        """Return the [(user_id, score)] of the top limit members, best first"""
+        raise NotImplementedError
+
+    def rank(self, key, user_id):
+        """Return the (0-based rank, score) of a user, or (None, 0) if absent"""
+        raise NotImplementedError
+
+    def replace(self, key, scores, ttl=None):
+        """Atomically replace a board with {user_id: score}"""
+        raise NotImplementedError
+
+class LocMemLeaderboard(BaseLeaderboard):
+    """In-process leaderboard for tests and single-process development"""
+
+    _lock = threading.Lock()
+    _boards = {}
+
+    def increment(self, scores, ttls):
+        with self._lock:
+            for key, members in scores.items():
+                board = self._boards.setdefault(key, {})
+                for user_id, amount in members.items():
+                    board[user_id] = board.get(user_id, 0) + amount
+
+    def _ranked(self, key):
+        # Same order as ZREVRANGE: score, then member, both descending
+        board = self._boards.get(key, {})
+        return sorted(board.items(), key=lambda item: (item[1], str(item[0])), reverse=True)
+
+    def top(self, key, limit):
+        with self._lock:
+            return self._ranked(key)[:limit]
+
+    def rank(self, key, user_id):
+        with self._lock:
+            for position, (member, score) in enumerate(self._ranked(key)):
+                if member == user_id:
+                    return position, score
+            return None, 0
+
+    def replace(self, key, scores, ttl=None):
+        with self._lock:
+            self._boards[key] = {user_id: score for user_id, score in scores.items() if score}
+
+    def clear(self):
+        with self._lock:
+            self._boards.clear()
+
+class RedisLeaderboard(BaseLeaderboard):
+    """Leaderboard backed by Redis sorted sets"""
+
+    def __init__(self):
+        from numberplay.redis_client import get_redis
+        self.redis = get_redis()
+
+    def increment(self, scores, ttls):
+        pipe = self.redis.pipeline(transaction=False)
+        for key, members in scores.items():
+            for user_id, amount in members.items():
+                pipe.zincrby(key, amount, user_id)
+        for key, ttl in ttls.items():
+            pipe.expire(key, ttl)
+        pipe.execute()
+
+    def top(self, key, limit):
+        return [
+            (int(member), score)
+            for member, score in self.redis.zrevrange(key, 0, limit - 1, withscores=True)
+        ]
+
+    def rank(self, key, user_id):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zrevrank(key, user_id)
+        pipe.zscore(key, user_id)
+        rank, score = pipe.execute()
+        return rank, score or 0
+
+    def replace(self, key, scores, ttl=None):
+        scores = {user_id: score for user_id, score in scores.items() if score}
+        if not scores:
+            self.redis.delete(key)
+            return
+
+        # Build the new board aside and swap it in with RENAME
+        tmp_key = f'{key}:rebuild'
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(tmp_key)
+        items = list(scores.items())
+        for i in range(0, len(items), 1000):
+            pipe.zadd(tmp_key, dict(items[i:i + 1000]))
+        if ttl:
+            pipe.expire(tmp_key, ttl)
+        pipe.rename(tmp_key, key)
+        pipe.execute()
+
+def record_results(game_results):
+    """Add the wins of committed game results to the all-time and daily boards"""
+    scores = defaultdict(lambda: defaultdict(float))
+    ttls = {}
+    for game_result in game_results:
+        if game_result.result != 'win':
+            continue
+        day = timezone.localdate(game_result.created_at)
+        for window in WINDOWS:
+            scores[board_key('prize', window, day)][game_result.user_id] += float(game_result.prize or 0)
+            scores[board_key('wins', window, day)][game_result.user_id] += 1
+        for metric in METRICS:
+            ttls[board_key(metric, 'daily', day)] = settings.GAME_LEADERBOARD['DAILY_TTL']
+
+    if not scores:
+        return
+
+    try:
+        get_leaderboard().increment(scores, ttls)
+    except redis.RedisError as e:
+        logger.warning(f"Could not update the leaderboards: {e}")
+
+def get_standings(metric, window, limit, user_id):
+    """Return the top of a board with usernames, and the rank of the given user"""
+    leaderboard = get_leaderboard()
+    day = timezone.localdate()
+    key = board_key(metric, window, day)
+    top = leaderboard.top(key, limit)
+    rank, score = leaderboard.rank(key, user_id)
+
+    cast = float if metric == 'prize' else int
+    usernames = dict(
+        get_user_model().objects.filter(pk__in=[member for member, _ in top])
+        .values_list('pk', 'username')
+    )
+    return {
+        'metric': metric,
+        'window': window,
+        'day': day.isoformat() if window == 'daily' else None,
+        'results': [
+            {
+                'rank': position + 1,
+                'user_id': member,
+                'username': usernames.get(member),
+                'score': cast(member_score)
+            }
+            for position, (member, member_score) in enumerate(top)
+        ],
+        'me': {
+            'rank': None if rank is None else rank + 1,
+            'score': cast(score)
+        }
+    }
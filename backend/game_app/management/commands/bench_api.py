@@ -0,0 +1,274 @@
+import asyncio
+import itertools
+import json
+import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.utils import timezone
+from benchmarks.harness import IN_MEMORY_CHANNEL_LAYERS, git_revision, summarize, test_database
+from game_app.cache import cache_stats, reset_cache_stats
+
+PASSWORD = 'BenchPass123'
+
+# name: (method, path, expected status, needs the bench user's token)
+ENDPOINTS = {
+    'play': ('post', '/api/game/play/', 200, True),
+    'history': ('get', '/api/game/history/', 200, True),
+    'statistics': ('get', '/api/game/statistics/', 200, True),
+    'login': ('post', '/auth/api/login/', 200, False),
+    'register': ('post', '/auth/api/register/', 201, False),
+}
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+class QueryCounter:
+    """Counts queries on every connection, including those opened by worker threads"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        with self._lock:
+            self.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        connection_created.connect(self.install)
+        self.install(connections['default'])
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self.install)
+
+class Workload:
+    """Builds the request of each endpoint for the bench user"""
+
+    def __init__(self, user, token):
+        self.user = user
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self._serial = itertools.count()
+
+    def payload(self, name):
+        if name == 'play':
+            return {'number': 842}
+        if name == 'login':
+            return {'email': self.user.email, 'password': PASSWORD}
+        if name == 'register':
+            n = next(self._serial)
+            return {
+                'username': f'bench{n}',
+                'email': f'bench{n}@example.com',
+                'password': PASSWORD,
+                'password_confirm': PASSWORD,
+            }
+        return None
+
+    def kwargs(self, name):
+        method, path, expected, authenticated = ENDPOINTS[name]
+        kwargs = {'headers': self.headers if authenticated else {}}
+        if method == 'post':
+            kwargs.update(data=self.payload(name), content_type='application/json')
+        return method, path, expected, kwargs
+
+def check_status(name, response, expected):
+    if response.status_code != expected:
+        raise CommandError(f'{name} returned {response.status_code}: {response.content[:200]!r}')
+
+async def drive_asgi(workload, name, total, concurrency, warmup, on_start):
+    """Send ``total`` requests from ``concurrency`` coroutines through the ASGI handler"""
+    client = AsyncClient()
+
+    async def request():
+        method, path, expected, kwargs = workload.kwargs(name)
+        response = await getattr(client, method)(path, **kwargs)
+        check_status(name, response, expected)
+
+    for _ in range(warmup):
+        await request()
+    on_start()
+
+    latencies = []
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            await request()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+def drive_wsgi(workload, name, total, concurrency, warmup, on_start):
+    """Send ``total`` requests from ``concurrency`` threads through the WSGI handler"""
+    local = threading.local()
+
+    def request():
+        # The test client is not thread-safe, so each thread has its own
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        method, path, expected, kwargs = workload.kwargs(name)
+        started = time.perf_counter()
+        response = getattr(local.client, method)(path, **kwargs)
+        elapsed = time.perf_counter() - started
+        check_status(name, response, expected)
+        return elapsed
+
+    for _ in range(warmup):
+        request()
+    on_start()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        latencies = list(executor.map(lambda _: request(), range(total)))
+        return latencies, time.perf_counter() - start
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the REST API in-process (no network) against a throwaway test database and '
+        'print throughput, p50/p95/p99 latency and queries per request as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Requests per endpoint (default: 500)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=10,
+            help='Concurrent clients (default: 10)'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=10,
+            help='Untimed requests per endpoint before measuring (default: 10)'
+        )
+        parser.add_argument(
+            '--endpoints',
+            nargs='+',
+            choices=list(ENDPOINTS),
+            default=list(ENDPOINTS),
+            help='Endpoints to drive (default: all)'
+        )
+        parser.add_argument(
+            '--transport',
+            choices=['asgi', 'wsgi'],
+            default='asgi',
+            help='asgi: AsyncClient on one event loop, as Daphne serves it; '
+                 'wsgi: the test client from a thread pool (default: asgi)'
+        )
+        parser.add_argument(
+            '--fast-hashers',
+            action='store_true',
+            help='Hash passwords with MD5 so login and register measure the view, not PBKDF2'
+        )
+        parser.add_argument(
+            '--no-response-cache',
+            action='store_true',
+            help='Disable the game response cache so every read hits the database'
+        )
+        parser.add_argument(
+            '--output',
+            help='Also write the JSON report to this file'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+        if (options['transport'] == 'wsgi' and options['concurrency'] > 1
+                and connections['default'].vendor == 'sqlite'):
+            # Writes from several threads hit "database table is locked"
+            raise CommandError(
+                'The SQLite test database does not allow concurrent writers; use --concurrency 1 '
+                'or point DATABASE_URL at MySQL to load-test the wsgi transport'
+            )
+
+        from celery import current_app
+        from django.conf import settings
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from auth_app.models import User
+
+        # Keep everything in process: no Redis, broker or mail server
+        overrides = {
+            'RATELIMIT_ENABLE': False,
+            'CHANNEL_LAYERS': IN_MEMORY_CHANNEL_LAYERS,
+            'GAME_LEADERBOARD': {**settings.GAME_LEADERBOARD, 'BACKEND': 'game_app.leaderboard.LocMemLeaderboard'},
+            'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+        }
+        if options['fast_hashers']:
+            overrides['PASSWORD_HASHERS'] = FAST_HASHERS
+        if options['no_response_cache']:
+            overrides['GAME_RESPONSE_CACHE'] = {**settings.GAME_RESPONSE_CACHE, 'ENABLED': False}
+
+        # Run the welcome email task in the request instead of needing a broker
+        always_eager = current_app.conf.task_always_eager
+        current_app.conf.task_always_eager = True
+        try:
+            with test_database(), override_settings(**overrides), QueryCounter() as queries:
+                user = User.objects.create_user(username='bench', email='bench@example.com', password=PASSWORD)
+                workload = Workload(user, RefreshToken.for_user(user).access_token)
+                endpoints = {
+                    name: self.measure(workload, name, queries, options)
+                    for name in options['endpoints']
+                }
+        finally:
+            current_app.conf.task_always_eager = always_eager
+
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'started_at': timezone.now().isoformat(),
+                'transport': options['transport'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'fast_hashers': options['fast_hashers'],
+                'response_cache': not options['no_response_cache'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'endpoints': endpoints,
+        }
+        text = json.dumps(report, indent=2, sort_keys=True)
+        self.stdout.write(text)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(text + '\n')
+
+    def measure(self, workload, name, queries, options):
+        """Drive one endpoint and summarize it"""
+        before = queries.count
+
+        def on_start():
+            nonlocal before
+            before = queries.count
+            reset_cache_stats()
+
+        args = (workload, name, options['requests'], options['concurrency'], options['warmup'], on_start)
+        if options['transport'] == 'asgi':
+            latencies, elapsed = asyncio.run(drive_asgi(*args))
+        else:
+            latencies, elapsed = drive_wsgi(*args)
+
+        result = summarize(latencies, elapsed)
+        result['queries_per_request'] = round((queries.count - before) / options['requests'], 2)
+        result['response_cache'] = cache_stats()
+        return result
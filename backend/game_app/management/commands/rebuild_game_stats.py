@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from game_app.cache import bump_version
+from game_app.models import GameResult, UserGameStats
+
+User = get_user_model()
+
+STAT_FIELDS = ('games', 'wins', 'total_prize', 'best_prize', 'last_played')
+
+class Command(BaseCommand):
+    help = 'Rebuild or reconcile UserGameStats from GameResult, one chunk of users at a time'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of users aggregated per query and transaction (default: 500)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report statistics rows that differ from GameResult'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        totals = {'checked': 0, 'created': 0, 'updated': 0, 'deleted': 0}
+
+        last_id = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(pk__gt=last_id)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+
+            with transaction.atomic():
+                counts = self.reconcile_chunk(user_ids, dry_run)
+            for key, value in counts.items():
+                totals[key] += value
+
+        verb = 'Would fix' if dry_run else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {totals['checked']} users. {verb} {totals['created']} missing, "
+            f"{totals['updated']} stale and {totals['deleted']} orphaned statistics rows."
+        ))
+
+    def reconcile_chunk(self, user_ids, dry_run):
+        """Compare the statistics of a chunk of users with their game results"""
+        # Lock existing rows first so concurrent plays wait and then add on top
+        existing = {
+            stats.user_id: stats
+            for stats in UserGameStats.objects.select_for_update().filter(user_id__in=user_ids)
+        }
+
+        wins = Q(result='win')
+        expected = {
+            row['user_id']: row
+            for row in GameResult.objects.filter(user_id__in=user_ids)
+            .order_by()
+            .values('user_id')
+            .annotate(
+                games=Count('id'),
+                wins=Count('id', filter=wins),
+                total_prize=Sum('prize', filter=wins),
+                best_prize=Max('prize', filter=wins),
+                last_played=Max('created_at')
+            )
+        }
+
+        to_create, to_update = [], []
+        for user_id, row in expected.items():
+            values = {
+                'games': row['games'],
+                'wins': row['wins'],
+                'total_prize': row['total_prize'] or 0,
+                'best_prize': row['best_prize'] or 0,
+                'last_played': row['last_played'],
+            }
+            stats = existing.get(user_id)
+            if stats is None:
+                to_create.append(UserGameStats(user_id=user_id, **values))
+            elif any(getattr(stats, field) != values[field] for field in STAT_FIELDS):
+                for field, value in values.items():
+                    setattr(stats, field, value)
+                to_update.append(stats)
+
+        orphaned = [user_id for user_id in existing if user_id not in expected]
+
+        if not dry_run:
+            UserGameStats.objects.bulk_create(to_create)
+            UserGameStats.objects.bulk_update(to_update, STAT_FIELDS)
+            UserGameStats.objects.filter(user_id__in=orphaned).delete()
+            for stats in to_create + to_update:
+                transaction.on_commit(lambda user_id=stats.user_id: bump_version(user_id))
+
+        return {
+            'checked': len(user_ids),
+            'created': len(to_create),
+            'updated': len(to_update),
+            'deleted': len(orphaned),
+        }
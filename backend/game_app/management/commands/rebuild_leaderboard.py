@@ -0,0 +1,61 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from game_app.leaderboard import board_key, get_leaderboard
+from game_app.models import DailyGameRollup, UserGameStats
+from game_app.rollups import rollup_game_results
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the leaderboards from UserGameStats (all-time) and DailyGameRollup (daily). '
+        'Wins committed while a board is being swapped in may be missed, so run it when traffic is low'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=1,
+            help='Number of daily boards to rebuild, ending with today (default: 1)'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days < 0:
+            raise CommandError('--days must not be negative')
+
+        leaderboard = get_leaderboard()
+
+        prize, wins = {}, {}
+        for user_id, user_wins, total_prize in (
+            UserGameStats.objects.filter(wins__gt=0)
+            .values_list('user_id', 'wins', 'total_prize')
+            .iterator(chunk_size=2000)
+        ):
+            prize[user_id] = float(total_prize)
+            wins[user_id] = user_wins
+        leaderboard.replace(board_key('prize', 'all'), prize)
+        leaderboard.replace(board_key('wins', 'all'), wins)
+        self.stdout.write(f"All-time boards: {len(wins)} players")
+
+        if days:
+            # Bring the rollups up to date first
+            rollup_game_results()
+
+        today = timezone.localdate()
+        ttl = settings.GAME_LEADERBOARD['DAILY_TTL']
+        for offset in range(days):
+            day = today - timedelta(days=offset)
+            prize, wins = {}, {}
+            for user_id, day_wins, prize_sum in (
+                DailyGameRollup.objects.filter(day=day, user__isnull=False, wins__gt=0)
+                .values_list('user_id', 'wins', 'prize_sum')
+            ):
+                prize[user_id] = float(prize_sum)
+                wins[user_id] = day_wins
+            leaderboard.replace(board_key('prize', 'daily', day), prize, ttl)
+            leaderboard.replace(board_key('wins', 'daily', day), wins, ttl)
+            self.stdout.write(f"Daily boards for {day}: {len(wins)} players")
+
+        self.stdout.write(self.style.SUCCESS('Leaderboards rebuilt.'))
@@ -0,0 +1,121 @@
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from game_app.rules import MAX_NUMBER, MIN_NUMBER, PayoutTable
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is only needed for simulations
+    np = None
+
+class Command(BaseCommand):
+    help = (
+        'Simulate plays of uniformly chosen numbers under a rule set (default: GAME_RULES) and report '
+        'the expected payout per play and, given a stake, the house edge'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--plays',
+            type=int,
+            default=10_000_000,
+            help='Number of simulated plays (default: 10000000)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1_000_000,
+            help='Plays drawn per vectorized step, bounding memory (default: 1000000)'
+        )
+        parser.add_argument(
+            '--stake',
+            help='Price of one play, to report the house edge (e.g. 500)'
+        )
+        parser.add_argument(
+            '--rules',
+            help='JSON file with a rule set in the format of GAME_RULES'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Seed of the random generator, for repeatable runs'
+        )
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('simulate_payouts requires numpy: pip install numpy')
+        if options['plays'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--plays and --chunk-size must be at least 1')
+        stake = self.parse_stake(options['stake'])
+
+        rules = self.load_rules(options['rules'])
+        table = self.build_table(rules)
+
+        # Prizes in cents as integers, indexed by number - MIN_NUMBER, so sums stay exact
+        prizes = table.winning_prizes()
+        cents = np.array([int(prize * 100) for prize in prizes], dtype=np.int64)
+        exact = sum(prizes, Decimal('0.00')) / len(prizes)
+
+        rng = np.random.default_rng(options['seed'])
+        started = time.perf_counter()
+        total = squares = wins = 0
+        remaining = options['plays']
+        while remaining > 0:
+            size = min(remaining, options['chunk_size'])
+            payouts = cents[rng.integers(0, MAX_NUMBER - MIN_NUMBER + 1, size=size)]
+            total += int(payouts.sum())
+            squares += float(np.square(payouts, dtype=np.float64).sum())
+            wins += int(np.count_nonzero(payouts))
+            remaining -= size
+        elapsed = time.perf_counter() - started
+
+        plays = options['plays']
+        mean = total / plays / 100
+        variance = max(squares / plays / 10000 - mean ** 2, 0.0)
+        standard_error = (variance / plays) ** 0.5
+
+        self.stdout.write(f"Rule set: WIN={rules['WIN']}, {len(rules['TIERS'])} tiers")
+        self.stdout.write(f"Simulated {plays} plays in {elapsed:.2f}s ({plays / elapsed:,.0f} plays/s)")
+        self.stdout.write(f"Win rate: {wins / plays:.4%}")
+        self.stdout.write(f"Expected payout per play: {mean:.4f} (± {1.96 * standard_error:.4f}, 95%)")
+        self.stdout.write(f"Exact expected payout per play: {exact.quantize(Decimal('0.0001'))}")
+        if stake is not None:
+            edge = 1 - Decimal(str(mean)) / stake
+            exact_edge = 1 - exact / stake
+            self.stdout.write(self.style.SUCCESS(
+                f"House edge at a stake of {stake}: {edge:.4%} simulated, {exact_edge:.4%} exact"
+            ))
+
+    def load_rules(self, path):
+        if path is None:
+            return settings.GAME_RULES
+        try:
+            with open(path) as f:
+                rules = json.load(f)
+        except OSError as e:
+            raise CommandError(f'Cannot read --rules file: {e}')
+        except ValueError as e:
+            raise CommandError(f'--rules file is not valid JSON: {e}')
+        if not isinstance(rules, dict) or not {'WIN', 'TIERS'} <= rules.keys():
+            raise CommandError('--rules file must be an object with WIN and TIERS')
+        return rules
+
+    def build_table(self, rules):
+        try:
+            return PayoutTable(rules)
+        except (ImproperlyConfigured, AttributeError, TypeError) as e:
+            raise CommandError(f'Invalid rule set: {e}')
+
+    def parse_stake(self, stake):
+        if stake is None:
+            return None
+        try:
+            stake = Decimal(stake)
+        except InvalidOperation:
+            raise CommandError(f'--stake must be a number, not {stake!r}')
+        if stake <= 0:
+            raise CommandError('--stake must be positive')
+        return stake
@@ -1,88 +1,150 @@
 import logging
+import random
 import time
 import json
+from urllib.parse import parse_qsl
 from channels.middleware import BaseMiddleware
 from channels.db import database_sync_to_async
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject, empty
 from django.http import JsonResponse
 from rest_framework import status
+from numberplay.log_queue import queue_logger
 
 logger = logging.getLogger(__name__)
 
 class JWTAuthMiddleware(BaseMiddleware):
     async def __call__(self, scope, receive, send):
+        # Lazy imports to avoid Django app registry issues
+        from django.contrib.auth.models import AnonymousUser
+        from rest_framework_simplejwt.tokens import AccessToken
+        from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+        from auth_app.user_cache import record_connect
+        
+        started = time.perf_counter()
+        source = 'anonymous'
+        scope['user'] = AnonymousUser()
+        
         # Get token from query parameters
-        query_string = scope.get('query_string', b'').decode()
-        query_params = dict(x.split('=') for x in query_string.split('&') if x)
+        query_params = dict(parse_qsl(scope.get('query_string', b'').decode()))
         token = query_params.get('token', None)
         
         if token:
             try:
-                # Lazy imports to avoid Django app registry issues
-                from rest_framework_simplejwt.tokens import AccessToken
-                from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-                from django.contrib.auth.models import AnonymousUser
-                
                 # Validate JWT token
                 access_token = AccessToken(token)
-                user_id = access_token['user_id']
-                
-                # Get user from database
-                user = await self.get_user(user_id)
+                user, source = await self.resolve_user(access_token)
                 if user:
                     scope['user'] = user
-                else:
-                    scope['user'] = AnonymousUser()
             except (InvalidToken, TokenError, KeyError):
-                from django.contrib.auth.models import AnonymousUser
-                scope['user'] = AnonymousUser()
-        else:
-            from django.contrib.auth.models import AnonymousUser
-            scope['user'] = AnonymousUser()
+                source = 'invalid'
         
+        record_connect(source, time.perf_counter() - started)
         return await super().__call__(scope, receive, send)
     
+    async def resolve_user(self, access_token):
+        """Return the user of a validated token and how it was resolved"""
+        from django.conf import settings
+        from rest_framework_simplejwt.models import TokenUser
+        from rest_framework_simplejwt.settings import api_settings
+        from auth_app.user_cache import get_cached_user
+        
+        if settings.WEBSOCKET_AUTH_CLAIMS_ONLY:
+            # Raises KeyError if the token has no user id
+            access_token[api_settings.USER_ID_CLAIM]
+            return TokenUser(access_token), 'claims'
+        
+        user_id = access_token[api_settings.USER_ID_CLAIM]
+        user = get_cached_user(user_id)
+        if user is not None:
+            return user, 'cache'
+        return await self.get_user(user_id), 'database'
+    
     @database_sync_to_async
     def get_user(self, user_id):
-        try:
-            from auth_app.models import User
-            return User.objects.get(id=user_id)
-        except:
-            return None 
+        from auth_app.user_cache import get_user
+        return get_user(user_id)
 
-class RequestLoggingMiddleware(MiddlewareMixin):
-    """Middleware for logging API requests and responses"""
+class RequestLoggingMiddleware:
+    """
+    Log one structured record per request, sampled per path.
     
-    def process_request(self, request):
-        """Log incoming request"""
-        request.start_time = time.time()
+    Records go through a queue to a background thread (see
+    ``numberplay.log_queue``), so a request only pays for building a dict. The
+    user is only logged if authentication already ran for the request; the
+    middleware never triggers it. Server errors are always logged.
+    """
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        conf = settings.REQUEST_LOGGING
+        if not conf['ENABLED']:
+            raise MiddlewareNotUsed
         
-        # Log request details
-        log_data = {
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        
+        self.default_rate = conf['SAMPLE_RATE']
+        # Longest prefix first, so the most specific rate wins
+        self.path_rates = sorted(conf['SAMPLE_RATES'].items(), key=lambda item: -len(item[0]))
+        self.logger = queue_logger(conf['LOGGER'], conf['QUEUE_SIZE'])
+    
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.log(request, response, started)
+        return response
+    
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.log(request, response, started)
+        return response
+    
+    def sample_rate(self, path):
+        for prefix, rate in self.path_rates:
+            if path.startswith(prefix):
+                return rate
+        return self.default_rate
+    
+    def log(self, request, response, started):
+        """Queue the record of a finished request if it is sampled"""
+        duration = time.perf_counter() - started
+        rate = self.sample_rate(request.path)
+        if response.status_code < 500 and (rate <= 0 or (rate < 1 and random.random() >= rate)):
+            return
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        
+        self.logger.info('%s %s %s', request.method, request.path, response.status_code, extra={'fields': {
             'method': request.method,
             'path': request.path,
-            'user': request.user.username if request.user.is_authenticated else 'anonymous',
+            'status_code': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'user_id': self.get_user_id(request),
             'ip': self.get_client_ip(request),
-        }
-        
-        logger.info(f"Request: {json.dumps(log_data)}")
+            'sample_rate': rate,
+        }})
     
-    def process_response(self, request, response):
-        """Log response details"""
-        if hasattr(request, 'start_time'):
-            duration = time.time() - request.start_time
-            
-            log_data = {
-                'method': request.method,
-                'path': request.path,
-                'status_code': response.status_code,
-                'duration': f"{duration:.3f}s",
-                'user': request.user.username if request.user.is_authenticated else 'anonymous',
-            }
-            
-            logger.info(f"Response: {json.dumps(log_data)}")
-        
-        return response
+    def get_user_id(self, request):
+        """Return the id of the authenticated user, without authenticating the request"""
+        # Set lazily by AuthenticationMiddleware, and to the resolved user by DRF
+        user = request.__dict__.get('user')
+        if isinstance(user, SimpleLazyObject):
+            if user._wrapped is empty:
+                return None
+            user = user._wrapped
+        if user is None or not user.is_authenticated:
+            return None
+        return user.pk
     
     def get_client_ip(self, request):
         """Get client IP address"""
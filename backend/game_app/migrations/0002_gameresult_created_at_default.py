@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:16
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gameresult',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='gameresult',
+            index=models.Index(fields=['user', '-created_at'], name='game_app_ga_user_id_7aaf8f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gameresult',
+            index=models.Index(fields=['result', 'created_at'], name='game_app_ga_result_c65482_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gameresult',
+            index=models.Index(fields=['created_at'], name='game_app_ga_created_bc3408_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0001_initial'),
+        ('game_app', '0002_gameresult_created_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserGameStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='game_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('games', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('total_prize', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('best_prize', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('last_played', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'User game statistics',
+                'verbose_name_plural': 'User game statistics',
+            },
+        ),
+    ]
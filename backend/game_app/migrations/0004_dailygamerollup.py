@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-16 23:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('game_app', '0003_usergamestats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyGameRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('plays', models.PositiveIntegerField(default=0)),
+                ('wins', models.PositiveIntegerField(default=0)),
+                ('prize_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('max_prize', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('last_result_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['user', 'day'], name='game_app_da_user_id_f1e4c5_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailygamerollup',
+            constraint=models.UniqueConstraint(fields=('day', 'user'), name='unique_daily_rollup_per_user'),
+        ),
+    ]
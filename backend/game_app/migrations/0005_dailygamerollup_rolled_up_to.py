@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_app', '0004_dailygamerollup'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='dailygamerollup',
+            name='last_result_id',
+        ),
+        migrations.AddField(
+            model_name='dailygamerollup',
+            name='rolled_up_to',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
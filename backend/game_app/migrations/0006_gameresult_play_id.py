@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_app', '0005_dailygamerollup_rolled_up_to'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameresult',
+            name='play_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
@@ -1,5 +1,9 @@
-from django.db import models
+from decimal import Decimal
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
+from django.utils import timezone
 
 # Create your models here.
 
@@ -11,7 +15,10 @@ class GameResult(models.Model):
         ('lose', 'Lose'),
     ])
     prize = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered plays keep the time they were played at
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Set on buffered plays, so a batch flushed twice is only stored once
+    play_id = models.UUIDField(null=True, blank=True, unique=True, editable=False)
     
     def __str__(self):
         return f"{self.user.username} - {self.number} - {self.result}"
@@ -23,3 +30,107 @@ class GameResult(models.Model):
             models.Index(fields=['result', 'created_at']),
             models.Index(fields=['created_at']),
         ]
+
+class UserGameStats(models.Model):
+    """Per-user totals maintained incrementally with every stored play"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='game_stats'
+    )
+    games = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    total_prize = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    best_prize = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    last_played = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.games} games - {self.wins} wins"
+    
+    @classmethod
+    def record_results(cls, user_id, game_results):
+        """
+        Add game results of one user to their statistics.
+        
+        Must run in the same transaction that stores the results.
+        """
+        prizes = [to_prize(r.prize) for r in game_results if r.result == 'win']
+        games = len(game_results)
+        wins = len(prizes)
+        total_prize = sum(prizes, Decimal('0.00'))
+        best_prize = max(prizes, default=Decimal('0.00'))
+        last_played = max(r.created_at for r in game_results)
+        
+        def update():
+            return cls.objects.filter(user_id=user_id).update(
+                games=F('games') + games,
+                wins=F('wins') + wins,
+                total_prize=F('total_prize') + total_prize,
+                best_prize=Greatest('best_prize', Value(best_prize)),
+                last_played=Greatest(Coalesce('last_played', Value(last_played)), Value(last_played)),
+                updated_at=timezone.now()
+            )
+        
+        if update():
+            return
+        
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    user_id=user_id,
+                    games=games,
+                    wins=wins,
+                    total_prize=total_prize,
+                    best_prize=best_prize,
+                    last_played=last_played
+                )
+        except IntegrityError:
+            # Created by a concurrent play in the meantime, unless the error
+            # has another cause (e.g. the user no longer exists)
+            with transaction.atomic():
+                if not update():
+                    raise
+    
+    class Meta:
+        verbose_name = 'User game statistics'
+        verbose_name_plural = 'User game statistics'
+
+class DailyGameRollup(models.Model):
+    """Game totals of one user on one day, or of all users when user is empty"""
+    day = models.DateField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='daily_rollups'
+    )
+    plays = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    prize_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    max_prize = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # End of the time range included when the day was last rolled up
+    rolled_up_to = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.day} - {self.user_id or 'all users'} - {self.plays} plays"
+    
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'user'], name='unique_daily_rollup_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+
+def to_prize(value):
+    """Convert a prize to a Decimal with two decimal places"""
+    if value is None:
+        return None
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    return value.quantize(Decimal('0.01'))
@@ -0,0 +1,100 @@
+from base64 import b64decode, b64encode
+from binascii import Error as Base64Error
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+def seek(queryset, position=None):
+    """Order game results newest first, starting after a (created_at, id) position"""
+    queryset = queryset.order_by('-created_at', '-id')
+    if position is None:
+        return queryset
+    
+    created_at, pk = position
+    # created_at__lte bounds the index range scan, the OR breaks ties
+    return queryset.filter(
+        Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+        created_at__lte=created_at
+    )
+
+class KeysetPagination(BasePagination):
+    """
+    Paginate game results newest first by their (created_at, id) position.
+    
+    Each page seeks right after the last row of the previous page instead of
+    skipping rows with OFFSET, so deep pages cost the same as the first one.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        
+        queryset = seek(queryset, self.decode_cursor(request))
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.last_position = self.get_position(results[-1]) if results else None
+        return results
+    
+    def get_position(self, row):
+        """Return the (created_at, id) position of a game result or a .values() row"""
+        if isinstance(row, dict):
+            return row['created_at'], row['id']
+        return row.created_at, row.id
+    
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=settings.GAME_HISTORY_MAX_PAGE_SIZE
+            )
+        except (KeyError, ValueError):
+            return settings.GAME_HISTORY_PAGE_SIZE
+    
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last_position))
+    
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        
+        try:
+            created_at, pk = b64decode(encoded.encode('ascii')).decode('ascii').split('|')
+            created_at = parse_datetime(created_at)
+            pk = _positive_int(pk)
+        except (TypeError, ValueError, UnicodeError, Base64Error):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+    
+    def encode_cursor(self, position):
+        created_at, pk = position
+        return b64encode(f'{created_at.isoformat()}|{pk}'.encode('ascii')).decode('ascii')
+    
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,173 @@
+"""
+Daily rollups of game results.
+
+``rollup_game_results`` recomputes the days that have results created since
+the last run. Rows are not committed in ``created_at`` order (write-behind
+flushes keep the time of the play, transactions commit late), so every run
+also looks back ``GAME_ROLLUP_LOOKBACK`` seconds before the previous run and
+recomputes those days too. The end of the time range included is kept on the
+all-users rows and serves as the watermark for the next run.
+"""
+
+import logging
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+from .models import DailyGameRollup, GameResult
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = 'game:rollup:lock'
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+WINDOWS = {
+    '24h': 1,
+    '7d': 7,
+    '30d': 30,
+    'all': None,
+}
+
+def get_watermark():
+    """Return the end of the time range included in the rollups, or None before the first run"""
+    return DailyGameRollup.objects.filter(user=None).aggregate(
+        watermark=Max('rolled_up_to')
+    )['watermark']
+
+@contextmanager
+def rollup_lock(timeout):
+    """
+    Ensure only one rollup runs at a time across workers; yields False if
+    already locked. If Redis is unreachable the run goes ahead unlocked.
+    """
+    from numberplay.redis_client import get_redis
+
+    client = get_redis()
+    token = uuid.uuid4().hex
+    try:
+        acquired = bool(client.set(LOCK_KEY, token, nx=True, px=int(timeout * 1000)))
+    except redis.RedisError as e:
+        logger.warning(f"Could not lock the rollup, running unlocked: {e}")
+        yield True
+        return
+
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                client.register_script(RELEASE_SCRIPT)(keys=[LOCK_KEY], args=[token])
+            except redis.RedisError as e:
+                logger.warning(f"Could not release the rollup lock: {e}")
+
+def day_bounds(day):
+    """Return the aware [start, end) datetimes of a day in the current time zone"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+def rollup_day(day, until):
+    """Recompute the rollups of one day from its game results created before ``until``"""
+    start, end = day_bounds(day)
+    wins = Q(result='win')
+    rows = (
+        GameResult.objects.filter(created_at__gte=start, created_at__lt=min(end, until))
+        .order_by()
+        .values('user_id')
+        .annotate(
+            plays=Count('id'),
+            wins=Count('id', filter=wins),
+            prize_sum=Sum('prize', filter=wins),
+            max_prize=Max('prize', filter=wins)
+        )
+    )
+
+    rollups = [
+        DailyGameRollup(
+            day=day,
+            user_id=row['user_id'],
+            plays=row['plays'],
+            wins=row['wins'],
+            prize_sum=row['prize_sum'] or 0,
+            max_prize=row['max_prize'] or 0,
+            rolled_up_to=until
+        )
+        for row in rows
+    ]
+    rollups.append(DailyGameRollup(
+        day=day,
+        user=None,
+        plays=sum(r.plays for r in rollups),
+        wins=sum(r.wins for r in rollups),
+        prize_sum=sum((r.prize_sum for r in rollups), 0),
+        max_prize=max((r.max_prize for r in rollups), default=0),
+        rolled_up_to=until
+    ))
+
+    with transaction.atomic():
+        DailyGameRollup.objects.filter(day=day).delete()
+        DailyGameRollup.objects.bulk_create(rollups)
+
+def rollup_game_results(lock_timeout=600):
+    """Roll up every day that received game results since the last run"""
+    with rollup_lock(lock_timeout) as acquired:
+        if not acquired:
+            return []
+
+        until = timezone.now()
+        results = GameResult.objects.filter(created_at__lt=until)
+        watermark = get_watermark()
+        if watermark is not None:
+            lookback = timedelta(seconds=settings.GAME_ROLLUP_LOOKBACK)
+            results = results.filter(created_at__gte=watermark - lookback)
+
+        days = list(results.order_by().dates('created_at', 'day'))
+        for day in days:
+            rollup_day(day, until)
+        return days
+
+def window_totals(user, window):
+    """
+    Return (start day, plays, wins, prize sum, best prize) of a user in a window.
+    
+    Windows are whole days in the current time zone, ending with today. Rows
+    created after the last rollup run are read from GameResult directly; rows
+    committed late with an earlier ``created_at`` are counted once the next
+    run has recomputed their day.
+    """
+    days = WINDOWS[window]
+    since = timezone.localdate() - timedelta(days=days - 1) if days else None
+
+    rollups = DailyGameRollup.objects.filter(user=user)
+    recent = GameResult.objects.filter(user=user)
+    watermark = get_watermark()
+    if watermark is not None:
+        recent = recent.filter(created_at__gte=watermark)
+    if since is not None:
+        rollups = rollups.filter(day__gte=since)
+        recent = recent.filter(created_at__gte=day_bounds(since)[0])
+
+    wins = Q(result='win')
+    rolled = rollups.aggregate(
+        plays=Sum('plays'), wins=Sum('wins'), prize_sum=Sum('prize_sum'), max_prize=Max('max_prize')
+    )
+    tail = recent.order_by().aggregate(
+        plays=Count('id'), wins=Count('id', filter=wins),
+        prize_sum=Sum('prize', filter=wins), max_prize=Max('prize', filter=wins)
+    )
+    return (
+        since,
+        (rolled['plays'] or 0) + tail['plays'],
+        (rolled['wins'] or 0) + tail['wins'],
+        (rolled['prize_sum'] or 0) + (tail['prize_sum'] or 0),
+        max(rolled['max_prize'] or 0, tail['max_prize'] or 0),
+    )
@@ -0,0 +1,116 @@
+"""
+Payout rules of the number game.
+
+The rules are declared in ``settings.GAME_RULES``: ``WIN`` picks the winning
+numbers and ``TIERS`` the prize of a win, as a rate of the number for the
+first tier whose ``ABOVE`` the number exceeds. They are compiled once into a
+``PayoutTable`` over every playable number, so resolving a play is a list
+lookup returning an exact ``Decimal`` prize; there is no float arithmetic.
+
+``WIN`` is one of ``'even'``, ``'odd'``, ``'all'``, ``'multiple:N'`` or the
+dotted path of a ``number -> bool`` callable for custom modes.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+# The numbers GamePlaySerializer accepts
+MIN_NUMBER = 1
+MAX_NUMBER = 9999
+
+CENT = Decimal('0.01')
+
+WIN_CONDITIONS = {
+    'even': lambda number: number % 2 == 0,
+    'odd': lambda number: number % 2 == 1,
+    'all': lambda number: True,
+}
+
+def win_condition(win):
+    """Return the ``number -> bool`` callable of a WIN setting"""
+    if win in WIN_CONDITIONS:
+        return WIN_CONDITIONS[win]
+    if win.startswith('multiple:'):
+        try:
+            divisor = int(win.split(':', 1)[1])
+        except ValueError:
+            divisor = 0
+        if divisor < 1:
+            raise ImproperlyConfigured(f'GAME_RULES WIN {win!r} needs a positive divisor')
+        return lambda number: number % divisor == 0
+    try:
+        return import_string(win)
+    except ImportError:
+        raise ImproperlyConfigured(
+            f"GAME_RULES WIN must be one of {', '.join(WIN_CONDITIONS)}, 'multiple:N' "
+            f'or the dotted path of a callable, not {win!r}'
+        )
+
+def compile_tiers(tiers):
+    """Return (above, rate) pairs sorted from the highest tier down"""
+    compiled = []
+    for tier in tiers:
+        try:
+            above, rate = int(tier['ABOVE']), Decimal(str(tier['RATE']))
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            raise ImproperlyConfigured(f'Invalid GAME_RULES tier {tier!r}: needs an ABOVE number and a RATE')
+        if rate < 0:
+            raise ImproperlyConfigured(f'GAME_RULES tier {tier!r} has a negative RATE')
+        compiled.append((above, rate))
+    compiled.sort(reverse=True)
+
+    if not compiled or compiled[-1][0] >= MIN_NUMBER:
+        raise ImproperlyConfigured(f'GAME_RULES TIERS must cover every number from {MIN_NUMBER}')
+    return compiled
+
+class PayoutTable:
+    """Prize and outcome of every playable number, compiled from a rule set"""
+
+    def __init__(self, rules):
+        is_win = win_condition(rules['WIN'])
+        tiers = compile_tiers(rules['TIERS'])
+
+        # Indexed by number; index 0 is never played
+        self.prizes = [None] * (MAX_NUMBER + 1)
+        self.plays = [None] * (MAX_NUMBER + 1)
+        for number in range(MIN_NUMBER, MAX_NUMBER + 1):
+            rate = next(rate for above, rate in tiers if number > above)
+            prize = (number * rate).quantize(CENT, rounding=ROUND_HALF_UP)
+            self.prizes[number] = prize
+            self.plays[number] = ('win', prize) if is_win(number) else ('lose', None)
+
+    def prize(self, number):
+        """Return the prize a number pays if it wins, 0 outside the playable range"""
+        if not MIN_NUMBER <= number <= MAX_NUMBER:
+            return Decimal('0.00')
+        return self.prizes[number]
+
+    def resolve(self, number):
+        """Return the (result, prize) pair of a played number"""
+        return self.plays[number]
+
+    def winning_prizes(self):
+        """Return the prize of every playable number, 0 for losing numbers"""
+        return [
+            prize if result == 'win' else Decimal('0.00')
+            for result, prize in self.plays[MIN_NUMBER:]
+        ]
+
+_table = None
+
+def get_payout_table():
+    """Return the payout table of settings.GAME_RULES, compiling it on first use"""
+    global _table
+    if _table is None:
+        _table = PayoutTable(settings.GAME_RULES)
+    return _table
+
+@receiver(setting_changed)
+def reset_payout_table(setting, **kwargs):
+    global _table
+    if setting == 'GAME_RULES':
+        _table = None
@@ -0,0 +1,73 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from numberplay.ratelimit import parse_rate
+from .buffer import buffer_results, write_behind_enabled
+from .cache import bump_version
+from .leaderboard import leaderboard_enabled, record_results
+from .models import GameResult, UserGameStats
+from .rules import get_payout_table
+
+# Plays over REST, the async API and the WebSocket draw from one bucket
+PLAY_RATELIMIT_GROUP = 'game_app.views.play_game'
+PLAY_RATE = '10/m'
+
+def max_batch_size():
+    """Return the most numbers one batch may play"""
+    max_size = settings.GAME_BATCH_MAX_SIZE
+    if settings.RATELIMIT_ENABLE:
+        # Each number takes a play token, so a larger batch could never be allowed
+        max_size = min(max_size, parse_rate(PLAY_RATE)[0])
+    return max_size
+
+def resolve_play(number):
+    """Return the (result, prize) pair for a played number, with an exact Decimal prize"""
+    return get_payout_table().resolve(number)
+
+def result_message(number, result, prize):
+    """Build the result of a play as sent in responses and WebSocket frames"""
+    return {
+        'number': number,
+        'result': result,
+        'prize': None if prize is None else float(prize)
+    }
+
+def save_game_results(user, plays):
+    """Persist (number, result, prize) plays of a user"""
+    if write_behind_enabled():
+        buffer_results(user.id, plays)
+        return
+
+    game_results = [
+        GameResult(user_id=user.id, number=number, result=result, prize=prize)
+        for number, result, prize in plays
+    ]
+    store_game_results(game_results)
+
+def store_game_results(game_results):
+    """
+    Insert game results and update the statistics of their users in one transaction.
+
+    Results whose play_id is already stored are skipped; the inserted results
+    are returned.
+    """
+    with transaction.atomic():
+        play_ids = [game_result.play_id for game_result in game_results if game_result.play_id is not None]
+        if play_ids:
+            stored = set(GameResult.objects.filter(play_id__in=play_ids).values_list('play_id', flat=True))
+            game_results = [game_result for game_result in game_results if game_result.play_id not in stored]
+
+        by_user = defaultdict(list)
+        for game_result in game_results:
+            by_user[game_result.user_id].append(game_result)
+
+        GameResult.objects.bulk_create(game_results)
+
+        for user_id, user_results in by_user.items():
+            UserGameStats.record_results(user_id, user_results)
+            transaction.on_commit(lambda user_id=user_id: bump_version(user_id))
+
+        if leaderboard_enabled():
+            transaction.on_commit(lambda: record_results(game_results))
+
+    return game_results
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import bump_version
+from .models import GameResult, UserGameStats
+
+@receiver(post_save, sender=GameResult)
+@receiver(post_save, sender=UserGameStats)
+@receiver(post_delete, sender=UserGameStats)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """Invalidate cached responses when game data changes outside the play path"""
+    transaction.on_commit(lambda: bump_version(instance.user_id))
+
+# A GameResult post_delete receiver would disable the fast delete of a user's
+# results, so deleting a user invalidates their responses once instead
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_deleted_user_cache(sender, instance, **kwargs):
+    """Invalidate cached responses of a deleted user"""
+    transaction.on_commit(lambda user_id=instance.pk: bump_version(user_id))
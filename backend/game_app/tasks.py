@@ -0,0 +1,15 @@
+from celery import shared_task
+from .buffer import flush_result_buffer
+from .rollups import rollup_game_results
+
+@shared_task
+def flush_game_results():
+    """Flush buffered game results into the database"""
+    flushed = flush_result_buffer()
+    return f"Flushed {flushed} game results"
+
+@shared_task
+def rollup_daily_games():
+    """Update daily rollups with game results stored since the last run"""
+    days = rollup_game_results()
+    return f"Rolled up {len(days)} days"
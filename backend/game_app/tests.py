@@ -1,10 +1,62 @@
-from django.test import TestCase
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import queue
+import runpy
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipIf, skipUnless
+from uuid import UUID
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib import admin
 from django.contrib.auth import get_user_model
-from rest_framework.test import APITestCase, APIClient
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy
 from rest_framework import status
-from .models import GameResult
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from rest_framework_simplejwt.tokens import RefreshToken
+from auth_app.user_cache import connect_stats, reset_connect_stats, user_cache
+from numberplay import redis_client, settings as settings_module
+from numberplay.asgi import application
+from numberplay.health import CHECKS, HealthMonitor, monitor
+from numberplay.log_queue import DroppingQueueHandler, JSONFormatter, queue_logger
+from numberplay.parsers import ORJSONParser
+from numberplay.ratelimit import CacheTokenBucket
+from numberplay.renderers import ORJSONRenderer
+from .admin import GameResultAdmin
+from .buffer import LocMemResultBuffer, decode_result, encode_result, flush_result_buffer, store_batch
+from .cache import cache_stats, get_version, reset_cache_stats
+from .encoding import msgpack, result_event
+from .leaderboard import LocMemLeaderboard
+from .management.commands.simulate_payouts import np
+from .middleware import RequestLoggingMiddleware
+from .models import DailyGameRollup, GameResult, UserGameStats
+from .rollups import rollup_game_results, window_totals
+from .rules import MAX_NUMBER, MIN_NUMBER, PayoutTable, get_payout_table
+from .serializers import GAME_RESULT_VALUES, GameResultSerializer, render_game_results
 from .views import calculate_prize
-import json
 
 User = get_user_model()
 
@@ -40,6 +92,96 @@ class GameLogicTests(TestCase):
         """Test that prizes are properly rounded to 2 decimal places"""
         self.assertEqual(calculate_prize(333), 99.9)  # 333 * 0.3 = 99.9
         self.assertEqual(calculate_prize(777), 388.5)  # 777 * 0.5 = 388.5
+    
+    def test_calculate_prize_out_of_range(self):
+        """Test numbers outside 1-9999 have no prize"""
+        self.assertEqual(calculate_prize(0), 0)
+        self.assertEqual(calculate_prize(-842), 0)
+        self.assertEqual(calculate_prize(10000), 0)
+
+
+def multiple_of_seven(number):
+    return number % 7 == 0
+
+class PayoutRulesTests(TestCase):
+    """Test the payout table compiled from GAME_RULES"""
+    
+    def test_default_rules_match_prize_tiers(self):
+        """Test that the default table pays the historical tiers on even numbers"""
+        table = get_payout_table()
+        self.assertEqual(table.resolve(842), ('win', Decimal('421.00')))
+        self.assertEqual(table.resolve(841), ('lose', None))
+        self.assertEqual(table.prize(9999), Decimal('6999.30'))
+        self.assertEqual(table.prize(1), Decimal('0.10'))
+        
+        for number in range(MIN_NUMBER, MAX_NUMBER + 1):
+            prize = table.prize(number)
+            self.assertIsInstance(prize, Decimal)
+            self.assertEqual(prize, prize.quantize(Decimal('0.01')))
+    
+    def test_exact_decimal_prizes(self):
+        """Test that rates are applied without float rounding"""
+        table = PayoutTable({'WIN': 'all', 'TIERS': [{'ABOVE': 0, 'RATE': '0.015'}]})
+        # 0.015 * 1001 = 15.015, which rounds down as a float product
+        self.assertEqual(table.prize(1001), Decimal('15.02'))
+    
+    @override_settings(GAME_RULES={'WIN': 'multiple:3', 'TIERS': [{'ABOVE': 0, 'RATE': 2}]})
+    def test_rules_from_settings(self):
+        """Test that changing GAME_RULES recompiles the table"""
+        self.assertEqual(get_payout_table().resolve(9), ('win', Decimal('18.00')))
+        self.assertEqual(get_payout_table().resolve(10), ('lose', None))
+        self.assertEqual(calculate_prize(10), 20.0)
+    
+    def test_custom_win_condition(self):
+        """Test a win condition given as a dotted path"""
+        table = PayoutTable({
+            'WIN': 'game_app.tests.multiple_of_seven',
+            'TIERS': [{'ABOVE': 0, 'RATE': '1'}],
+        })
+        self.assertEqual(table.resolve(14)[0], 'win')
+        self.assertEqual(table.resolve(15)[0], 'lose')
+    
+    def test_invalid_rules(self):
+        """Test that invalid rule sets are rejected"""
+        tiers = [{'ABOVE': 0, 'RATE': '1'}]
+        for rules in [
+            {'WIN': 'sometimes', 'TIERS': tiers},
+            {'WIN': 'multiple:0', 'TIERS': tiers},
+            {'WIN': 'even', 'TIERS': []},
+            {'WIN': 'even', 'TIERS': [{'ABOVE': 10, 'RATE': '1'}]},
+            {'WIN': 'even', 'TIERS': [{'ABOVE': 0, 'RATE': '-1'}]},
+            {'WIN': 'even', 'TIERS': [{'ABOVE': 0}]},
+        ]:
+            with self.subTest(rules=rules), self.assertRaises(ImproperlyConfigured):
+                PayoutTable(rules)
+    
+    @skipUnless(np, 'numpy is not installed')
+    def test_simulate_payouts(self):
+        """Test the payout simulator against the exact expectation"""
+        out = StringIO()
+        call_command('simulate_payouts', plays=200000, seed=1, stake='2000', stdout=out)
+        output = out.getvalue()
+        self.assertIn('Exact expected payout per play: 1743.5064', output)
+        self.assertIn('House edge at a stake of 2000', output)
+    
+    @skipUnless(np, 'numpy is not installed')
+    def test_simulate_payouts_invalid_rules_file(self):
+        """Test unreadable, malformed and invalid rule files are reported as command errors"""
+        for content in ['{"WIN": "even",', '[]', '{"WIN": "sometimes", "TIERS": [{"ABOVE": 0, "RATE": 1}]}']:
+            with self.subTest(content=content), tempfile.NamedTemporaryFile('w', suffix='.json') as f:
+                f.write(content)
+                f.flush()
+                with self.assertRaises(CommandError):
+                    call_command('simulate_payouts', plays=10, rules=f.name, stdout=StringIO())
+        
+        with self.assertRaises(CommandError):
+            call_command('simulate_payouts', plays=10, rules='/nonexistent/rules.json', stdout=StringIO())
+    
+    @skipIf(np, 'numpy is installed')
+    def test_simulate_payouts_requires_numpy(self):
+        """Test that the simulator explains the missing dependency"""
+        with self.assertRaises(CommandError):
+            call_command('simulate_payouts')
 
 
 class GameAPITests(APITestCase):
@@ -142,6 +284,1525 @@ class GameAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+class PlayerTestMixin:
+    """
+    Shared setUp of the game tests: an empty cache, an in-memory channel layer
+    and a test user with a JWT access token in ``self.token``.
+    """
+    # How the test client signs in: 'force' (force_authenticate), 'token'
+    # (bearer credentials) or None
+    authentication = 'force'
+    
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        channel_layers = override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+        channel_layers.enable()
+        self.addCleanup(channel_layers.disable)
+        
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        if self.authentication == 'force':
+            self.client.force_authenticate(user=self.user)
+        elif self.authentication == 'token':
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+
+class GameBatchAPITests(PlayerTestMixin, APITestCase):
+    """Test batch play endpoint"""
+    
+    def test_play_batch(self):
+        """Test playing several numbers in one request"""
+        data = {'numbers': [842, 841, 100]}
+        response = self.client.post('/api/game/play/batch/', data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['wins'], 2)
+        self.assertEqual(response.data['total_prize'], 431.0)  # 421.0 + 10.0
+        self.assertEqual([item['result'] for item in response.data['results']], ['win', 'lose', 'win'])
+        
+        # Check database records
+        self.assertEqual(GameResult.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(GameResult.objects.filter(user=self.user, result='win').count(), 2)
+    
+    def test_play_batch_invalid_number(self):
+        """Test that one invalid number rejects the whole batch"""
+        data = {'numbers': [842, 10000]}
+        response = self.client.post('/api/game/play/batch/', data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('numbers', response.data)
+        self.assertEqual(GameResult.objects.count(), 0)
+    
+    def test_play_batch_empty(self):
+        """Test playing an empty batch"""
+        response = self.client.post('/api/game/play/batch/', {'numbers': []}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    @override_settings(GAME_BATCH_MAX_SIZE=2)
+    def test_play_batch_too_large(self):
+        """Test playing more numbers than allowed in one batch"""
+        response = self.client.post('/api/game/play/batch/', {'numbers': [2, 4, 6]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ClaimsAuthenticationTests(PlayerTestMixin, APITestCase):
+    """Test game endpoints authenticated from token claims"""
+    
+    authentication = 'token'
+    
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+    
+    def assertNoUserQueries(self, queries):
+        user_table = f'FROM {connection.ops.quote_name(User._meta.db_table)}'
+        self.assertFalse([q['sql'] for q in queries if user_table in q['sql']])
+    
+    def test_user_row_loaded_once(self):
+        """Test the user row is loaded once for the first play, then never again"""
+        response = self.client.post('/api/game/play/batch/', {'numbers': [842]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/game/play/batch/', {'numbers': [100]}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            
+            response = self.client.get('/api/game/history/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.assertEqual([item['number'] for item in response.data], [100, 842])
+        self.assertNoUserQueries(queries.captured_queries)
+
+
+class AsyncGameAPITests(PlayerTestMixin, APITestCase):
+    """Test native async game endpoints"""
+    
+    authentication = 'token'
+    
+    def test_async_play_game(self):
+        """Test playing the game through the async endpoint"""
+        response = self.client.post('/api/game/async/play/', {'number': 842}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'number': 842, 'result': 'win', 'prize': 421.0})
+        self.assertEqual(GameResult.objects.get(user=self.user).number, 842)
+    
+    def test_async_play_game_invalid_number(self):
+        """Test async play validation errors"""
+        response = self.client.post('/api/game/async/play/', {'number': 0}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('number', response.json())
+    
+    def test_async_endpoints_unauthenticated(self):
+        """Test async endpoints without a token"""
+        self.client.credentials()
+        
+        self.assertEqual(self.client.get('/api/game/async/history/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get('/api/game/async/statistics/').status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_async_history_and_statistics_match_sync(self):
+        """Test async history and statistics return the same data as the sync views"""
+        self.client.post('/api/game/play/batch/', {'numbers': [100, 101, 842]}, format='json')
+        
+        self.assertEqual(
+            self.client.get('/api/game/async/history/').json(),
+            self.client.get('/api/game/history/').json()
+        )
+        
+        stats = self.client.get('/api/game/async/statistics/').json()
+        self.assertEqual(stats, self.client.get('/api/game/statistics/').json())
+        self.assertEqual(stats['total_games'], 3)
+        self.assertEqual(stats['best_prize'], 421.0)
+    
+    def test_async_play_game_wrong_method(self):
+        """Test async play only accepts POST"""
+        response = self.client.get('/api/game/async/play/')
+        
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+WRITE_BEHIND = {
+    'ENABLED': True,
+    'BACKEND': 'game_app.buffer.LocMemResultBuffer',
+    'KEY': 'test:results:buffer',
+    'BATCH_SIZE': 2,
+    'FLUSH_INTERVAL': 1.0,
+    'MAX_BATCHES_PER_FLUSH': 10,
+    'MAX_ATTEMPTS': 2,
+    'LOCK_TIMEOUT': 60,
+}
+
+
+@override_settings(GAME_WRITE_BEHIND=WRITE_BEHIND)
+class WriteBehindTests(PlayerTestMixin, APITestCase):
+    """Test write-behind buffering of game results"""
+    
+    def setUp(self):
+        super().setUp()
+        self.buffer = LocMemResultBuffer(WRITE_BEHIND['KEY'])
+        self.buffer.clear()
+    
+    def test_play_is_buffered_until_flush(self):
+        """Test plays are acknowledged before they reach the database"""
+        response = self.client.post('/api/game/play/batch/', {'numbers': [842, 841, 100]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(GameResult.objects.count(), 0)
+        self.assertEqual(self.buffer.pending(), 3)
+        
+        self.assertEqual(flush_result_buffer(), 3)
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertEqual(
+            sorted(GameResult.objects.values_list('number', 'result')),
+            [(100, 'win'), (841, 'lose'), (842, 'win')]
+        )
+        self.assertEqual(float(GameResult.objects.get(number=842).prize), 421.0)
+    
+    def test_unacknowledged_batch_is_redelivered(self):
+        """Test a claimed batch that was never committed is flushed again"""
+        self.buffer.push([
+            encode_result(self.user.id, 842, 'win', 421.0),
+            encode_result(self.user.id, 841, 'lose', None),
+        ])
+        
+        # A flush that crashed after claiming its batch
+        self.assertEqual(len(self.buffer.claim(2)), 2)
+        self.assertEqual(GameResult.objects.count(), 0)
+        
+        self.assertEqual(flush_result_buffer(), 2)
+        self.assertEqual(GameResult.objects.count(), 2)
+        self.assertEqual(self.buffer.pending(), 0)
+    
+    def test_buffered_result_keeps_play_time(self):
+        """Test flushed rows keep the time they were played at"""
+        played_at = timezone.now() - timedelta(minutes=5)
+        self.buffer.push([encode_result(self.user.id, 500, 'win', 150.0, played_at)])
+        
+        flush_result_buffer()
+        self.assertEqual(GameResult.objects.get().created_at, played_at)
+
+
+@override_settings(GAME_WRITE_BEHIND=WRITE_BEHIND, GAME_LEADERBOARD={'ENABLED': False})
+class WriteBehindDeadLetterTests(PlayerTestMixin, TransactionTestCase):
+    """Test buffered plays that can never be stored do not stall the buffer"""
+    
+    authentication = None
+    
+    def setUp(self):
+        super().setUp()
+        self.buffer = LocMemResultBuffer(WRITE_BEHIND['KEY'])
+        self.buffer.clear()
+    
+    def test_plays_of_deleted_user_are_dead_lettered(self):
+        """Test a flush stores the other plays of a batch and sets aside those of a deleted user"""
+        deleted = User.objects.create_user(
+            username='deleted',
+            email='deleted@example.com',
+            password='testpass123'
+        )
+        orphans = [
+            encode_result(deleted.id, 842, 'win', 421.0),
+            encode_result(deleted.id, 841, 'lose', None),
+        ]
+        self.buffer.push([orphans[0], encode_result(self.user.id, 100, 'win', 50.0), orphans[1]])
+        deleted.delete()
+        
+        self.assertEqual(flush_result_buffer(), 1)
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertEqual(self.buffer.dead_letters(), orphans)
+        self.assertEqual(list(GameResult.objects.values_list('user_id', 'number')), [(self.user.id, 100)])
+        self.assertEqual(UserGameStats.objects.get(user=self.user).games, 1)
+    
+    def test_malformed_records_are_dead_lettered(self):
+        """Test records that cannot be decoded are set aside"""
+        self.buffer.push(['not json', encode_result(self.user.id, 100, 'win', 50.0)])
+        
+        self.assertEqual(flush_result_buffer(), 1)
+        self.assertEqual(self.buffer.dead_letters(), ['not json'])
+        self.assertEqual(GameResult.objects.count(), 1)
+    
+    def test_failing_batch_is_bisected_after_max_attempts(self):
+        """Test a record that keeps failing the batch is dead-lettered after MAX_ATTEMPTS flushes"""
+        poison = json.dumps({**json.loads(encode_result(self.user.id, 100, 'win', 50.0)), 'number': 'abc'})
+        self.buffer.push([
+            encode_result(self.user.id, 842, 'win', 421.0),
+            poison,
+            encode_result(self.user.id, 841, 'lose', None),
+        ])
+        
+        with self.assertRaises(ValueError):
+            flush_result_buffer()
+        self.assertEqual(self.buffer.pending(), 3)
+        self.assertEqual(GameResult.objects.count(), 0)
+        
+        self.assertEqual(flush_result_buffer(), 2)
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertEqual(self.buffer.dead_letters(), [poison])
+        self.assertEqual(sorted(GameResult.objects.values_list('number', flat=True)), [841, 842])
+        self.assertEqual(UserGameStats.objects.get(user=self.user).games, 2)
+    
+    def test_redelivered_batch_is_stored_once(self):
+        """Test a batch committed but never acknowledged is not stored or counted twice"""
+        self.buffer.push([
+            encode_result(self.user.id, 842, 'win', 421.0),
+            encode_result(self.user.id, 841, 'lose', None),
+        ])
+        
+        # A flush that crashed after committing its batch
+        records = self.buffer.claim(2)
+        store_batch(self.buffer, [(record, decode_result(record)) for record in records])
+        self.assertEqual(self.buffer.pending(), 2)
+        
+        self.assertEqual(flush_result_buffer(), 0)
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertEqual(GameResult.objects.count(), 2)
+        self.assertEqual(UserGameStats.objects.get(user=self.user).games, 2)
+
+
+class UserGameStatsTests(PlayerTestMixin, APITestCase):
+    """Test incrementally maintained user statistics"""
+    
+    def test_plays_update_statistics(self):
+        """Test every stored play updates the statistics row"""
+        self.client.post('/api/game/play/batch/', {'numbers': [842, 841]}, format='json')
+        self.client.post('/api/game/play/batch/', {'numbers': [100]}, format='json')
+        
+        stats = UserGameStats.objects.get(user=self.user)
+        self.assertEqual(stats.games, 3)
+        self.assertEqual(stats.wins, 2)
+        self.assertEqual(float(stats.total_prize), 431.0)
+        self.assertEqual(float(stats.best_prize), 421.0)
+        self.assertEqual(stats.last_played, GameResult.objects.filter(user=self.user).first().created_at)
+    
+    def test_record_results_integrity_error_not_retried(self):
+        """Test an integrity error that is not a race is raised instead of retried"""
+        game_result = GameResult(user=self.user, number=842, result='win', prize=421, created_at=timezone.now())
+        with mock.patch.object(UserGameStats.objects, 'create', side_effect=IntegrityError('FOREIGN KEY constraint failed')):
+            with self.assertRaises(IntegrityError):
+                UserGameStats.record_results(self.user.id, [game_result])
+    
+    def test_statistics_endpoint(self):
+        """Test statistics are read from the statistics row"""
+        self.client.post('/api/game/play/batch/', {'numbers': [842, 841, 100]}, format='json')
+        
+        response = self.client.get('/api/game/statistics/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_games'], 3)
+        self.assertEqual(response.data['wins'], 2)
+        self.assertEqual(response.data['losses'], 1)
+        self.assertEqual(response.data['win_rate'], 66.67)
+        self.assertEqual(response.data['total_prize'], 431.0)
+        self.assertEqual(response.data['average_prize'], 215.5)
+        self.assertEqual(response.data['best_prize'], 421.0)
+        self.assertIsNotNone(response.data['last_played'])
+    
+    def test_statistics_endpoint_no_games(self):
+        """Test statistics of a user who never played"""
+        response = self.client.get('/api/game/statistics/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_games'], 0)
+        self.assertIsNone(response.data['last_played'])
+    
+    def test_rebuild_game_stats_command(self):
+        """Test the management command reconciles statistics with game results"""
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        GameResult.objects.create(user=self.user, number=842, result='win', prize=421.0)
+        GameResult.objects.create(user=self.user, number=841, result='lose', prize=None)
+        GameResult.objects.create(user=other, number=100, result='win', prize=10.0)
+        UserGameStats.objects.create(user=other, games=5, wins=5, total_prize=999, best_prize=999)
+        
+        call_command('rebuild_game_stats', chunk_size=1, stdout=StringIO())
+        
+        stats = UserGameStats.objects.get(user=self.user)
+        self.assertEqual((stats.games, stats.wins, float(stats.total_prize)), (2, 1, 421.0))
+        stats = UserGameStats.objects.get(user=other)
+        self.assertEqual((stats.games, stats.wins, float(stats.best_prize)), (1, 1, 10.0))
+
+
+@override_settings(GAME_RESPONSE_CACHE={'ENABLED': True, 'ALIAS': 'default', 'TTL': 300})
+class ResponseCacheTests(PlayerTestMixin, APITestCase):
+    """Test the versioned per-user response cache"""
+    
+    def setUp(self):
+        super().setUp()
+        reset_cache_stats()
+    
+    def test_repeated_requests_are_served_from_cache(self):
+        """Test the second request does not query game data"""
+        self.client.post('/api/game/play/batch/', {'numbers': [842, 841]}, format='json')
+        first = self.client.get('/api/game/history/')
+        
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/game/history/')
+        
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(cache_stats()['history'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+    
+    def test_new_play_invalidates_cache(self):
+        """Test a new result is visible right after it was played"""
+        self.client.post('/api/game/play/batch/', {'numbers': [842]}, format='json')
+        self.assertEqual(self.client.get('/api/game/statistics/').data['total_games'], 1)
+        self.assertEqual(len(self.client.get('/api/game/history/').data), 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/game/play/batch/', {'numbers': [100]}, format='json')
+        
+        self.assertEqual(self.client.get('/api/game/statistics/').data['total_games'], 2)
+        self.assertEqual(self.client.get('/api/game/history/').data[0]['number'], 100)
+        self.assertEqual(cache_stats()['statistics']['hits'], 0)
+    
+    def test_direct_writes_invalidate_cache(self):
+        """Test results saved outside the play endpoints also invalidate the cache"""
+        self.assertEqual(len(self.client.get('/api/game/history/').data), 0)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            GameResult.objects.create(user=self.user, number=500, result='win', prize=150.0)
+        
+        self.assertEqual(len(self.client.get('/api/game/history/').data), 1)
+    
+    def test_deleting_user_bumps_version_once(self):
+        """Test a user's results are fast-deleted and their cache invalidated once"""
+        GameResult.objects.bulk_create([
+            GameResult(user=self.user, number=number, result='lose') for number in range(1, 100, 2)
+        ])
+        user_id = self.user.id
+        version = get_version(user_id)
+        
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, \
+                CaptureQueriesContext(connection) as queries:
+            self.user.delete()
+        
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(get_version(user_id), version + 1)
+        self.assertFalse([
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('SELECT') and 'game_app_gameresult' in q['sql']
+        ])
+    
+    def test_admin_delete_invalidates_cache(self):
+        """Test results deleted from the admin invalidate the cache of their users"""
+        GameResult.objects.create(user=self.user, number=500, result='win', prize=150.0)
+        self.assertEqual(len(self.client.get('/api/game/history/').data), 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            GameResultAdmin(GameResult, admin.site).delete_queryset(None, GameResult.objects.all())
+        
+        self.assertEqual(len(self.client.get('/api/game/history/').data), 0)
+    
+    @override_settings(GAME_RESPONSE_CACHE={'ENABLED': False, 'ALIAS': 'default', 'TTL': 300})
+    def test_cache_disabled(self):
+        """Test responses are built on every request when the cache is disabled"""
+        self.client.get('/api/game/history/')
+        self.client.get('/api/game/history/')
+        
+        self.assertEqual(cache_stats(), {})
+
+
+class GameResultRenderingTests(TestCase):
+    """Test the .values() rendering path of game results"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        GameResult.objects.create(user=self.user, number=842, result='win', prize=Decimal('421.00'))
+        GameResult.objects.create(user=self.user, number=841, result='lose', prize=None)
+        GameResult.objects.create(user=self.user, number=1, result='win', prize=Decimal('0.10'))
+    
+    def test_matches_model_serializer(self):
+        """Test that rows render exactly like GameResultSerializer"""
+        queryset = GameResult.objects.filter(user=self.user)
+        expected = GameResultSerializer(queryset.select_related('user'), many=True).data
+        
+        with self.assertNumQueries(1):
+            rendered = render_game_results(queryset.values(*GAME_RESULT_VALUES))
+        
+        self.assertEqual(json.dumps(rendered), json.dumps(expected))
+    
+    @override_settings(TIME_ZONE='Europe/Paris')
+    def test_matches_model_serializer_in_local_time(self):
+        """Test that created_at is converted to the current time zone like the serializer does"""
+        queryset = GameResult.objects.filter(user=self.user)
+        expected = GameResultSerializer(queryset.select_related('user'), many=True).data
+        rendered = render_game_results(queryset.values(*GAME_RESULT_VALUES))
+        
+        self.assertEqual(json.dumps(rendered), json.dumps(expected))
+        self.assertTrue(rendered[0]['created_at'].endswith(('+01:00', '+02:00')))
+    
+    def test_history_query_count(self):
+        """Test that the history endpoints read results in one query"""
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        cache.clear()
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/game/history/all/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(
+            len([q for q in queries if 'game_app_gameresult' in q['sql']]), 1
+        )
+
+class KeysetHistoryTests(PlayerTestMixin, APITestCase):
+    """Test keyset-paginated full game history"""
+    
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        for number in range(1, 6):
+            GameResult.objects.create(
+                user=self.user, number=number, result='lose', prize=None,
+                created_at=now + timedelta(seconds=number)
+            )
+        # Two results played at the same time are ordered by id
+        GameResult.objects.create(user=self.user, number=6, result='win', prize=0.6, created_at=now)
+        GameResult.objects.create(user=self.user, number=7, result='lose', prize=None, created_at=now)
+    
+    def test_walk_all_pages(self):
+        """Test following next links returns every result exactly once, newest first"""
+        numbers = []
+        url = '/api/game/history/all/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            numbers.extend(item['number'] for item in response.data['results'])
+            url = response.data['next']
+        
+        self.assertEqual(numbers, [5, 4, 3, 2, 1, 7, 6])
+    
+    def test_default_page_size(self):
+        """Test the configured page size is used by default"""
+        with self.settings(GAME_HISTORY_PAGE_SIZE=3):
+            response = self.client.get('/api/game/history/all/')
+        
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+    
+    def test_max_page_size(self):
+        """Test requested page sizes are capped"""
+        with self.settings(GAME_HISTORY_MAX_PAGE_SIZE=4):
+            response = self.client.get('/api/game/history/all/?page_size=50')
+        
+        self.assertEqual(len(response.data['results']), 4)
+    
+    def test_only_own_results(self):
+        """Test other users' results are not included"""
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        GameResult.objects.create(user=other, number=8, result='win', prize=0.8)
+        
+        response = self.client.get('/api/game/history/all/?page_size=100')
+        
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertIsNone(response.data['next'])
+    
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        response = self.client.get('/api/game/history/all/?cursor=not-a-cursor')
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ExportHistoryTests(PlayerTestMixin, APITestCase):
+    """Test streaming export of the game history"""
+    
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        for number in range(1, 6):
+            GameResult.objects.create(
+                user=self.user, number=number,
+                result='win' if number % 2 == 0 else 'lose',
+                prize=number / 10 if number % 2 == 0 else None,
+                created_at=now + timedelta(seconds=number)
+            )
+    
+    def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode()
+    
+    @override_settings(GAME_EXPORT_CHUNK_SIZE=2)
+    def test_export_ndjson(self):
+        """Test NDJSON export across several chunks"""
+        response = self.client.get('/api/game/history/export/')
+        
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([row['number'] for row in rows], [5, 4, 3, 2, 1])
+        self.assertEqual(rows[1]['prize'], '0.40')
+        self.assertIsNone(rows[0]['prize'])
+    
+    @override_settings(GAME_EXPORT_CHUNK_SIZE=5)
+    def test_export_csv(self):
+        """Test CSV export with a chunk size equal to the number of rows"""
+        response = self.client.get('/api/game/history/export/?output=csv')
+        
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('game-history.csv', response['Content-Disposition'])
+        lines = self.read(response).splitlines()
+        self.assertEqual(lines[0], 'id,number,result,prize,created_at')
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[1].split(',')[1:4] == ['5', 'lose', ''])
+    
+    @override_settings(GAME_EXPORT_CHUNK_SIZE=2)
+    async def test_export_under_asgi(self):
+        """Test the export streams through the ASGI handler"""
+        token = RefreshToken.for_user(self.user).access_token
+        response = await self.async_client.get(
+            '/api/game/history/export/', headers={'Authorization': f'Bearer {token}'}
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        lines = [line async for line in response.streaming_content]
+        self.assertEqual(len(b''.join(lines).splitlines()), 5)
+    
+    def test_export_invalid_format(self):
+        """Test an unknown export format is rejected"""
+        response = self.client.get('/api/game/history/export/?output=xml')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DailyRollupTests(PlayerTestMixin, APITestCase):
+    """Test daily rollups and windowed statistics"""
+    
+    def play(self, number, days_ago=0):
+        result = GameResult.objects.create(
+            user=self.user, number=number,
+            result='win' if number % 2 == 0 else 'lose',
+            prize=number * 0.5 if number % 2 == 0 else None
+        )
+        if days_ago:
+            GameResult.objects.filter(id=result.id).update(
+                created_at=timezone.now() - timedelta(days=days_ago)
+            )
+        return result
+    
+    def test_rollup_groups_by_day_and_user(self):
+        """Test rollups hold per-user and all-users totals per day"""
+        self.play(842)
+        self.play(841)
+        self.play(100, days_ago=3)
+        
+        days = rollup_game_results()
+        
+        self.assertEqual(len(days), 2)
+        today = DailyGameRollup.objects.get(user=self.user, day=timezone.localdate())
+        self.assertEqual((today.plays, today.wins, float(today.prize_sum)), (2, 1, 421.0))
+        overall = DailyGameRollup.objects.get(user=None, day=timezone.localdate())
+        self.assertEqual(overall.plays, 2)
+        self.assertLessEqual(overall.rolled_up_to, timezone.now())
+    
+    def test_rollup_only_recomputes_recent_days(self):
+        """Test a rerun skips days before the lookback, and late rows recompute their day"""
+        self.play(842, days_ago=3)
+        rollup_game_results()
+        
+        self.assertEqual(rollup_game_results(), [])
+        
+        # Committed after the last run, with the time it was played at
+        late = self.play(100)
+        GameResult.objects.filter(id=late.id).update(created_at=timezone.now() - timedelta(minutes=10))
+        days = rollup_game_results()
+        
+        self.assertEqual(days, [timezone.localdate(timezone.now() - timedelta(minutes=10))])
+        rollup = DailyGameRollup.objects.get(user=self.user, day=days[0])
+        self.assertEqual((rollup.plays, rollup.wins), (1, 1))
+    
+    def test_rollup_counts_rows_committed_out_of_id_order(self):
+        """Test a row with a lower id committed after a run is rolled up by the next one"""
+        now = timezone.now()
+        GameResult.objects.create(id=10, user=self.user, number=842, result='win', prize=421, created_at=now)
+        rollup_game_results()
+        GameResult.objects.create(id=5, user=self.user, number=100, result='win', prize=50, created_at=now)
+        
+        self.assertEqual(rollup_game_results(), [timezone.localdate(now)])
+        _, plays, wins, prize_sum, _ = window_totals(self.user, '7d')
+        self.assertEqual((plays, wins, float(prize_sum)), (2, 2, 471.0))
+    
+    def test_window_statistics(self):
+        """Test windows combine rollups with rows since the last run"""
+        self.play(842)
+        self.play(100, days_ago=10)
+        self.play(200, days_ago=40)
+        rollup_game_results()
+        self.play(841)
+        
+        response = self.client.get('/api/game/statistics/window/?window=7d')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['window'], '7d')
+        self.assertEqual(response.data['total_games'], 2)
+        self.assertEqual(response.data['wins'], 1)
+        self.assertEqual(response.data['total_prize'], 421.0)
+        
+        response = self.client.get('/api/game/statistics/window/?window=30d')
+        self.assertEqual(response.data['total_games'], 3)
+        self.assertEqual(response.data['best_prize'], 421.0)
+        
+        response = self.client.get('/api/game/statistics/window/?window=all')
+        self.assertEqual(response.data['total_games'], 4)
+        self.assertIsNone(response.data['since'])
+    
+    def test_window_statistics_invalid_window(self):
+        """Test unknown windows are rejected"""
+        response = self.client.get('/api/game/statistics/window/?window=1y')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+LEADERBOARD = {
+    'ENABLED': True,
+    'BACKEND': 'game_app.leaderboard.LocMemLeaderboard',
+    'KEY_PREFIX': 'test:leaderboard',
+    'DAILY_TTL': 3600,
+    'DEFAULT_LIMIT': 10,
+    'MAX_LIMIT': 100,
+}
+
+
+@override_settings(GAME_LEADERBOARD=LEADERBOARD)
+class LeaderboardTests(PlayerTestMixin, APITestCase):
+    """Test the sorted-set leaderboards"""
+    
+    def setUp(self):
+        super().setUp()
+        LocMemLeaderboard().clear()
+        self.other = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpass123'
+        )
+    
+    def play(self, user, numbers):
+        self.client.force_authenticate(user=user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/game/play/batch/', {'numbers': numbers}, format='json')
+        self.client.force_authenticate(user=self.user)
+    
+    def test_plays_update_leaderboard(self):
+        """Test committed wins are added to the boards"""
+        self.play(self.user, [100, 841])
+        self.play(self.other, [842])
+        
+        response = self.client.get('/api/game/leaderboard/')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r['rank'], r['username'], r['score']) for r in response.data['results']],
+            [(1, 'otheruser', 421.0), (2, 'testuser', 10.0)]
+        )
+        self.assertEqual(response.data['me'], {'rank': 2, 'score': 10.0})
+    
+    def test_leaderboard_by_wins_today(self):
+        """Test the daily win-count board"""
+        self.play(self.user, [100, 200])
+        self.play(self.other, [842])
+        
+        response = self.client.get('/api/game/leaderboard/?metric=wins&window=daily&limit=1')
+        
+        self.assertEqual(response.data['day'], timezone.localdate().isoformat())
+        self.assertEqual(
+            [(r['username'], r['score']) for r in response.data['results']],
+            [('testuser', 2)]
+        )
+        self.assertEqual(response.data['me'], {'rank': 1, 'score': 2})
+    
+    def test_user_without_wins_has_no_rank(self):
+        """Test users without wins are not ranked"""
+        self.play(self.user, [841])
+        
+        response = self.client.get('/api/game/leaderboard/')
+        
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['me'], {'rank': None, 'score': 0.0})
+    
+    def test_invalid_parameters(self):
+        """Test unknown metrics, windows and limits are rejected"""
+        response = self.client.get('/api/game/leaderboard/?metric=losses&window=weekly&limit=0')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data), {'metric', 'window', 'limit'})
+    
+    def test_rebuild_leaderboard_command(self):
+        """Test the boards are rebuilt from the statistics and rollups"""
+        self.play(self.user, [100, 842])
+        self.play(self.other, [200])
+        LocMemLeaderboard().clear()
+        
+        call_command('rebuild_leaderboard', stdout=StringIO())
+        
+        response = self.client.get('/api/game/leaderboard/?metric=wins&window=daily')
+        self.assertEqual(
+            [(r['username'], r['score']) for r in response.data['results']],
+            [('testuser', 2), ('otheruser', 1)]
+        )
+        response = self.client.get('/api/game/leaderboard/')
+        self.assertEqual(response.data['me'], {'rank': 1, 'score': 431.0})
+
+
+class WebSocketPlayTests(PlayerTestMixin, TestCase):
+    """Test playing the game over the WebSocket connection"""
+    
+    authentication = None
+    
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+    
+    async def connect(self):
+        communicator = WebsocketCommunicator(application, f'/ws/game/?token={self.token}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())['type'], 'connection_established')
+        return communicator
+    
+    async def test_connect_resolves_user_from_cache(self):
+        """Test reconnects are authenticated without a database query"""
+        reset_connect_stats()
+        for _ in range(2):
+            communicator = await self.connect()
+            await communicator.disconnect()
+        
+        stats = connect_stats()
+        self.assertEqual((stats['database'], stats['cache'], stats['connects']), (1, 1, 2))
+        self.assertIn('p95', stats['latency_ms'])
+    
+    @override_settings(WEBSOCKET_AUTH_CLAIMS_ONLY=True)
+    async def test_connect_claims_only(self):
+        """Test claims-only connections can play without loading the user"""
+        reset_connect_stats()
+        communicator = await self.connect()
+        await communicator.send_json_to({'type': 'play', 'number': 842})
+        
+        self.assertEqual((await communicator.receive_json_from())['data']['result'], 'win')
+        await communicator.disconnect()
+        self.assertEqual(connect_stats()['claims'], 1)
+        self.assertEqual(await GameResult.objects.filter(user=self.user).acount(), 1)
+    
+    async def test_connect_inactive_user_rejected(self):
+        """Test deactivated users cannot connect"""
+        self.user.is_active = False
+        await self.user.asave()
+        
+        communicator = WebsocketCommunicator(application, f'/ws/game/?token={self.token}')
+        connected, _ = await communicator.connect()
+        
+        self.assertFalse(connected)
+    
+    async def test_play_over_websocket(self):
+        """Test a play is stored and answered with its request id"""
+        communicator = await self.connect()
+        await communicator.send_json_to({'type': 'play', 'number': 842, 'request_id': 'abc'})
+        
+        response = await communicator.receive_json_from()
+        
+        self.assertEqual(response, {
+            'type': 'game_result',
+            'request_id': 'abc',
+            'data': {'number': 842, 'result': 'win', 'prize': 421.0}
+        })
+        # Not echoed again through the user's group
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+        self.assertEqual(await GameResult.objects.filter(user=self.user).acount(), 1)
+    
+    async def test_play_is_broadcast_to_other_sockets(self):
+        """Test the user's other connections receive the result"""
+        player = await self.connect()
+        watcher = await self.connect()
+        
+        await player.send_json_to({'type': 'play', 'number': 841})
+        
+        reply = await player.receive_json_from()
+        self.assertEqual(len(reply['request_id']), 32)
+        self.assertEqual(await watcher.receive_json_from(), {
+            'type': 'game_result',
+            'data': {'number': 841, 'result': 'lose', 'prize': None}
+        })
+        await player.disconnect()
+        await watcher.disconnect()
+    
+    async def test_invalid_play(self):
+        """Test validation errors are returned with the request id"""
+        communicator = await self.connect()
+        await communicator.send_json_to({'type': 'play', 'number': 0, 'request_id': 1})
+        
+        response = await communicator.receive_json_from()
+        
+        self.assertEqual(response['type'], 'error')
+        self.assertEqual(response['request_id'], 1)
+        self.assertIn('number', response['errors'])
+        await communicator.disconnect()
+    
+    async def test_play_shares_rest_rate_limit(self):
+        """Test socket plays count against the play_game rate limit"""
+        communicator = await self.connect()
+        for i in range(11):
+            await communicator.send_json_to({'type': 'play', 'number': 100, 'request_id': i})
+            response = await communicator.receive_json_from()
+        
+        self.assertEqual(response['type'], 'error')
+        self.assertEqual(response['message'], 'Request was throttled.')
+        await communicator.disconnect()
+        self.assertEqual(await GameResult.objects.acount(), 10)
+
+
+class CoalescedDeliveryTests(PlayerTestMixin, TestCase):
+    """Test coalescing of game results pushed to a socket"""
+    
+    authentication = None
+    
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+    
+    async def connect(self):
+        communicator = WebsocketCommunicator(application, f'/ws/game/?token={self.token}')
+        await communicator.connect()
+        await communicator.receive_json_from()
+        return communicator
+    
+    async def publish(self, *numbers):
+        channel_layer = get_channel_layer()
+        for number in numbers:
+            await channel_layer.group_send(
+                f'user_{self.user.id}',
+                {'type': 'game.result', 'message': {'number': number, 'result': 'lose', 'prize': None}}
+            )
+    
+    async def test_results_sent_one_frame_each_by_default(self):
+        """Test every result is its own frame without a window"""
+        communicator = await self.connect()
+        await self.publish(1, 3)
+        
+        self.assertEqual((await communicator.receive_json_from())['data']['number'], 1)
+        self.assertEqual((await communicator.receive_json_from())['data']['number'], 3)
+        await communicator.disconnect()
+    
+    @override_settings(GAME_WS_COALESCE={'WINDOW': 0.05, 'MAX_BATCH': 50})
+    async def test_results_within_window_share_a_frame(self):
+        """Test results arriving within the window are sent together"""
+        communicator = await self.connect()
+        await self.publish(1, 3, 5)
+        
+        frame = await communicator.receive_json_from()
+        
+        self.assertEqual(frame['type'], 'game_results')
+        self.assertEqual([r['number'] for r in frame['data']], [1, 3, 5])
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+    
+    @override_settings(GAME_WS_COALESCE={'WINDOW': 10, 'MAX_BATCH': 2})
+    async def test_full_batch_is_sent_before_window(self):
+        """Test reaching MAX_BATCH flushes without waiting for the window"""
+        communicator = await self.connect()
+        await self.publish(1, 3, 5)
+        
+        frame = await communicator.receive_json_from()
+        
+        self.assertEqual([r['number'] for r in frame['data']], [1, 3])
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+
+class FrameEncodingTests(PlayerTestMixin, TestCase):
+    """Test pre-encoded frames and the msgpack subprotocol"""
+    
+    authentication = None
+    
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+    
+    async def connect(self, subprotocols=None):
+        communicator = WebsocketCommunicator(
+            application, f'/ws/game/?token={self.token}', subprotocols=subprotocols
+        )
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator, subprotocol
+    
+    def test_result_event_is_encoded_once(self):
+        """Test the event carries the frame encoded as JSON only"""
+        event = result_event([{'number': 842, 'result': 'win', 'prize': 421.0}])
+        
+        frame = {'type': 'game_result', 'data': event['message']}
+        self.assertEqual(json.loads(event['encoded']['json']), frame)
+        self.assertNotIn('msgpack', event['encoded'])
+    
+    @skipUnless(msgpack, 'msgpack is not installed')
+    async def test_msgpack_socket_encodes_broadcasts(self):
+        """Test msgpack sockets encode the frame of a JSON-encoded event themselves"""
+        communicator, _ = await self.connect(subprotocols=['msgpack'])
+        await communicator.receive_from()
+        event = result_event([{'number': 842, 'result': 'win', 'prize': 421.0}])
+        
+        await get_channel_layer().group_send(f'user_{self.user.id}', event)
+        
+        frame = msgpack.unpackb(await communicator.receive_from())
+        self.assertEqual(frame, {'type': 'game_result', 'data': event['message']})
+        await communicator.disconnect()
+    
+    async def test_encoded_frame_is_forwarded_verbatim(self):
+        """Test consumers send the producer's encoding without re-encoding"""
+        communicator, _ = await self.connect()
+        await communicator.receive_from()
+        event = result_event([{'number': 842, 'result': 'win', 'prize': 421.0}])
+        event['encoded']['json'] = '{"type":"game_result","data":"pre-encoded"}'
+        
+        await get_channel_layer().group_send(f'user_{self.user.id}', event)
+        
+        self.assertEqual(await communicator.receive_from(), event['encoded']['json'])
+        await communicator.disconnect()
+    
+    @skipUnless(msgpack, 'msgpack is not installed')
+    async def test_msgpack_subprotocol(self):
+        """Test sockets negotiating msgpack exchange binary frames"""
+        communicator, subprotocol = await self.connect(subprotocols=['msgpack'])
+        self.assertEqual(subprotocol, 'msgpack')
+        self.assertEqual(
+            msgpack.unpackb(await communicator.receive_from())['type'],
+            'connection_established'
+        )
+        
+        await communicator.send_to(bytes_data=msgpack.packb({'type': 'play', 'number': 842, 'request_id': 'a'}))
+        
+        response = msgpack.unpackb(await communicator.receive_from())
+        self.assertEqual(response['request_id'], 'a')
+        self.assertEqual(response['data'], {'number': 842, 'result': 'win', 'prize': 421.0})
+        await communicator.disconnect()
+    
+    @skipIf(msgpack, 'msgpack is installed')
+    async def test_msgpack_subprotocol_requires_msgpack(self):
+        """Test sockets asking for msgpack keep JSON frames when it is not installed"""
+        communicator, subprotocol = await self.connect(subprotocols=['msgpack'])
+        
+        self.assertIsNone(subprotocol)
+        self.assertEqual(json.loads(await communicator.receive_from())['type'], 'connection_established')
+        await communicator.disconnect()
+    
+    async def test_unknown_subprotocol_falls_back_to_json(self):
+        """Test clients without msgpack support keep JSON text frames"""
+        communicator, subprotocol = await self.connect(subprotocols=['cbor'])
+        
+        self.assertIsNone(subprotocol)
+        self.assertEqual(json.loads(await communicator.receive_from())['type'], 'connection_established')
+        await communicator.disconnect()
+
+
+class JSONRenderingTests(PlayerTestMixin, APITestCase):
+    """Test that the orjson renderer and parser behave like DRF's JSON classes"""
+    
+    authentication = 'token'
+    
+    def assertSameBytes(self, data, accepted_media_type='application/json'):
+        self.assertEqual(
+            ORJSONRenderer().render(data, accepted_media_type, {}),
+            JSONRenderer().render(data, accepted_media_type, {})
+        )
+    
+    def test_values(self):
+        """Test byte-for-byte output for the types the API returns"""
+        paris = dt_timezone(timedelta(hours=2))
+        self.assertSameBytes({
+            'decimal': Decimal('421.00'),
+            'prizes': [Decimal('0.10'), Decimal('6999.30'), None],
+            'float': 421.0,
+            'utc': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'offset': datetime(2024, 5, 1, 12, 30, tzinfo=paris),
+            'naive': datetime(2024, 5, 1, 12, 30),
+            'date': date(2024, 5, 1),
+            'duration': timedelta(minutes=1, seconds=30),
+            'uuid': UUID('12345678-1234-5678-1234-567812345678'),
+            'text': 'café \u2028 line \u2029 paragraph',
+            'lazy': gettext_lazy('Game'),
+            'error': ErrorDetail('Number cannot exceed 9999.', code='max_value'),
+            1: 'integer key',
+            'tuple': (1, 2),
+            'nested': ReturnDict({'list': ReturnList([{'a': True}], serializer=None)}, serializer=None),
+        })
+    
+    def test_fallbacks(self):
+        """Test output orjson cannot produce is rendered by JSONRenderer"""
+        self.assertSameBytes({'big': 2 ** 70})
+        self.assertSameBytes({'number': 842}, 'application/json; indent=4')
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+    
+    def test_api_responses(self):
+        """Test the endpoints render exactly what JSONRenderer renders"""
+        self.client.post('/api/game/play/', {'number': 842})
+        self.client.post('/api/game/play/', {'number': 841})
+        
+        for method, path, data in [
+            ('post', '/api/game/play/', {'number': 100}),
+            ('post', '/api/game/play/', {'number': 0}),
+            ('get', '/api/game/history/', None),
+            ('get', '/api/game/history/all/', None),
+            ('get', '/api/game/statistics/', None),
+            ('post', '/auth/api/login/', {'email': 'test@example.com', 'password': 'wrong'}),
+        ]:
+            with self.subTest(path=path, data=data):
+                response = getattr(self.client, method)(path, data, format='json')
+                self.assertEqual(response.content, JSONRenderer().render(response.data))
+    
+    def test_parser(self):
+        """Test request bodies parse like JSONParser, including its errors"""
+        parser = ORJSONParser()
+        self.assertEqual(parser.parse(BytesIO(b'{"number": 842}')), {'number': 842})
+        self.assertEqual(parser.parse(BytesIO(b'{"big": 1180591620717411303424}')), {'big': 2 ** 70})
+        self.assertEqual(
+            parser.parse(BytesIO('{"name": "café"}'.encode('latin-1')), None, {'encoding': 'latin-1'}),
+            {'name': 'café'}
+        )
+        
+        for body in [b'{"number": ', b'{"number": NaN}', b'\xff']:
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as orjson_error:
+                    parser.parse(BytesIO(body))
+                with self.assertRaises(ParseError) as stdlib_error:
+                    JSONParser().parse(BytesIO(body))
+                self.assertEqual(str(orjson_error.exception), str(stdlib_error.exception))
+    
+    def test_play_with_json_body(self):
+        """Test a JSON request body reaches the view"""
+        response = self.client.post('/api/game/play/', {'number': 842}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b'{"number":842,"result":"win","prize":421.0}')
+
+
+@override_settings(RATELIMIT_BACKEND='numberplay.ratelimit.CacheTokenBucket')
+class RateLimitTests(PlayerTestMixin, APITestCase):
+    """Test token-bucket rate limiting of the game endpoints"""
+    
+    authentication = 'token'
+    
+    def test_rate_limit_headers(self):
+        """Test responses report the state of the user's bucket"""
+        response = self.client.get('/api/game/statistics/')
+        
+        self.assertEqual(response['X-RateLimit-Limit'], '20')
+        self.assertEqual(response['X-RateLimit-Remaining'], '19')
+        self.assertEqual(response['X-RateLimit-Reset'], '3')
+    
+    def test_throttled_after_limit(self):
+        """Test the request after the last token is rejected with 429"""
+        for _ in range(10):
+            self.assertEqual(self.client.post('/api/game/play/', {'number': 842}).status_code, 200)
+        
+        response = self.client.post('/api/game/play/', {'number': 842})
+        
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['X-RateLimit-Remaining'], '0')
+        self.assertEqual(response['Retry-After'], '6')
+        self.assertEqual(GameResult.objects.count(), 10)
+    
+    def test_batch_draws_one_token_per_play(self):
+        """Test a batch uses up the allowance of single plays"""
+        response = self.client.post('/api/game/play/batch/', {'numbers': [2] * 8}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-RateLimit-Remaining'], '2')
+        
+        for _ in range(2):
+            self.assertEqual(self.client.post('/api/game/play/', {'number': 842}).status_code, 200)
+        response = self.client.post('/api/game/play/', {'number': 842})
+        
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(GameResult.objects.count(), 10)
+    
+    def test_batch_throttled_without_enough_tokens(self):
+        """Test a batch larger than the tokens left is rejected whole"""
+        for _ in range(5):
+            self.client.post('/api/game/play/', {'number': 842})
+        
+        response = self.client.post('/api/game/play/batch/', {'numbers': [2] * 6}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['X-RateLimit-Remaining'], '5')
+        self.assertEqual(GameResult.objects.count(), 5)
+    
+    def test_batch_larger_than_limit(self):
+        """Test a batch that could never fit in the bucket is a client error"""
+        response = self.client.post('/api/game/play/batch/', {'numbers': [2] * 11}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['numbers'], ['Cannot play more than 10 numbers at once.'])
+        self.assertEqual(GameResult.objects.count(), 0)
+        
+        response = self.client.post('/api/game/play/batch/', {'numbers': [2] * 10}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    @override_settings(RATELIMIT_ENABLE=False)
+    def test_batch_size_without_rate_limit(self):
+        """Test batches are only capped by GAME_BATCH_MAX_SIZE when rate limiting is off"""
+        response = self.client.post('/api/game/play/batch/', {'numbers': [2] * 11}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 11)
+    
+    def test_limit_shared_with_async_view(self):
+        """Test the sync and async play endpoints draw from one bucket"""
+        for _ in range(5):
+            self.client.post('/api/game/play/', {'number': 842})
+        
+        response = self.client.post('/api/game/async/play/', {'number': 842}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-RateLimit-Remaining'], '4')
+    
+    @override_settings(RATELIMIT_ENABLE=False)
+    def test_rate_limit_disabled(self):
+        """Test no limit or headers when rate limiting is off"""
+        for _ in range(11):
+            response = self.client.post('/api/game/play/', {'number': 842})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-RateLimit-Limit', response)
+    
+    def test_bucket_refills(self):
+        """Test tokens come back at the configured rate"""
+        bucket = CacheTokenBucket()
+        self.assertTrue(bucket.consume('test:bucket', 2, 0.2).allowed)
+        self.assertTrue(bucket.consume('test:bucket', 2, 0.2).allowed)
+        self.assertFalse(bucket.consume('test:bucket', 2, 0.2).allowed)
+        
+        time.sleep(0.15)
+        self.assertTrue(bucket.consume('test:bucket', 2, 0.2).allowed)
+
+
+class RedisPoolTests(TestCase):
+    """Test the process-wide Redis connection pools"""
+    
+    url = 'redis://:secret@127.0.0.1:6399/1'
+    
+    def test_clients_share_one_pool_per_url(self):
+        """Test every client of a URL borrows from the same pool"""
+        self.assertIs(
+            redis_client.get_redis(self.url).connection_pool,
+            redis_client.get_redis(self.url).connection_pool
+        )
+        self.assertIsNot(redis_client.get_pool(self.url), redis_client.get_pool())
+    
+    def test_cache_backend_uses_shared_pool(self):
+        """Test the Redis cache backend borrows from the shared pool"""
+        backend = redis_client.PooledRedisCache(self.url, {})
+        
+        self.assertIs(backend._cache._get_connection_pool(write=True), redis_client.get_pool(self.url))
+    
+    def test_async_pool_per_event_loop(self):
+        """Test asyncio pools are shared within a loop but not across loops"""
+        async def pools():
+            return redis_client.get_async_pool(self.url), redis_client.get_async_pool(self.url)
+        
+        first, again = async_to_sync(pools)()
+        other, _ = async_to_sync(pools)()
+        
+        self.assertIs(first, again)
+        self.assertIsNot(first, other)
+    
+    def test_pool_stats(self):
+        """Test stats report pool sizes without passwords"""
+        redis_client.get_pool(self.url)
+        
+        stats = redis_client.pool_stats()
+        
+        entry = stats['redis://:***@127.0.0.1:6399/1']
+        self.assertEqual(entry['max_connections'], 50)
+        self.assertEqual((entry['in_use'], entry['utilization']), (0, 0.0))
+
+
+@override_settings(HEALTH_CHECK={'INTERVAL': 60, 'STALE_AFTER': 120, 'BACKGROUND': False})
+class HealthProbeTests(TestCase):
+    """Test the liveness and readiness probes"""
+    
+    def setUp(self):
+        cache.clear()
+        # Leave Redis out so the probes do not depend on a running server
+        monitor.checks = {name: CHECKS[name] for name in ('database', 'cache')}
+        monitor._snapshot = None
+    
+    def tearDown(self):
+        monitor.checks = None
+        monitor._snapshot = None
+    
+    def test_live(self):
+        """Test the liveness probe touches no dependency"""
+        with self.assertNumQueries(0):
+            response = self.client.get('/health/live/')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'alive'})
+    
+    def test_ready_serves_snapshot(self):
+        """Test readiness reports the status of each dependency and reuses the snapshot"""
+        response = self.client.get('/health/ready/')
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['services'], {'database': {'status': 'healthy'}, 'cache': {'status': 'healthy'}})
+        self.assertNotIn('redis_pools', data)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get('/health/ready/')
+        self.assertEqual(response.json()['checked_at'], data['checked_at'])
+    
+    def test_health_keeps_original_format(self):
+        """Test /health/ keeps its keys and plain status strings for existing monitors"""
+        def broken():
+            raise RuntimeError('down')
+        monitor.checks = {'database': CHECKS['database'], 'broken': broken}
+        
+        with self.assertLogs('numberplay.health', 'WARNING'):
+            response = self.client.get('/health/')
+        
+        self.assertEqual(response.status_code, 503)
+        data = response.json()
+        self.assertEqual(set(data), {'status', 'timestamp', 'services'})
+        self.assertEqual(data['status'], 'unhealthy')
+        self.assertEqual(data['services'], {'database': 'healthy', 'broken': 'unhealthy'})
+    
+    def test_ready_reports_failures(self):
+        """Test a failing dependency makes the instance not ready"""
+        def broken():
+            raise RuntimeError('down')
+        monitor.checks = {'database': CHECKS['database'], 'broken': broken}
+        
+        with self.assertLogs('numberplay.health', 'WARNING'):
+            response = self.client.get('/health/ready/')
+        
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['services']['broken'], {'status': 'unhealthy'})
+    
+    def test_details_for_staff_only(self):
+        """Test latencies, errors and pool usage are only served to staff"""
+        def broken():
+            raise RuntimeError('down')
+        monitor.checks = {'database': CHECKS['database'], 'broken': broken}
+        self.assertEqual(self.client.get('/health/details/').status_code, 401)
+        
+        staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='staffpass123', is_staff=True
+        )
+        self.client.force_login(staff)
+        with self.assertLogs('numberplay.health', 'WARNING'):
+            response = self.client.get('/health/details/')
+        
+        self.assertEqual(response.status_code, 503)
+        data = response.json()
+        self.assertEqual(data['services']['broken']['error'], 'down')
+        self.assertIn('latency_ms', data['services']['database'])
+        self.assertIn('redis_pools', data)
+        self.assertIn('response_cache', data)
+        self.assertIn('connects', data['websocket_connects'])
+    
+    @override_settings(HEALTH_CHECK={'INTERVAL': 60, 'STALE_AFTER': -1, 'BACKGROUND': False})
+    def test_stale_snapshot_is_unhealthy(self):
+        """Test a snapshot older than STALE_AFTER is reported unhealthy"""
+        snapshot = HealthMonitor(checks={'cache': CHECKS['cache']}).snapshot()
+        
+        self.assertEqual(snapshot['status'], 'unhealthy')
+        self.assertTrue(snapshot['stale'])
+
+
+class RequestLoggingTests(PlayerTestMixin, APITestCase):
+    """Test the sampled, queued request logging middleware"""
+    
+    authentication = None
+    
+    def middleware(self, response=None, get_response=None, **conf):
+        def respond(request):
+            return response or HttpResponse('ok')
+        
+        settings = {'ENABLED': True, 'LOGGER': 'numberplay.requests', 'SAMPLE_RATE': 1.0,
+                    'SAMPLE_RATES': {}, 'QUEUE_SIZE': 100, **conf}
+        with override_settings(REQUEST_LOGGING=settings):
+            return RequestLoggingMiddleware(get_response or respond)
+    
+    @override_settings(REQUEST_LOGGING={
+        'ENABLED': True, 'LOGGER': 'numberplay.requests', 'SAMPLE_RATE': 1.0, 'SAMPLE_RATES': {}, 'QUEUE_SIZE': 100
+    })
+    def test_one_record_per_request(self):
+        """Test a request is logged once with its user, status and duration"""
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        
+        with self.assertLogs('numberplay.requests', 'INFO') as logs:
+            self.client.get('/api/game/statistics/')
+        
+        self.assertEqual(len(logs.records), 1)
+        fields = logs.records[0].fields
+        self.assertEqual(fields['method'], 'GET')
+        self.assertEqual(fields['path'], '/api/game/statistics/')
+        self.assertEqual(fields['status_code'], 200)
+        self.assertEqual(fields['user_id'], self.user.id)
+        self.assertGreaterEqual(fields['duration_ms'], 0)
+    
+    def test_does_not_authenticate(self):
+        """Test the user is not resolved when nothing else needed it"""
+        resolved = []
+        request = RequestFactory().get('/health/live/')
+        request.user = SimpleLazyObject(lambda: resolved.append(True) or self.user)
+        
+        with self.assertLogs('numberplay.requests', 'INFO') as logs:
+            self.middleware()(request)
+        
+        self.assertEqual(resolved, [])
+        self.assertIsNone(logs.records[0].fields['user_id'])
+    
+    def test_sampling(self):
+        """Test per-path sample rates, with the longest prefix winning"""
+        middleware = self.middleware(SAMPLE_RATE=0.0, SAMPLE_RATES={'/api/': 1.0, '/api/game/history/': 0.0})
+        
+        self.assertEqual(middleware.sample_rate('/health/live/'), 0.0)
+        self.assertEqual(middleware.sample_rate('/api/game/play/'), 1.0)
+        self.assertEqual(middleware.sample_rate('/api/game/history/all/'), 0.0)
+        with self.assertNoLogs('numberplay.requests', 'INFO'):
+            middleware(RequestFactory().get('/api/game/history/'))
+        with self.assertLogs('numberplay.requests', 'INFO'):
+            middleware(RequestFactory().get('/api/game/play/'))
+    
+    def test_server_errors_always_logged(self):
+        """Test that sampling never drops a server error"""
+        middleware = self.middleware(response=HttpResponse(status=500), SAMPLE_RATE=0.0)
+        
+        with self.assertLogs('numberplay.requests', 'INFO') as logs:
+            middleware(RequestFactory().get('/api/game/play/'))
+        self.assertEqual(logs.records[0].fields['status_code'], 500)
+    
+    def test_async_requests(self):
+        """Test the middleware stays async when the rest of the chain is"""
+        async def get_response(request):
+            return HttpResponse('ok')
+        
+        middleware = self.middleware(get_response=get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        
+        with self.assertLogs('numberplay.requests', 'INFO') as logs:
+            response = async_to_sync(middleware)(RequestFactory().get('/api/game/async/statistics/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(logs.records), 1)
+    
+    @override_settings(REQUEST_LOGGING={'ENABLED': False})
+    def test_disabled(self):
+        """Test the middleware removes itself when disabled"""
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestLoggingMiddleware(lambda request: HttpResponse('ok'))
+    
+    def test_full_queue_drops_records(self):
+        """Test records are dropped rather than blocking when the writer falls behind"""
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.LogRecord('numberplay.requests', logging.INFO, __file__, 1, 'GET /', None, None)
+        handler.handle(record)
+        handler.handle(record)
+        
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(handler.dropped, 1)
+    
+    def test_queue_logger_uses_configured_handlers(self):
+        """Test the handlers configured for the logger are moved behind the queue"""
+        stream = StringIO()
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(JSONFormatter())
+        logger = logging.getLogger('numberplay.tests.queued')
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        
+        self.assertIs(queue_logger('numberplay.tests.queued'), logger)
+        self.assertEqual([type(h) for h in logger.handlers], [DroppingQueueHandler])
+        self.assertTrue(logger.propagate)
+        
+        logger.info('queued', extra={'fields': {'status_code': 200}})
+        deadline = time.monotonic() + 5
+        while not stream.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(json.loads(stream.getvalue())['status_code'], 200)
+    
+    def test_queue_logger_without_handlers(self):
+        """Test a logger with no handlers of its own is left to propagate as configured"""
+        logger = queue_logger('numberplay.tests.unconfigured')
+        
+        self.assertEqual(logger.handlers, [])
+        self.assertTrue(logger.propagate)
+    
+    def test_json_formatter(self):
+        """Test records are formatted as one JSON object with their fields"""
+        record = logging.LogRecord('numberplay.requests', logging.INFO, __file__, 1, 'GET %s', ('/',), None)
+        record.fields = {'status_code': 200, 'user_id': None}
+        
+        data = json.loads(JSONFormatter().format(record))
+        self.assertEqual(data['message'], 'GET /')
+        self.assertEqual(data['status_code'], 200)
+        self.assertIsNone(data['user_id'])
+
+class GameResultAdminStatsTests(TestCase):
+    """Test statistics on the GameResult admin changelist"""
+    
+    url = '/admin/game_app/gameresult/'
+    
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='adminpass123'
+        )
+        self.client.force_login(self.admin)
+        GameResult.objects.create(user=self.admin, number=842, result='win', prize=421.0)
+        GameResult.objects.create(user=self.admin, number=100, result='win', prize=10.0)
+        GameResult.objects.create(user=self.admin, number=841, result='lose', prize=None)
+    
+    def test_changelist_stats(self):
+        """Test statistics of the whole table"""
+        stats = self.client.get(self.url).context['stats']
+        
+        self.assertEqual(stats['total_games'], 3)
+        self.assertEqual(stats['wins'], 2)
+        self.assertEqual(stats['losses'], 1)
+        self.assertEqual(stats['win_rate'], 66.7)
+        self.assertEqual(float(stats['total_prize']), 431.0)
+        self.assertEqual(float(stats['avg_prize']), 215.5)
+        self.assertFalse(stats['estimated'])
+    
+    def test_changelist_stats_filtered(self):
+        """Test statistics follow the changelist filters"""
+        stats = self.client.get(self.url, {'result__exact': 'lose'}).context['stats']
+        
+        self.assertEqual(stats['total_games'], 1)
+        self.assertEqual(stats['wins'], 0)
+    
+    def test_changelist_stats_cached_per_filter(self):
+        """Test statistics are cached per filter combination but not per page"""
+        self.client.get(self.url)
+        GameResult.objects.create(user=self.admin, number=2, result='win', prize=0.2)
+        
+        self.assertEqual(self.client.get(self.url, {'o': '1'}).context['stats']['total_games'], 3)
+        self.assertEqual(self.client.get(self.url, {'result__exact': 'win'}).context['stats']['total_games'], 3)
+    
+    @override_settings(GAME_ADMIN_STATS={'CACHE_TTL': 30, 'USE_ESTIMATES': True})
+    def test_estimates_fall_back_to_exact_counts(self):
+        """Test databases without table statistics get exact counts"""
+        stats = self.client.get(self.url).context['stats']
+        
+        self.assertEqual(stats['total_games'], 3)
+        self.assertFalse(stats['estimated'])
+
+
 class GameModelTests(TestCase):
     """Test GameResult model"""
     
@@ -188,3 +1849,85 @@ class GameModelTests(TestCase):
         results = GameResult.objects.all()
         self.assertEqual(results[0].number, 200)  # Newest first
         self.assertEqual(results[1].number, 100)  # Oldest last
+
+
+class SettingsTests(SimpleTestCase):
+    """Test configuration chosen by numberplay.settings from the environment"""
+    
+    def load_settings(self, **env):
+        with mock.patch.dict(os.environ, env):
+            return runpy.run_path(Path(settings_module.__file__))
+    
+    def test_response_cache_follows_cache_backend(self):
+        """Test the response cache is only on by default with a shared cache"""
+        self.assertFalse(self.load_settings(CACHE_BACKEND='locmem')['GAME_RESPONSE_CACHE']['ENABLED'])
+        self.assertTrue(self.load_settings(CACHE_BACKEND='redis')['GAME_RESPONSE_CACHE']['ENABLED'])
+        self.assertTrue(self.load_settings(
+            CACHE_BACKEND='locmem', GAME_RESPONSE_CACHE_ENABLED='True'
+        )['GAME_RESPONSE_CACHE']['ENABLED'])
+    
+    def test_local_response_cache_refused_with_write_behind(self):
+        """Test write-behind mode cannot run with a per-process response cache"""
+        with self.assertRaises(ImproperlyConfigured):
+            self.load_settings(
+                CACHE_BACKEND='locmem', GAME_RESPONSE_CACHE_ENABLED='True', GAME_WRITE_BEHIND_ENABLED='True'
+            )
+        
+        conf = self.load_settings(CACHE_BACKEND='redis', GAME_WRITE_BEHIND_ENABLED='True')
+        self.assertTrue(conf['GAME_RESPONSE_CACHE']['ENABLED'])
+    
+    def load_database(self, pool_installed=True, **env):
+        real_find_spec = importlib.util.find_spec
+        
+        def find_spec(name, *args):
+            if name == 'dj_db_conn_pool':
+                return mock.sentinel.spec if pool_installed else None
+            return real_find_spec(name, *args)
+        
+        with mock.patch('importlib.util.find_spec', find_spec):
+            return self.load_settings(**env)['DATABASES']['default']
+    
+    def test_sqlite_persistent_connections(self):
+        """Test DB_CONN_MAX_AGE and DB_CONN_HEALTH_CHECKS apply to the default database"""
+        database = self.load_database(DATABASE_URL='sqlite:///db.sqlite3', DB_CONN_MAX_AGE='60')
+        
+        self.assertEqual(database['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(database['CONN_MAX_AGE'], 60)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+    
+    def test_mysql_without_pool(self):
+        """Test a MySQL URL keeps Django's engine with persistent connections"""
+        database = self.load_database(
+            DATABASE_URL='mysql://user:pass@db:3306/numberplay', DB_CONN_MAX_AGE='60',
+            DB_CONN_HEALTH_CHECKS='False', DB_POOL_ENABLED='False'
+        )
+        
+        self.assertEqual(database['ENGINE'], 'django.db.backends.mysql')
+        self.assertEqual(database['CONN_MAX_AGE'], 60)
+        self.assertFalse(database['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('POOL_OPTIONS', database)
+    
+    def test_mysql_pool(self):
+        """Test DB_POOL_ENABLED picks the pooled engine and returns connections after every request"""
+        database = self.load_database(
+            DATABASE_URL='mysql://user:pass@db:3306/numberplay', DB_CONN_MAX_AGE='60',
+            DB_CONN_HEALTH_CHECKS='False', DB_POOL_ENABLED='True', DB_POOL_SIZE='5'
+        )
+        
+        self.assertEqual(database['ENGINE'], 'dj_db_conn_pool.backends.mysql')
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['POOL_OPTIONS'], {
+            'POOL_SIZE': 5, 'MAX_OVERFLOW': 10, 'RECYCLE': 3600, 'TIMEOUT': 30, 'PRE_PING': False,
+        })
+    
+    def test_mysql_pool_requires_package(self):
+        """Test DB_POOL_ENABLED fails at startup without django-db-connection-pool"""
+        with self.assertRaises(ImproperlyConfigured):
+            self.load_database(
+                pool_installed=False, DATABASE_URL='mysql://user:pass@db:3306/numberplay', DB_POOL_ENABLED='True'
+            )
+    
+    def test_request_logging_off_in_test_settings(self):
+        """Test request logging is on by default and off in numberplay.test_settings"""
+        self.assertTrue(self.load_settings()['REQUEST_LOGGING']['ENABLED'])
+        self.assertFalse(import_module('numberplay.test_settings').REQUEST_LOGGING['ENABLED'])
@@ -1,11 +1,21 @@
 from django.urls import path
-from . import views
+from . import views, async_views
 
 app_name = 'game_app'
 
 urlpatterns = [
     # API endpoints
     path('play/', views.play_game, name='play_game'),
+    path('play/batch/', views.play_game_batch, name='play_game_batch'),
     path('history/', views.game_history, name='game_history'),
+    path('history/all/', views.game_history_pages, name='game_history_pages'),
+    path('history/export/', views.export_game_history, name='export_game_history'),
     path('statistics/', views.user_statistics, name='user_statistics'),
+    path('statistics/window/', views.user_window_statistics, name='user_window_statistics'),
+    path('leaderboard/', views.game_leaderboard, name='game_leaderboard'),
+    
+    # Native async versions for ASGI deployments
+    path('async/play/', async_views.play_game, name='async_play_game'),
+    path('async/history/', async_views.game_history, name='async_game_history'),
+    path('async/statistics/', async_views.user_statistics, name='async_user_statistics'),
 ] 
\ No newline at end of file
@@ -3,25 +3,58 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
-from django.db.models import Sum, Count
-from django_ratelimit.decorators import ratelimit
-from .serializers import GamePlaySerializer, GameResultSerializer
-from .models import GameResult
-from .consumers import GameConsumer
+from numberplay.ratelimit import add_rate_limit_headers, check, ratelimit, throttled_response
+from .serializers import (
+    GAME_RESULT_VALUES, GamePlaySerializer, GameBatchPlaySerializer, GameResultSerializer,
+    render_game_results,
+)
+from .models import GameResult, UserGameStats
+from .services import PLAY_RATE, PLAY_RATELIMIT_GROUP, resolve_play, result_message, save_game_results
+from .cache import get_or_set
+from .encoding import result_event
+from .pagination import KeysetPagination
+from .rollups import WINDOWS, window_totals
+from .rules import get_payout_table
+from . import leaderboard
+from .export import FORMATS, aiter_rows, astream, iter_rows, stream
+from django.conf import settings
+from django.utils import timezone
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
-import json
+import redis
+from decimal import Decimal
 
 def calculate_prize(number):
     """Calculate prize based on number value"""
-    if number > 900:
-        return round(number * 0.70, 2)
-    elif number > 600:
-        return round(number * 0.50, 2)
-    elif number > 300:
-        return round(number * 0.30, 2)
-    else:
-        return round(number * 0.10, 2)
+    return float(get_payout_table().prize(number))
+
+def build_statistics(total_games, wins, total_prize=None, best_prize=None, last_played=None):
+    """Build the statistics payload from aggregated values"""
+    if total_games == 0:
+        return {
+            'total_games': 0,
+            'wins': 0,
+            'losses': 0,
+            'win_rate': 0,
+            'total_prize': 0,
+            'average_prize': 0,
+            'best_prize': 0,
+            'last_played': None
+        }
+    
+    total_prize = total_prize or 0
+    return {
+        'total_games': total_games,
+        'wins': wins,
+        'losses': total_games - wins,
+        'win_rate': round((wins / total_games * 100), 2),
+        'total_prize': float(total_prize),
+        'average_prize': round(float(total_prize / wins), 2) if wins > 0 else 0,
+        'best_prize': float(best_prize or 0),
+        'last_played': last_played.isoformat() if last_played else None
+    }
 
 @extend_schema(
     tags=['Game'],
@@ -48,49 +81,100 @@ def calculate_prize(number):
         429: None
     }
 )
-@ratelimit(key='user', rate='10/m', method='POST')
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@ratelimit(group=PLAY_RATELIMIT_GROUP, rate=PLAY_RATE)
 def play_game(request):
     """API endpoint for playing the game"""
     serializer = GamePlaySerializer(data=request.data)
     if serializer.is_valid():
         number = serializer.validated_data['number']
-        
-        # Determine if it's a win (even number) or lose (odd number)
-        is_even = number % 2 == 0
-        result = 'win' if is_even else 'lose'
-        prize = calculate_prize(number) if is_even else None
+        result, prize = resolve_play(number)
         
         # Save game result
-        game_result = GameResult.objects.create(
-            user=request.user,
-            number=number,
-            result=result,
-            prize=prize
-        )
+        save_game_results(request.user, [(number, result, prize)])
         
         # Prepare response data
-        response_data = {
-            'number': number,
-            'result': result,
-            'prize': prize
-        }
+        response_data = result_message(number, result, prize)
         
         # Send result via WebSocket
         channel_layer = get_channel_layer()
         async_to_sync(channel_layer.group_send)(
             f"user_{request.user.id}",
-            {
-                "type": "game.result",
-                "message": response_data
-            }
+            result_event([response_data])
         )
         
         return Response(response_data, status=status.HTTP_200_OK)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@extend_schema(
+    tags=['Game'],
+    summary='Play the number game in batch',
+    description='Submit several numbers at once, e.g. when replaying plays queued offline. '
+                'All results are stored in one insert and pushed as a single WebSocket message. '
+                'Every number counts as one play against the play rate limit.',
+    request=GameBatchPlaySerializer,
+    examples=[
+        OpenApiExample(
+            'Batch example',
+            value={'numbers': [842, 841, 100]},
+            status_codes=['200']
+        )
+    ],
+    responses={
+        200: {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer'},
+                'wins': {'type': 'integer'},
+                'total_prize': {'type': 'number'},
+                'results': {'type': 'array', 'items': {'type': 'object'}}
+            }
+        },
+        400: GameBatchPlaySerializer,
+        401: None,
+        429: None
+    }
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def play_game_batch(request):
+    """API endpoint for playing several numbers in one request"""
+    serializer = GameBatchPlaySerializer(data=request.data)
+    if serializer.is_valid():
+        numbers = serializer.validated_data['numbers']
+        
+        # Each number is a play, so a batch draws from the bucket of play_game
+        limit = check(PLAY_RATELIMIT_GROUP, request.user, PLAY_RATE, cost=len(numbers))
+        if limit is not None and not limit.allowed:
+            return add_rate_limit_headers(throttled_response(), limit)
+        
+        plays = [(number, *resolve_play(number)) for number in numbers]
+        results = [result_message(*play) for play in plays]
+        
+        # Save all game results in a single INSERT
+        save_game_results(request.user, plays)
+        
+        # Send all results via WebSocket in one message
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(
+            f"user_{request.user.id}",
+            result_event(results)
+        )
+        
+        prizes = [prize for _, result, prize in plays if result == 'win']
+        response_data = {
+            'count': len(results),
+            'wins': len(prizes),
+            'total_prize': float(sum(prizes, Decimal('0.00'))),
+            'results': results
+        }
+        
+        return add_rate_limit_headers(Response(response_data, status=status.HTTP_200_OK), limit)
+    
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
 @extend_schema(
     tags=['Game'],
     summary='Get game history',
@@ -100,14 +184,85 @@ def play_game(request):
         401: None
     }
 )
-@ratelimit(key='user', rate='30/m', method='GET')
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@ratelimit(group='game_app.views.game_history', rate='30/m')
 def game_history(request):
     """Get user's game history"""
-    results = GameResult.objects.filter(user=request.user)[:3]  # Last 3 games
-    serializer = GameResultSerializer(results, many=True)
-    return Response(serializer.data)
+    def build():
+        results = GameResult.objects.filter(user=request.user).values(*GAME_RESULT_VALUES)[:3]  # Last 3 games
+        return render_game_results(results)
+    
+    return Response(get_or_set('history', request.user.id, build))
+
+@extend_schema(
+    tags=['Game'],
+    summary='Get full game history',
+    description='Retrieve all game results of the current user, newest first, one page at a time. '
+                'Follow the `next` link to get the next page.',
+    parameters=[
+        OpenApiParameter('cursor', str, description='Opaque position returned in the `next` link'),
+        OpenApiParameter('page_size', int, description='Results per page'),
+    ],
+    responses={
+        200: KeysetPagination().get_paginated_response_schema({
+            'type': 'array',
+            'items': {'$ref': '#/components/schemas/GameResult'}
+        }),
+        401: None,
+        404: None
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@ratelimit(group='game_app.views.game_history_pages', rate='30/m')
+def game_history_pages(request):
+    """Get user's full game history, one keyset page at a time"""
+    paginator = KeysetPagination()
+    results = paginator.paginate_queryset(
+        GameResult.objects.filter(user=request.user).values(*GAME_RESULT_VALUES),
+        request
+    )
+    return paginator.get_paginated_response(render_game_results(results))
+
+@extend_schema(
+    tags=['Game'],
+    summary='Export game history',
+    description='Stream every game result of the current user, newest first, as NDJSON or CSV',
+    parameters=[
+        OpenApiParameter('output', str, enum=list(FORMATS), description='Export format (default: ndjson)'),
+    ],
+    responses={
+        (200, 'application/x-ndjson'): {'type': 'string'},
+        (200, 'text/csv'): {'type': 'string'},
+        400: None,
+        401: None
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@ratelimit(group='game_app.views.export_game_history', rate='5/m')
+def export_game_history(request):
+    """Stream user's complete game history as NDJSON or CSV"""
+    output = request.query_params.get('output', 'ndjson')
+    if output not in FORMATS:
+        return Response(
+            {'output': [f"Must be one of: {', '.join(FORMATS)}."]},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    content_type, header, line = FORMATS[output]
+    queryset = GameResult.objects.filter(user=request.user)
+    chunk_size = settings.GAME_EXPORT_CHUNK_SIZE
+    if isinstance(request._request, ASGIRequest):
+        # Daphne would read a sync iterator into a list before sending it
+        content = astream(aiter_rows(queryset, chunk_size), header, line)
+    else:
+        content = stream(iter_rows(queryset, chunk_size), header, line)
+    
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="game-history.{output}"'
+    return response
 
 @extend_schema(
     tags=['Game'],
@@ -130,44 +285,150 @@ def game_history(request):
         401: None
     }
 )
-@ratelimit(key='user', rate='20/m', method='GET')
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@ratelimit(group='game_app.views.user_statistics', rate='20/m')
 def user_statistics(request):
     """Get user's game statistics"""
-    user_results = GameResult.objects.filter(user=request.user)
-    total_games = user_results.count()
+    def build():
+        stats = UserGameStats.objects.filter(user=request.user).first()
+        if stats is None:
+            return build_statistics(0, 0)
+        return build_statistics(
+            stats.games, stats.wins, stats.total_prize, stats.best_prize, stats.last_played
+        )
     
-    if total_games > 0:
-        wins = user_results.filter(result='win').count()
-        total_prize = user_results.filter(result='win').aggregate(
-            total=Sum('prize')
-        )['total'] or 0
-        best_prize = user_results.filter(result='win').aggregate(
-            best=Sum('prize')
-        )['best'] or 0
-        last_played = user_results.first().created_at
-        
-        stats = {
-            'total_games': total_games,
-            'wins': wins,
-            'losses': total_games - wins,
-            'win_rate': round((wins / total_games * 100), 2),
-            'total_prize': float(total_prize),
-            'average_prize': round(float(total_prize / wins), 2) if wins > 0 else 0,
-            'best_prize': float(best_prize),
-            'last_played': last_played.isoformat() if last_played else None
-        }
-    else:
-        stats = {
-            'total_games': 0,
-            'wins': 0,
-            'losses': 0,
-            'win_rate': 0,
-            'total_prize': 0,
-            'average_prize': 0,
-            'best_prize': 0,
-            'last_played': None
+    return Response(get_or_set('statistics', request.user.id, build))
+
+@extend_schema(
+    tags=['Game'],
+    summary='Get user statistics for a time window',
+    description='Retrieve statistics for the current user over the last 24h, 7d or 30d (whole days, '
+                'ending today) or all time, read from daily rollups',
+    parameters=[
+        OpenApiParameter('window', str, enum=list(WINDOWS), description='Time window (default: 7d)'),
+    ],
+    responses={
+        200: {
+            'type': 'object',
+            'properties': {
+                'window': {'type': 'string'},
+                'since': {'type': 'string', 'format': 'date', 'nullable': True},
+                'total_games': {'type': 'integer'},
+                'wins': {'type': 'integer'},
+                'losses': {'type': 'integer'},
+                'win_rate': {'type': 'number'},
+                'total_prize': {'type': 'number'},
+                'average_prize': {'type': 'number'},
+                'best_prize': {'type': 'number'}
+            }
+        },
+        400: None,
+        401: None
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@ratelimit(group='game_app.views.user_window_statistics', rate='20/m')
+def user_window_statistics(request):
+    """Get user's game statistics for a time window"""
+    window = request.query_params.get('window', '7d')
+    if window not in WINDOWS:
+        return Response(
+            {'window': [f"Must be one of: {', '.join(WINDOWS)}."]},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    def build():
+        since, plays, wins, prize_sum, best_prize = window_totals(request.user, window)
+        stats = build_statistics(plays, wins, prize_sum, best_prize)
+        del stats['last_played']
+        return {
+            'window': window,
+            'since': since.isoformat() if since else None,
+            **stats
         }
     
-    return Response(stats)
+    # Keyed by date too, so windows move on at midnight
+    variant = f'{window}:{timezone.localdate().isoformat()}'
+    return Response(get_or_set('window-statistics', request.user.id, build, variant=variant))
+
+@extend_schema(
+    tags=['Game'],
+    summary='Get the leaderboard',
+    description='Top players by total prize or number of wins, all-time or for today, '
+                'with the rank of the current user',
+    parameters=[
+        OpenApiParameter('metric', str, enum=list(leaderboard.METRICS), description='Ranking metric (default: prize)'),
+        OpenApiParameter('window', str, enum=list(leaderboard.WINDOWS), description='Time window (default: all)'),
+        OpenApiParameter('limit', int, description='Number of players returned (default: 10, max: 100)'),
+    ],
+    responses={
+        200: {
+            'type': 'object',
+            'properties': {
+                'metric': {'type': 'string'},
+                'window': {'type': 'string'},
+                'day': {'type': 'string', 'format': 'date', 'nullable': True},
+                'results': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'object',
+                        'properties': {
+                            'rank': {'type': 'integer'},
+                            'user_id': {'type': 'integer'},
+                            'username': {'type': 'string'},
+                            'score': {'type': 'number'}
+                        }
+                    }
+                },
+                'me': {
+                    'type': 'object',
+                    'properties': {
+                        'rank': {'type': 'integer', 'nullable': True},
+                        'score': {'type': 'number'}
+                    }
+                }
+            }
+        },
+        400: None,
+        401: None,
+        503: None
+    }
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@ratelimit(group='game_app.views.game_leaderboard', rate='30/m')
+def game_leaderboard(request):
+    """Get the top players and the current user's rank"""
+    conf = settings.GAME_LEADERBOARD
+    metric = request.query_params.get('metric', 'prize')
+    window = request.query_params.get('window', 'all')
+    errors = {}
+    if metric not in leaderboard.METRICS:
+        errors['metric'] = [f"Must be one of: {', '.join(leaderboard.METRICS)}."]
+    if window not in leaderboard.WINDOWS:
+        errors['window'] = [f"Must be one of: {', '.join(leaderboard.WINDOWS)}."]
+    try:
+        limit = int(request.query_params.get('limit', conf['DEFAULT_LIMIT']))
+        if not 1 <= limit <= conf['MAX_LIMIT']:
+            raise ValueError
+    except ValueError:
+        errors['limit'] = [f"Must be an integer between 1 and {conf['MAX_LIMIT']}."]
+    if errors:
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not leaderboard.leaderboard_enabled():
+        return Response(
+            {'detail': 'Leaderboard is disabled.'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    
+    try:
+        data = leaderboard.get_standings(metric, window, limit, request.user.id)
+    except redis.RedisError:
+        return Response(
+            {'detail': 'Leaderboard is temporarily unavailable.'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return Response(data)
@@ -0,0 +1,152 @@
+"""
+Health state of the process's dependencies.
+
+Readiness probes read a snapshot that a background thread refreshes every
+``HEALTH_CHECK['INTERVAL']`` seconds, so a probe costs the same no matter how
+often the load balancer calls it. Each dependency reports its own latency.
+A snapshot older than ``HEALTH_CHECK['STALE_AFTER']`` seconds (e.g. because
+the refresher stopped) is reported as unhealthy.
+
+Public probes only see the status of each check; latencies, error messages
+and the process counters in ``STATS`` (connection pools, cache hit rates, socket connects) are
+logged or served to staff.
+"""
+
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+def check_database():
+    connection = connections['default']
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except Exception:
+        # Reconnect on the next check
+        connection.close()
+        raise
+
+def check_redis():
+    get_redis(settings.CELERY_BROKER_URL).ping()
+
+def check_cache():
+    cache.set('health_check', 'ok', timeout=10)
+    if cache.get('health_check') != 'ok':
+        raise RuntimeError('cache not working')
+
+CHECKS = {
+    'database': check_database,
+    'redis': check_redis,
+    'cache': check_cache,
+}
+
+# Per-process counters served with the detailed snapshot
+STATS = {
+    'redis_pools': 'numberplay.redis_client.pool_stats',
+    'response_cache': 'game_app.cache.cache_stats',
+    'websocket_connects': 'auth_app.user_cache.connect_stats',
+}
+
+def collect_stats():
+    """Return the counters of every entry of STATS"""
+    return {name: import_string(path)() for name, path in STATS.items()}
+
+def run_checks(checks=None):
+    """Run every check once and return the snapshot"""
+    services = {}
+    for name, check in (checks or CHECKS).items():
+        started = time.perf_counter()
+        try:
+            check()
+            result = {'status': 'healthy'}
+        except Exception as e:
+            logger.warning(f"Health check {name} failed: {e}")
+            result = {'status': 'unhealthy', 'error': str(e)}
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        services[name] = result
+
+    healthy = all(service['status'] == 'healthy' for service in services.values())
+    return {
+        'status': 'healthy' if healthy else 'unhealthy',
+        'checked_at': timezone.now().isoformat(),
+        'checked': time.monotonic(),
+        'services': services,
+    }
+
+class HealthMonitor:
+    """Keeps a health snapshot fresh, in a background thread or on read"""
+
+    def __init__(self, checks=None):
+        self.checks = checks
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._thread = None
+        self._pid = None
+
+    def refresh(self):
+        snapshot = run_checks(self.checks)
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def _run(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Health refresh failed")
+
+    def _ensure_thread(self, interval):
+        # Threads do not survive a fork, so start one per process
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, args=(interval,), name='health-monitor', daemon=True
+                )
+                self._thread.start()
+
+    def snapshot(self, detail=False):
+        """
+        Return the latest snapshot with its age, refreshing it if needed.
+
+        Without ``detail`` each service only reports its status.
+        """
+        conf = settings.HEALTH_CHECK
+        with self._lock:
+            snapshot = self._snapshot
+
+        if snapshot is None or (
+            not conf['BACKGROUND'] and time.monotonic() - snapshot['checked'] >= conf['INTERVAL']
+        ):
+            snapshot = self.refresh()
+        if conf['BACKGROUND']:
+            self._ensure_thread(conf['INTERVAL'])
+
+        age = time.monotonic() - snapshot['checked']
+        result = {key: value for key, value in snapshot.items() if key != 'checked'}
+        result['age_s'] = round(age, 3)
+        if age > conf['STALE_AFTER']:
+            result['status'] = 'unhealthy'
+            result['stale'] = True
+        if detail:
+            result.update(collect_stats())
+        else:
+            result['services'] = {
+                name: {'status': service['status']} for name, service in result['services'].items()
+            }
+        return result
+
+monitor = HealthMonitor()
@@ -0,0 +1,94 @@
+"""
+Logging through a background thread.
+
+Loggers set up with ``queue_logger`` only put records on a bounded queue; a
+``QueueListener`` thread hands them to the handlers configured for the logger
+in ``LOGGING`` (e.g. a stream handler with ``JSONFormatter``), so the request
+path never waits for serialisation or I/O. When the queue is full records are
+dropped and counted instead of blocking.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+class JSONFormatter(logging.Formatter):
+    """Format a record as one JSON object, including its ``fields`` extra"""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        data.update(getattr(record, 'fields', {}))
+        if orjson is not None:
+            return orjson.dumps(data, default=str).decode()
+        return json.dumps(data, default=str, separators=(',', ':'))
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full"""
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_lock = threading.Lock()
+_listeners = {}
+# Handlers moved behind the queue, by logger name, for processes forked later
+_handlers = {}
+
+def queue_logger(name, queue_size=10000):
+    """
+    Return the logger ``name`` with the handlers configured for it in LOGGING
+    moved behind a queue, so that they run in a background thread. The thread
+    is started once per process. Level and propagation are left as configured;
+    a logger without handlers of its own is returned unchanged.
+    """
+    logger = logging.getLogger(name)
+    key = (name, os.getpid())
+    if key in _listeners:
+        return logger
+
+    with _lock:
+        if key not in _listeners:
+            # Handlers inherited from a parent process point at its dead queue
+            for handler in [h for h in logger.handlers if isinstance(h, DroppingQueueHandler)]:
+                logger.removeHandler(handler)
+
+            handlers = _handlers.setdefault(name, list(logger.handlers))
+            listener = None
+            if handlers:
+                for handler in handlers:
+                    logger.removeHandler(handler)
+                records = queue.Queue(maxsize=queue_size)
+                listener = QueueListener(records, *handlers, respect_handler_level=True)
+                listener.start()
+                # Write out what is still queued when the process exits
+                atexit.register(listener.stop)
+                logger.addHandler(DroppingQueueHandler(records))
+            _listeners[key] = listener
+    return logger
+
+def dropped_records(name):
+    """Return how many records of a queue logger were dropped in this process"""
+    return sum(
+        handler.dropped for handler in logging.getLogger(name).handlers
+        if isinstance(handler, DroppingQueueHandler)
+    )
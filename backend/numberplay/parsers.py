@@ -0,0 +1,43 @@
+"""
+orjson parser for the REST API.
+
+Request bodies are decoded with orjson when it is installed. Bodies orjson
+rejects are parsed again with the stdlib, so anything ``JSONParser`` accepted
+(such as integers wider than 64 bits) is still accepted and invalid JSON gets
+the same ``JSON parse error`` message as before.
+"""
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import json
+from .renderers import ORJSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+class ORJSONParser(JSONParser):
+    """JSONParser decoding with orjson when it is installed"""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        body = stream.read()
+        try:
+            if encoding.lower().replace('-', '') == 'utf8':
+                return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass
+
+        try:
+            parse_constant = json.strict_constant if self.strict else None
+            return json.loads(body.decode(encoding), parse_constant=parse_constant)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,179 @@
+"""
+Token-bucket rate limiting shared by the REST views, the async views and the
+WebSocket consumer.
+
+A rate such as ``'10/m'`` is a bucket of 10 tokens that refills at 10 tokens
+per minute. With the Redis backend the refill and the take happen in one Lua
+script, so every worker sees the same bucket in a single round trip. If Redis
+is unreachable requests are let through rather than rejected.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+from functools import wraps
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+RateLimit = namedtuple('RateLimit', ['allowed', 'limit', 'remaining', 'reset', 'retry_after'])
+
+def parse_rate(rate):
+    """Return (capacity, period in seconds) of a rate such as '10/m'"""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period]
+
+def get_backend():
+    """Return an instance of the configured rate limit backend"""
+    return import_string(settings.RATELIMIT_BACKEND)()
+
+def build_result(allowed, tokens, capacity, period, cost):
+    refill = capacity / period
+    return RateLimit(
+        allowed=allowed,
+        limit=capacity,
+        remaining=int(tokens),
+        reset=math.ceil((capacity - tokens) / refill),
+        retry_after=0 if allowed else math.ceil((cost - tokens) / refill),
+    )
+
+class CacheTokenBucket:
+    """
+    Token buckets in the default Django cache.
+
+    Updates are only atomic within one process, so this is meant for tests
+    and single-process development.
+    """
+
+    _lock = threading.Lock()
+
+    def consume(self, key, capacity, period, cost=1):
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = cache.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * capacity / period)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            cache.set(key, (tokens, now), timeout=period)
+        return build_result(allowed, tokens, capacity, period, cost)
+
+    async def aconsume(self, key, capacity, period, cost=1):
+        # Local memory only; nothing to wait for
+        return self.consume(key, capacity, period, cost)
+
+class RedisTokenBucket:
+    """Token buckets in Redis hashes, updated by one Lua script"""
+
+    # KEYS[1] bucket; ARGV capacity, refill per second, cost.
+    # Returns {allowed, tokens left} with the token count as a string, since
+    # Lua numbers are truncated to integers in replies.
+    SCRIPT = """
+    if redis.replicate_commands then redis.replicate_commands() end
+    local capacity = tonumber(ARGV[1])
+    local refill = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * refill)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / refill * 1000) + 1000)
+    return {allowed, tostring(tokens)}
+    """
+
+    def consume(self, key, capacity, period, cost=1):
+        from numberplay.redis_client import get_redis
+        script = get_redis().register_script(self.SCRIPT)
+        allowed, tokens = script(keys=[key], args=[capacity, capacity / period, cost])
+        return build_result(bool(allowed), float(tokens), capacity, period, cost)
+
+    async def aconsume(self, key, capacity, period, cost=1):
+        from numberplay.redis_client import get_async_redis
+        script = get_async_redis().register_script(self.SCRIPT)
+        allowed, tokens = await script(keys=[key], args=[capacity, capacity / period, cost])
+        return build_result(bool(allowed), float(tokens), capacity, period, cost)
+
+def bucket_key(group, user):
+    return f'{settings.RATELIMIT_KEY_PREFIX}:{group}:{user.pk}'
+
+def check(group, user, rate, cost=1):
+    """Take ``cost`` tokens from a user's bucket; returns None when limiting is off or unavailable"""
+    if not settings.RATELIMIT_ENABLE:
+        return None
+
+    capacity, period = parse_rate(rate)
+    try:
+        return get_backend().consume(bucket_key(group, user), capacity, period, cost)
+    except redis.RedisError as e:
+        logger.warning(f"Rate limit check failed, allowing request: {e}")
+        return None
+
+async def acheck(group, user, rate, cost=1):
+    """Async version of check, using the asyncio Redis pool"""
+    if not settings.RATELIMIT_ENABLE:
+        return None
+
+    capacity, period = parse_rate(rate)
+    try:
+        return await get_backend().aconsume(bucket_key(group, user), capacity, period, cost)
+    except redis.RedisError as e:
+        logger.warning(f"Rate limit check failed, allowing request: {e}")
+        return None
+
+def rate_limit_headers(result):
+    """Return the X-RateLimit-* (and Retry-After) headers of a check"""
+    if result is None:
+        return {}
+    headers = {
+        'X-RateLimit-Limit': str(result.limit),
+        'X-RateLimit-Remaining': str(result.remaining),
+        'X-RateLimit-Reset': str(result.reset),
+    }
+    if not result.allowed:
+        headers['Retry-After'] = str(result.retry_after)
+    return headers
+
+def add_rate_limit_headers(response, result):
+    """Set the rate limit headers of a check on a response and return it"""
+    for header, value in rate_limit_headers(result).items():
+        response[header] = value
+    return response
+
+def throttled_response():
+    return Response({'detail': 'Request was throttled.'}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
+def ratelimit(group, rate):
+    """
+    Rate limit a DRF function view per authenticated user.
+
+    Apply it below ``@api_view`` and ``@permission_classes`` so that it sees
+    the authenticated user.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            result = check(group, request.user, rate)
+            if result is not None and not result.allowed:
+                response = throttled_response()
+            else:
+                response = view_func(request, *args, **kwargs)
+            return add_rate_limit_headers(response, result)
+        return wrapper
+    return decorator
@@ -0,0 +1,108 @@
+"""
+Process-wide Redis connection pools.
+
+Every Redis-backed feature (cache, rate limits, leaderboards, write-behind
+buffer, health checks) borrows connections from one blocking pool per Redis
+URL instead of opening its own, so a worker never holds more than
+``REDIS_POOL['MAX_CONNECTIONS']`` connections per server. asyncio pools are
+bound to an event loop, so there is one per URL and running loop.
+"""
+
+import asyncio
+import threading
+import weakref
+import redis
+import redis.asyncio
+from django.conf import settings
+from django.core.cache.backends.redis import RedisCache, RedisCacheClient
+
+_lock = threading.Lock()
+_pools = {}
+_async_pools = weakref.WeakKeyDictionary()
+
+def _pool_options():
+    conf = settings.REDIS_POOL
+    return {
+        'max_connections': conf['MAX_CONNECTIONS'],
+        'timeout': conf['POOL_TIMEOUT'],
+        'socket_timeout': conf['SOCKET_TIMEOUT'],
+        'socket_connect_timeout': conf['SOCKET_CONNECT_TIMEOUT'],
+        'health_check_interval': conf['HEALTH_CHECK_INTERVAL'],
+    }
+
+def get_pool(url=None):
+    """Return the shared connection pool of a Redis URL (default: settings.REDIS_URL)"""
+    url = url or settings.REDIS_URL
+    pool = _pools.get(url)
+    if pool is None:
+        with _lock:
+            pool = _pools.get(url)
+            if pool is None:
+                pool = _pools[url] = redis.BlockingConnectionPool.from_url(url, **_pool_options())
+    return pool
+
+def get_redis(url=None):
+    """Return a client using the shared pool of a Redis URL"""
+    return redis.Redis(connection_pool=get_pool(url))
+
+def get_async_pool(url=None):
+    """Return the asyncio connection pool of a Redis URL for the running event loop"""
+    url = url or settings.REDIS_URL
+    pools = _async_pools.setdefault(asyncio.get_running_loop(), {})
+    if url not in pools:
+        pools[url] = redis.asyncio.BlockingConnectionPool.from_url(url, **_pool_options())
+    return pools[url]
+
+def get_async_redis(url=None):
+    """Return an asyncio client using the pool of the running event loop"""
+    return redis.asyncio.Redis(connection_pool=get_async_pool(url))
+
+def pool_stats():
+    """Return connection counts of the sync pools, and of the async pools of all live loops"""
+    stats = {}
+    for url, pool in list(_pools.items()):
+        idle = sum(1 for connection in list(pool.pool.queue) if connection is not None)
+        created = len(pool._connections)
+        stats[_redact(url)] = {
+            'max_connections': pool.max_connections,
+            'created': created,
+            'in_use': created - idle,
+            'idle': idle,
+        }
+
+    for pools in list(_async_pools.values()):
+        for url, pool in list(pools.items()):
+            entry = stats.setdefault(_redact(url), {}).setdefault('async', {
+                'max_connections': pool.max_connections,
+                'loops': 0,
+                'in_use': 0,
+                'idle': 0,
+            })
+            entry['loops'] += 1
+            entry['in_use'] += len(pool._in_use_connections)
+            entry['idle'] += len(pool._available_connections)
+
+    for entry in stats.values():
+        if 'max_connections' in entry:
+            entry['utilization'] = round(entry['in_use'] / entry['max_connections'], 4)
+    return stats
+
+def _redact(url):
+    # Never expose passwords in stats
+    parsed = redis.connection.urlparse(url)
+    if parsed.password:
+        return url.replace(f':{parsed.password}@', ':***@')
+    return url
+
+class PooledRedisCacheClient(RedisCacheClient):
+    """Django's Redis cache client, borrowing connections from the shared pools"""
+
+    def _get_connection_pool(self, write):
+        return get_pool(self._servers[self._get_connection_pool_index(write)])
+
+class PooledRedisCache(RedisCache):
+    """Redis cache backend that shares the process-wide connection pools"""
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._class = PooledRedisCacheClient
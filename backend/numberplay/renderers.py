@@ -0,0 +1,44 @@
+"""
+orjson renderer for the REST API.
+
+Produces the same bytes as DRF's ``JSONRenderer`` for compact output: types
+orjson does not encode natively, and all dates and times, go through DRF's
+``JSONEncoder.default``, so ``Decimal`` is still a number and a UTC datetime
+still ends in ``Z``. Indented output (``?format=api`` or ``; indent=`` in the
+Accept header), non-default JSON settings and values orjson rejects (such as
+integers wider than 64 bits) fall back to ``JSONRenderer``, as does a missing
+orjson. Unlike the stdlib encoder, orjson writes NaN and infinity as ``null``
+and exponents without a ``+`` (``1e16``).
+"""
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# JSONRenderer escapes these so the output is also valid JavaScript
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding with orjson when it is installed"""
+
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if LINE_SEPARATOR in ret or PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(LINE_SEPARATOR, b'\\u2028').replace(PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "game_app.middleware.RequestLoggingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -84,32 +85,123 @@ TEMPLATES = [
 WSGI_APPLICATION = "numberplay.wsgi.application"
 ASGI_APPLICATION = "numberplay.asgi.application"
 
-# Channels configuration
+# Redis
+REDIS_URL = config('REDIS_URL', default="redis://127.0.0.1:6379/0")
+
+# Process-wide Redis connection pools (see numberplay.redis_client)
+REDIS_POOL = {
+    'MAX_CONNECTIONS': config('REDIS_MAX_CONNECTIONS', default=50, cast=int),
+    # Seconds to wait for a free connection when the pool is exhausted
+    'POOL_TIMEOUT': config('REDIS_POOL_TIMEOUT', default=5, cast=float),
+    'SOCKET_TIMEOUT': config('REDIS_SOCKET_TIMEOUT', default=5, cast=float),
+    'SOCKET_CONNECT_TIMEOUT': config('REDIS_SOCKET_CONNECT_TIMEOUT', default=2, cast=float),
+    'HEALTH_CHECK_INTERVAL': config('REDIS_HEALTH_CHECK_INTERVAL', default=30, cast=int),
+}
+
+# Channels configuration; channels_redis keeps its own per-loop pools, and
+# blocking receives outlive SOCKET_TIMEOUT, so only the connect settings are shared
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [config('REDIS_URL', default="redis://127.0.0.1:6379/0")],
+            "hosts": [{
+                "address": REDIS_URL,
+                "socket_connect_timeout": REDIS_POOL['SOCKET_CONNECT_TIMEOUT'],
+                "health_check_interval": REDIS_POOL['HEALTH_CHECK_INTERVAL'],
+            }],
         },
     },
 }
 
+# Cache
+# Local memory by default; set CACHE_BACKEND=redis to share the cache between workers
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'numberplay.redis_client.PooledRedisCache',
+            'LOCATION': config('CACHE_REDIS_URL', default=REDIS_URL),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Health probes read a snapshot refreshed every INTERVAL seconds by a
+# background thread (or on read when BACKGROUND is off)
+HEALTH_CHECK = {
+    'INTERVAL': config('HEALTH_CHECK_INTERVAL', default=5, cast=float),
+    'STALE_AFTER': config('HEALTH_CHECK_STALE_AFTER', default=30, cast=float),
+    'BACKGROUND': config('HEALTH_CHECK_BACKGROUND', default=True, cast=bool),
+}
+
+# Rate limiting: token buckets in Redis are shared by all workers; the cache
+# backend is only atomic within one process, like the local memory cache
+RATELIMIT_ENABLE = config('RATELIMIT_ENABLE', default=True, cast=bool)
+RATELIMIT_BACKEND = config(
+    'RATELIMIT_BACKEND',
+    default='numberplay.ratelimit.RedisTokenBucket' if CACHE_BACKEND == 'redis'
+    else 'numberplay.ratelimit.CacheTokenBucket'
+)
+RATELIMIT_KEY_PREFIX = 'ratelimit'
+
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
 # Database configuration
 DATABASE_URL = config('DATABASE_URL', default='sqlite:///db.sqlite3')
 
+# Seconds a connection is kept for later requests (0 closes it after every
+# request). Django 4.2 cannot reuse connections across ASGI requests, so
+# under Daphne use DB_POOL_ENABLED instead.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=0, cast=int)
+# Check that a kept connection still works before reusing it
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+# Process-wide MySQL connection pool (requires django-db-connection-pool[mysql])
+DB_POOL = {
+    'ENABLED': config('DB_POOL_ENABLED', default=False, cast=bool),
+    'POOL_SIZE': config('DB_POOL_SIZE', default=10, cast=int),
+    'MAX_OVERFLOW': config('DB_POOL_MAX_OVERFLOW', default=10, cast=int),
+    'RECYCLE': config('DB_POOL_RECYCLE', default=3600, cast=int),
+    'TIMEOUT': config('DB_POOL_TIMEOUT', default=30, cast=int),
+    'PRE_PING': DB_CONN_HEALTH_CHECKS,
+}
+
 if DATABASE_URL.startswith('mysql://'):
     import dj_database_url
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL)
+        'default': dj_database_url.parse(
+            DATABASE_URL,
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=DB_CONN_HEALTH_CHECKS,
+        )
     }
+    if DB_POOL['ENABLED']:
+        from importlib.util import find_spec
+        from django.core.exceptions import ImproperlyConfigured
+        if find_spec('dj_db_conn_pool') is None:
+            raise ImproperlyConfigured(
+                'DB_POOL_ENABLED requires django-db-connection-pool: '
+                'pip install "django-db-connection-pool[mysql]"'
+            )
+        DATABASES['default'].update({
+            'ENGINE': 'dj_db_conn_pool.backends.mysql',
+            'POOL_OPTIONS': {key: value for key, value in DB_POOL.items() if key != 'ENABLED'},
+            # Connections go back to the pool after every request
+            'CONN_MAX_AGE': 0,
+        })
 else:
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": BASE_DIR / "db.sqlite3",
+            "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+            "CONN_HEALTH_CHECKS": DB_CONN_HEALTH_CHECKS,
         }
     }
 
@@ -162,12 +254,22 @@ AUTH_USER_MODEL = 'auth_app.User'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'auth_app.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson when installed, with the output of DRF's JSON renderer
+    'DEFAULT_RENDERER_CLASSES': [
+        'numberplay.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'numberplay.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
@@ -217,6 +319,17 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Per-process cache of users resolved for authentication
+AUTH_USER_CACHE = {
+    'ENABLED': config('AUTH_USER_CACHE_ENABLED', default=True, cast=bool),
+    'MAX_SIZE': config('AUTH_USER_CACHE_MAX_SIZE', default=10000, cast=int),
+    'TTL': config('AUTH_USER_CACHE_TTL', default=60, cast=int),
+}
+
+# Build WebSocket users from token claims without a database lookup; a
+# deactivated user keeps access until their token expires
+WEBSOCKET_AUTH_CLAIMS_ONLY = config('WEBSOCKET_AUTH_CLAIMS_ONLY', default=False, cast=bool)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -226,11 +339,144 @@ CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_ALL_ORIGINS = True  # For development only
 
 # Celery settings
-CELERY_BROKER_URL = config('REDIS_URL', default='redis://127.0.0.1:6379/0')
-CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://127.0.0.1:6379/0')
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {}
+
+# Game settings
+GAME_BATCH_MAX_SIZE = config('GAME_BATCH_MAX_SIZE', default=50, cast=int)
+GAME_HISTORY_PAGE_SIZE = config('GAME_HISTORY_PAGE_SIZE', default=20, cast=int)
+GAME_HISTORY_MAX_PAGE_SIZE = config('GAME_HISTORY_MAX_PAGE_SIZE', default=100, cast=int)
+GAME_EXPORT_CHUNK_SIZE = config('GAME_EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Payout rules, compiled at startup into exact prizes for every playable
+# number. WIN picks the winning numbers ('even', 'odd', 'all', 'multiple:N' or
+# the dotted path of a number -> bool callable); a win pays the number times
+# the RATE of the first tier whose ABOVE the number exceeds
+GAME_RULES = {
+    'WIN': config('GAME_RULES_WIN', default='even'),
+    'TIERS': [
+        {'ABOVE': 900, 'RATE': '0.70'},
+        {'ABOVE': 600, 'RATE': '0.50'},
+        {'ABOVE': 300, 'RATE': '0.30'},
+        {'ABOVE': 0, 'RATE': '0.10'},
+    ],
+}
+
+# Versioned per-user cache of the history and statistics responses. Version
+# bumps have to reach every worker and the write-behind flush, so the cache is
+# only on by default when the cache backend is shared
+GAME_RESPONSE_CACHE = {
+    'ENABLED': config('GAME_RESPONSE_CACHE_ENABLED', default=CACHE_BACKEND == 'redis', cast=bool),
+    'ALIAS': 'default',
+    'TTL': config('GAME_RESPONSE_CACHE_TTL', default=300, cast=int),
+}
+
+# Statistics shown on the GameResult admin changelist
+GAME_ADMIN_STATS = {
+    'CACHE_TTL': config('GAME_ADMIN_STATS_CACHE_TTL', default=30, cast=int),
+    # Use table-statistics estimates for the unfiltered changelist
+    'USE_ESTIMATES': config('GAME_ADMIN_STATS_USE_ESTIMATES', default=False, cast=bool),
+}
+
+# Write-behind mode: plays are acknowledged once buffered and flushed to the
+# database in batches by the flush_game_results Celery beat task
+GAME_WRITE_BEHIND = {
+    'ENABLED': config('GAME_WRITE_BEHIND_ENABLED', default=False, cast=bool),
+    'BACKEND': config('GAME_WRITE_BEHIND_BACKEND', default='game_app.buffer.RedisResultBuffer'),
+    'KEY': 'game:results:buffer',
+    'BATCH_SIZE': config('GAME_WRITE_BEHIND_BATCH_SIZE', default=500, cast=int),
+    'FLUSH_INTERVAL': config('GAME_WRITE_BEHIND_FLUSH_INTERVAL', default=1.0, cast=float),
+    'MAX_BATCHES_PER_FLUSH': config('GAME_WRITE_BEHIND_MAX_BATCHES', default=20, cast=int),
+    # Failed flushes of one batch before it is stored in halves and the
+    # records that still fail on their own are dead-lettered
+    'MAX_ATTEMPTS': config('GAME_WRITE_BEHIND_MAX_ATTEMPTS', default=3, cast=int),
+    'LOCK_TIMEOUT': 60,
+}
+
+if GAME_RESPONSE_CACHE['ENABLED'] and GAME_WRITE_BEHIND['ENABLED'] and CACHE_BACKEND != 'redis':
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(
+        'GAME_RESPONSE_CACHE_ENABLED with GAME_WRITE_BEHIND_ENABLED requires CACHE_BACKEND=redis: '
+        'the flush worker could not invalidate the local caches of the web workers'
+    )
+
+# Leaderboards in sorted sets, updated with every committed win
+GAME_LEADERBOARD = {
+    'ENABLED': config('GAME_LEADERBOARD_ENABLED', default=True, cast=bool),
+    'BACKEND': config('GAME_LEADERBOARD_BACKEND', default='game_app.leaderboard.RedisLeaderboard'),
+    'KEY_PREFIX': 'game:leaderboard',
+    # Daily boards are kept for a few days after their last update
+    'DAILY_TTL': config('GAME_LEADERBOARD_DAILY_TTL', default=3 * 24 * 3600, cast=int),
+    'DEFAULT_LIMIT': 10,
+    'MAX_LIMIT': 100,
+}
+
+# Coalesce game results pushed to a socket within WINDOW seconds into one
+# frame of at most MAX_BATCH results; a WINDOW of 0 sends every result at once
+GAME_WS_COALESCE = {
+    'WINDOW': config('GAME_WS_COALESCE_WINDOW_MS', default=0, cast=int) / 1000,
+    'MAX_BATCH': config('GAME_WS_COALESCE_MAX_BATCH', default=50, cast=int),
+}
+
+# Seconds between daily rollup runs
+GAME_ROLLUP_INTERVAL = config('GAME_ROLLUP_INTERVAL', default=300, cast=int)
+# Seconds before the previous run that every run recomputes, to pick up rows
+# committed late; keep it above the longest write-behind or transaction delay
+GAME_ROLLUP_LOOKBACK = config('GAME_ROLLUP_LOOKBACK', default=3600, cast=int)
+
+CELERY_BEAT_SCHEDULE['rollup-daily-games'] = {
+    'task': 'game_app.tasks.rollup_daily_games',
+    'schedule': GAME_ROLLUP_INTERVAL,
+}
+
+if GAME_WRITE_BEHIND['ENABLED']:
+    CELERY_BEAT_SCHEDULE['flush-game-results'] = {
+        'task': 'game_app.tasks.flush_game_results',
+        'schedule': GAME_WRITE_BEHIND['FLUSH_INTERVAL'],
+    }
+
+# One JSON record per request, written by a background thread. SAMPLE_RATES
+# maps path prefixes to the fraction of requests logged (longest prefix
+# wins); server errors are always logged
+REQUEST_LOGGING = {
+    'ENABLED': config('REQUEST_LOGGING_ENABLED', default=True, cast=bool),
+    'LOGGER': 'numberplay.requests',
+    # Server errors are always logged; other requests only at these rates
+    'SAMPLE_RATE': config('REQUEST_LOGGING_SAMPLE_RATE', default=0.0, cast=float),
+    'SAMPLE_RATES': {
+        '/health/': 0.0,
+    },
+    # Records waiting for the writer thread; more are dropped
+    'QUEUE_SIZE': config('REQUEST_LOGGING_QUEUE_SIZE', default=10000, cast=int),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'numberplay.log_queue.JSONFormatter',
+        },
+    },
+    'handlers': {
+        'requests': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        # Written from a background thread by RequestLoggingMiddleware
+        'numberplay.requests': {
+            'handlers': ['requests'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
 
 # Email settings (for development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
@@ -0,0 +1,14 @@
+"""
+Settings for running the test suite.
+
+    python manage.py test --settings=numberplay.test_settings
+
+Other runners (e.g. pytest-django) pick them up through
+``DJANGO_SETTINGS_MODULE=numberplay.test_settings``.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import REQUEST_LOGGING
+
+# Keep request records out of the test output; the middleware tests enable it
+REQUEST_LOGGING = {**REQUEST_LOGGING, 'ENABLED': False}
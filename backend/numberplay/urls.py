@@ -21,7 +21,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenRefreshView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
-from .views import health_check
+from .views import health_check, health_details, health_live, health_ready
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -29,6 +29,9 @@ urlpatterns = [
     path("api/game/", include("game_app.urls")),
     path('api/token/refresh/', TokenRefreshView.as_view()),
     path('health/', health_check, name='health_check'),
+    path('health/live/', health_live, name='health_live'),
+    path('health/ready/', health_ready, name='health_ready'),
+    path('health/details/', health_details, name='health_details'),
     
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
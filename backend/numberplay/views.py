@@ -1,60 +1,42 @@
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
-from django.db import connection
-from django.core.cache import cache
-from django.conf import settings
-import redis
-import json
+from django.http import JsonResponse
+from .health import monitor
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def health_check(request):
     """Health check endpoint for monitoring"""
+    snapshot = monitor.snapshot()
+    # Keep the original format for existing monitors; the probes below use the snapshot's
     health_status = {
-        'status': 'healthy',
-        'timestamp': None,
-        'services': {}
+        'status': snapshot['status'],
+        'timestamp': snapshot['checked_at'],
+        'services': {name: service['status'] for name, service in snapshot['services'].items()},
     }
     
-    # Check database
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-        health_status['services']['database'] = 'healthy'
-    except Exception as e:
-        health_status['services']['database'] = f'unhealthy: {str(e)}'
-        health_status['status'] = 'unhealthy'
-    
-    # Check Redis
-    try:
-        redis_client = redis.from_url(settings.CELERY_BROKER_URL)
-        redis_client.ping()
-        health_status['services']['redis'] = 'healthy'
-    except Exception as e:
-        health_status['services']['redis'] = f'unhealthy: {str(e)}'
-        health_status['status'] = 'unhealthy'
-    
-    # Check cache
-    try:
-        cache.set('health_check', 'ok', timeout=10)
-        cache_value = cache.get('health_check')
-        if cache_value == 'ok':
-            health_status['services']['cache'] = 'healthy'
-        else:
-            health_status['services']['cache'] = 'unhealthy: cache not working'
-            health_status['status'] = 'unhealthy'
-    except Exception as e:
-        health_status['services']['cache'] = f'unhealthy: {str(e)}'
-        health_status['status'] = 'unhealthy'
-    
-    # Add timestamp
-    from django.utils import timezone
-    health_status['timestamp'] = timezone.now().isoformat()
-    
     # Return appropriate status code
     if health_status['status'] == 'healthy':
         return Response(health_status, status=status.HTTP_200_OK)
     else:
-        return Response(health_status, status=status.HTTP_503_SERVICE_UNAVAILABLE) 
\ No newline at end of file
+        return Response(health_status, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def health_details(request):
+    """Health snapshot with latencies, errors and process counters, for staff"""
+    health_status = monitor.snapshot(detail=True)
+    code = status.HTTP_200_OK if health_status['status'] == 'healthy' else status.HTTP_503_SERVICE_UNAVAILABLE
+    return Response(health_status, status=code)
+
+def health_live(request):
+    """Liveness probe: the process is up and serving requests"""
+    return JsonResponse({'status': 'alive'})
+
+def health_ready(request):
+    """Readiness probe: the latest dependency snapshot, refreshed in the background"""
+    health_status = monitor.snapshot()
+    code = status.HTTP_200_OK if health_status['status'] == 'healthy' else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JsonResponse(health_status, status=code)